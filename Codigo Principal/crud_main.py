@@ -1,27 +1,188 @@
-import datetime
+import os
+import sys
 import pandas as pd
 
+# Os módulos compartilhados (armazenamento etc.) ficam junto da versão com layout
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Codigo com Layout'))
+from armazenamento import ArmazenamentoSQLite, ConflitoVersao
+from cliente import ArmazenamentoRemoto
+from importacao import importar
+from exportacao import exportar, SOMENTE_APTOS
+from indices import consultar
+from alocacao import Alocador, aplicar_designacao
+from estatisticas import EstatisticasCadastro, formatar_resumo
+from prazos import AgendaPrazos, varrer
+from duplicados import IndiceDuplicados, verificar_cadastro
+from geografia import carregar_gazetteer, aplicar_coordenadas
+from registros import Usuario, Local
+from regras import verificar_aptidao_usuario, calcular_capacidade_producao, avaliar_local, carregar_regras, PRAZO_VENCIDO, AGUARDANDO_VAGA
+from motor_regras import ErroRegra
 
-usuarios = {}
-locais = {}
+ARQUIVO_BANCO = 'cadastro.db'
+URL_SERVICO = os.environ.get('CRUD_SERVICO') # Se definida, usa o cadastro compartilhado do servico.py
+TAMANHO_PAGINA = 20
+
+COLUNAS_USUARIO = ['nome', 'idade', 'endereco', 'pessoas_casa', 'renda', 'profissao', 'apto', 'local_designado', 'prazo_comparecimento']
+COLUNAS_LOCAL = ['nome_local', 'endereco', 'responsavel', 'contato', 'andares', 'area', 'capacidade_producao', 'apto', 'mensagem']
+
+# Abertos por iniciar(): os processos "spawn" da verificação de duplicados importam este arquivo
+armazenamento = None
+usuarios = None
+locais = None
+
+# Distribui os usuários aptos entre as vagas dos locais aptos
+alocador = Alocador()
+# Contagens e histogramas do menu de estatísticas: montados na primeira consulta, mantidos a cada gravação
+estatisticas = EstatisticasCadastro()
+# Prazos de comparecimento por dia, para a varredura dos vencidos a cada volta do menu
+agenda = AgendaPrazos()
+# Blocos de nome e endereço, para conferir cada usuário novo sem percorrer o cadastro
+duplicados = IndiceDuplicados()
+
+def iniciar():
+    """Abre o banco (ou o serviço) e as tabelas; só na execução direta, não nos processos filhos."""
+    global armazenamento, usuarios, locais
+    # Cada operação lê e grava uma única linha do banco (ou um registro do serviço); nada é carregado inteiro na memória
+    armazenamento = ArmazenamentoRemoto(URL_SERVICO) if URL_SERVICO else ArmazenamentoSQLite(ARQUIVO_BANCO)
+    usuarios = armazenamento.carregar_tabela('usuarios')
+    locais = armazenamento.carregar_tabela('locais')
+
+def gravar_lote(tabela, itens):
+    """Grava registros (ou remoções) e as designações de outros usuários que a alocação alterou."""
+    itens = list(itens)
+    if URL_SERVICO:
+        armazenamento.registrar_lote(tabela, itens) # O serviço aplica as regras e a alocação
+        return
+    sincronizar()
+    outros = alocador.processar(tabela, itens, usuarios)
+    registrar_lote(tabela, itens)
+    if outros:
+        registrar_lote('usuarios', outros)
+
+def registrar_lote(tabela, itens):
+    armazenamento.registrar_lote(tabela, itens)
+    atualizar_estruturas(tabela, itens)
+
+def atualizar_estruturas(tabela, itens):
+    for chave, dados in itens:
+        estatisticas.atualizar(tabela, chave, dados)
+        if tabela == 'usuarios':
+            agenda.atualizar(chave, dados)
+            duplicados.atualizar(chave, dados)
+
+def sincronizar():
+    """Aplica ao alocador e às estatísticas o que outro processo gravou no banco."""
+    externas = armazenamento.sincronizar({'usuarios': usuarios, 'locais': locais})
+    if externas is None:
+        # O registro de alterações já não cobre a última leitura: não dá para saber o que mudou
+        estatisticas.descartar()
+        agenda.descartar()
+        duplicados.descartar()
+        iniciar_alocacao()
+        return
+    for tabela in ('locais', 'usuarios'): # Locais primeiro: as designações dos usuários apontam para eles
+        itens = [(chave, dados) for nome, chave, dados in externas if nome == tabela]
+        if itens:
+            alocador.adotar(tabela, itens)
+            atualizar_estruturas(tabela, itens)
+
+def gravar(tabela, chave, dados):
+    gravar_lote(tabela, [(chave, dados)])
+
+def iniciar_alocacao(redistribuir=False):
+    """Monta o estado do alocador a partir das designações gravadas, sem alterar nenhuma.
+
+    Só quem tem vaga ou está na fila é lido do banco, pelo índice de local_designado. Com
+    `redistribuir`, todos são alocados de novo, cada um no local com vaga mais próximo.
+    Devolve quantos usuários mudaram de designação.
+    """
+    if URL_SERVICO:
+        return # Quem aloca é o serviço
+    if not redistribuir:
+        alocador.carregar(locais.items(), armazenamento.usuarios_alocados(AGUARDANDO_VAGA))
+        return 0
+    alterados = []
+    for nome, designacao in alocador.alocar_todos(usuarios, locais, redistribuir).items():
+        aplicar_designacao(usuarios[nome], designacao)
+        alterados.append((nome, usuarios[nome]))
+    if alterados:
+        registrar_lote('usuarios', alterados)
+    return len(alterados)
+
+def varrer_prazos():
+    """Quem não compareceu até o prazo perde a vaga, que vai para o primeiro da fila de espera."""
+    if URL_SERVICO:
+        return # O serviço faz as próprias varreduras
+    sincronizar()
+    alterados = varrer(agenda, usuarios)
+    if alterados:
+        gravar_lote('usuarios', alterados)
+        print(f"\n{len(alterados)} usuário(s) com prazo de comparecimento vencido perderam a vaga.")
 
 def menu_principal():
     while True:
+        try:
+            varrer_prazos() # Custa proporcional aos prazos que venceram desde a última volta
+        except ConflitoVersao:
+            pass # Outro processo alterou um deles agora: fica para a próxima volta
         print("\n--- MENU PRINCIPAL ---")
         print("1. Gerenciar Usuários")
         print("2. Gerenciar Locais para Fazendas Verticais")
-        print("3. Sair")
+        print("3. Estatísticas do Cadastro")
+        print("4. Importar Coordenadas dos Endereços (CSV)")
+        print("5. Sair")
         escolha = input("Escolha uma opção: ")
-        if escolha == '1':
-            menu_usuarios()
-        elif escolha == '2':
-            menu_locais()
-        elif escolha == '3':
+        try:
+            if escolha == '1':
+                menu_usuarios()
+            elif escolha == '2':
+                menu_locais()
+            elif escolha == '3':
+                mostrar_estatisticas()
+            elif escolha == '4':
+                importar_coordenadas()
+        except ConflitoVersao as erro:
+            print(f"Operação cancelada: {erro}")
+        if escolha == '5':
             print("Saindo...")
+            armazenamento.fechar()
             break
-        else:
+        elif escolha not in ('1', '2', '3', '4'):
             print("Opção inválida.")
 
+def mostrar_estatisticas():
+    if URL_SERVICO:
+        resumo = armazenamento.estatisticas() # Mantidas pelo serviço
+    else:
+        sincronizar()
+        if not estatisticas.construido:
+            estatisticas.construir(usuarios, locais) # Só na primeira consulta
+        resumo = estatisticas.resumo()
+    print("\n--- ESTATÍSTICAS DO CADASTRO ---")
+    print(formatar_resumo(resumo))
+
+def importar_coordenadas():
+    caminho = input("Caminho do gazetteer (CSV com endereco, latitude, longitude): ")
+    try:
+        gazetteer = carregar_gazetteer(caminho)
+    except (OSError, UnicodeDecodeError, ValueError) as erro:
+        print(f"Não foi possível ler o gazetteer: {erro}")
+        return
+    if gazetteer.ignoradas:
+        print(f"Linhas ignoradas no gazetteer: {len(gazetteer.ignoradas)}")
+    for tabela, dados in (('locais', locais), ('usuarios', usuarios)):
+        alterados, nao_encontrados = aplicar_coordenadas(dados, gazetteer)
+        if alterados:
+            gravar_lote(tabela, alterados)
+        print(f"{tabela.capitalize()}: {len(alterados)} com coordenadas novas, {nao_encontrados} endereço(s) não encontrado(s).")
+    if input("Redistribuir todos os usuários pelos locais mais próximos? Os prazos serão refeitos. (s/N): ").strip().lower() == 's':
+        if URL_SERVICO:
+            mudaram = armazenamento.redistribuir()
+        else:
+            sincronizar()
+            mudaram = iniciar_alocacao(redistribuir=True)
+        print(f"{mudaram} usuário(s) mudaram de local ou de prazo.")
+
 def menu_usuarios():
     while True:
         print("\n--- MENU USUÁRIOS ---")
@@ -29,7 +190,10 @@ def menu_usuarios():
         print("2. Listar Usuários")
         print("3. Atualizar Usuário")
         print("4. Remover Usuário")
-        print("5. Voltar")
+        print("5. Importar Usuários de Arquivo (CSV/JSONL)")
+        print("6. Exportar Usuários para Arquivo (CSV/JSONL/Parquet)")
+        print("7. Possíveis Duplicados")
+        print("8. Voltar")
         escolha = input("Escolha uma opção: ")
         if escolha == '1':
             adicionar_usuario()
@@ -40,6 +204,12 @@ def menu_usuarios():
         elif escolha == '4':
             remover_usuario()
         elif escolha == '5':
+            importar_arquivo('usuarios')
+        elif escolha == '6':
+            exportar_arquivo('usuarios')
+        elif escolha == '7':
+            listar_duplicados()
+        elif escolha == '8':
             break
         else:
             print("Opção inválida.")
@@ -52,29 +222,56 @@ def adicionar_usuario():
     renda = float(input("Renda familiar: "))
     profissao = input("Profissão: ")
 
-    usuario = {
+    usuario = Usuario({
         "nome": nome,
         "idade": idade,
         "endereco": endereco,
         "pessoas_casa": pessoas_casa,
         "renda": renda,
         "profissao": profissao,
-        "apto": verificar_aptidao_usuario(idade, renda),
-        "local_designado": endereco if verificar_aptidao_usuario(idade, renda) else "N/A",
-        "prazo_comparecimento": (datetime.date.today() + datetime.timedelta(days=15)).isoformat() if verificar_aptidao_usuario(idade, renda) else "N/A"
-    }
+        "local_designado": "N/A", # Definidos pelo alocador ao gravar
+        "prazo_comparecimento": "N/A"
+    })
+    usuario["apto"] = verificar_aptidao_usuario(usuario)
 
     usuarios[nome] = usuario
+    gravar('usuarios', nome, usuario)
     print("Usuário adicionado com sucesso!")
+    avisar_duplicados(nome)
+
+def avisar_duplicados(nome):
+    """Avisa se o cadastro recém-gravado se parece com outro (mesma pessoa ou mesma família)."""
+    if URL_SERVICO:
+        encontrados = armazenamento.duplicados(nome)
+    else:
+        if not duplicados.construido:
+            duplicados.construir(usuarios)
+        encontrados = duplicados.verificar(nome, usuarios.get(nome), usuarios)
+    for outro, semelhanca, motivo in encontrados[:5]:
+        print(f"Atenção: possível duplicado de '{outro}' ({motivo.lower()}, {semelhanca:.0%}).")
+
+def listar_duplicados():
+    print("Verificando o cadastro inteiro...")
+    pares = verificar_cadastro(usuarios)
+    if not pares:
+        print("\nNenhum possível duplicado encontrado.")
+        return
+    print(f"\n--- POSSÍVEIS DUPLICADOS ({len(pares)}) ---")
+    linhas = [{'usuario': nome, 'possivel_duplicado': outro, 'semelhanca': f"{semelhanca:.0%}", 'motivo': motivo}
+              for nome, outro, semelhanca, motivo in pares]
+    for numero, texto in enumerate(paginas(linhas, ['usuario', 'possivel_duplicado', 'semelhanca', 'motivo']), start=1):
+        print(f"\n--- Página {numero} ---")
+        print(texto)
+        if input("Enter = próxima página, q = sair: ").strip().lower() == 'q':
+            return
 
 def listar_usuarios():
     if not usuarios:
         print("\nNenhum usuário cadastrado.")
         return
 
-    df = pd.DataFrame(usuarios.values())
     print("\n--- USUÁRIOS CADASTRADOS ---")
-    print(df.to_string(index=False))
+    listar_paginado(usuarios, COLUNAS_USUARIO)
 
 
 def atualizar_usuario():
@@ -87,9 +284,10 @@ def atualizar_usuario():
         if renda: usuarios[nome]['renda'] = float(renda)
 
         
-        usuarios[nome]['apto'] = verificar_aptidao_usuario(usuarios[nome]['idade'], usuarios[nome]['renda'])
-        usuarios[nome]['local_designado'] = usuarios[nome]['endereco'] if usuarios[nome]['apto'] else "N/A"
-        usuarios[nome]['prazo_comparecimento'] = (datetime.date.today() + datetime.timedelta(days=30)).isoformat() if usuarios[nome]['apto'] else "N/A"
+        usuarios[nome]['apto'] = verificar_aptidao_usuario(usuarios[nome])
+        if usuarios[nome].get('local_designado') == PRAZO_VENCIDO:
+            usuarios[nome]['local_designado'] = "N/A" # Atualizado: volta a concorrer a uma vaga
+        gravar('usuarios', nome, usuarios[nome])
         print("Usuário atualizado.")
     else:
         print("Usuário não encontrado.")
@@ -97,13 +295,11 @@ def atualizar_usuario():
 def remover_usuario():
     nome = input("Digite o nome do usuário a remover: ")
     if usuarios.pop(nome, None):
+        gravar('usuarios', nome, None)
         print("Usuário removido.")
     else:
         print("Usuário não encontrado.")
 
-def verificar_aptidao_usuario(idade, renda):
-    return idade >= 18 and renda <= 2000  
-
 def menu_locais():
     while True:
         print("\n--- MENU LOCAIS ---")
@@ -111,7 +307,9 @@ def menu_locais():
         print("2. Listar Locais")
         print("3. Atualizar Local")
         print("4. Remover Local")
-        print("5. Voltar")
+        print("5. Importar Locais de Arquivo (CSV/JSONL)")
+        print("6. Exportar Locais para Arquivo (CSV/JSONL/Parquet)")
+        print("7. Voltar")
         escolha = input("Escolha uma opção: ")
         if escolha == '1':
             adicionar_local()
@@ -122,6 +320,10 @@ def menu_locais():
         elif escolha == '4':
             remover_local()
         elif escolha == '5':
+            importar_arquivo('locais')
+        elif escolha == '6':
+            exportar_arquivo('locais')
+        elif escolha == '7':
             break
         else:
             print("Opção inválida.")
@@ -134,22 +336,20 @@ def adicionar_local():
     andares = int(input("Quantidade de andares: "))
     area = float(input("Área do local (m²): "))
 
-    capacidade = calcular_capacidade_producao(andares, area)
-    apto = "Sim" if capacidade >= 1000 else "Não"
-
-    local = {
+    local = Local({
         "nome_local": nome_local,
         "endereco": endereco,
         "responsavel": responsavel,
         "contato": contato,
         "andares": andares,
         "area": area,
-        "capacidade_producao": capacidade,
-        "apto": apto,
         "mensagem": "O responsável será contatado para mais informações."
-    }
+    })
+    local["capacidade_producao"] = calcular_capacidade_producao(local)
+    local["apto"] = avaliar_local(local)
 
     locais[nome_local] = local
+    gravar('locais', nome_local, local)
     print("Local adicionado com sucesso!")
 
 def listar_locais():
@@ -157,9 +357,66 @@ def listar_locais():
         print("\nNenhum local cadastrado.")
         return
 
-    df = pd.DataFrame(locais.values())
     print("\n--- LOCAIS CADASTRADOS ---")
-    print(df.to_string(index=False))
+    listar_paginado(locais, COLUNAS_LOCAL)
+
+def paginas(registros, colunas, tamanho=TAMANHO_PAGINA):
+    """Gera o texto de uma página por vez, sem montar a tabela inteira na memória."""
+    pagina = []
+    for registro in registros:
+        pagina.append(registro)
+        if len(pagina) == tamanho:
+            yield pd.DataFrame.from_records(pagina, columns=colunas).to_string(index=False)
+            pagina = []
+    if pagina:
+        yield pd.DataFrame.from_records(pagina, columns=colunas).to_string(index=False)
+
+def interpretar_valor(texto):
+    """Converte o texto de um filtro em bool, número ou faixa (mínimo, máximo)."""
+    if '..' in texto:
+        minimo, maximo = texto.split('..', 1)
+        return (interpretar_valor(minimo) if minimo else None, interpretar_valor(maximo) if maximo else None)
+    if texto.lower() in ('true', 'false'):
+        return texto.lower() == 'true'
+    for tipo in (int, float):
+        try:
+            return tipo(texto)
+        except ValueError:
+            pass
+    return texto
+
+def listar_paginado(dados, colunas_padrao):
+    """Pergunta colunas, filtros e tamanho da página e mostra a listagem página a página."""
+    colunas = input(f"Colunas separadas por vírgula (Enter = todas: {', '.join(colunas_padrao)}): ")
+    colunas = [c.strip() for c in colunas.split(',') if c.strip() in colunas_padrao] or colunas_padrao
+    filtros = {}
+    for condicao in input("Filtros campo=valor ou campo=mín..máx, separados por vírgula (ex.: apto=True, renda=0..1500; Enter = nenhum): ").split(','):
+        if '=' in condicao:
+            campo, valor = condicao.split('=', 1)
+            filtros[campo.strip()] = interpretar_valor(valor.strip())
+    tamanho = input(f"Registros por página (Enter = {TAMANHO_PAGINA}): ")
+    tamanho = int(tamanho) if tamanho.isdigit() and int(tamanho) > 0 else TAMANHO_PAGINA
+
+    if filtros:
+        try:
+            chaves = consultar(dados, None, **filtros) # Consulta indexada no banco
+        except ValueError as erro:
+            print(erro)
+            return
+        registros = (dados[chave] for chave in chaves)
+    else:
+        registros = dados.values()
+
+    numero = 0
+    for numero, texto in enumerate(paginas(registros, colunas, tamanho), start=1):
+        print(f"\n--- Página {numero} ---")
+        print(texto)
+        if input("Enter = próxima página, q = sair: ").strip().lower() == 'q':
+            return
+    if numero == 0:
+        print("Nenhum registro atende aos filtros.")
+    else:
+        print("Fim da listagem.")
 
 
 def atualizar_local():
@@ -170,9 +427,9 @@ def atualizar_local():
         area = input(f"Nova área (atual: {locais[nome]['area']}): ")
         if andares: locais[nome]['andares'] = int(andares)
         if area: locais[nome]['area'] = float(area)
-        capacidade = calcular_capacidade_producao(locais[nome]['andares'], locais[nome]['area'])
-        locais[nome]['capacidade_producao'] = capacidade
-        locais[nome]['apto'] = "Sim" if capacidade >= 1000 else "Não"
+        locais[nome]['capacidade_producao'] = calcular_capacidade_producao(locais[nome])
+        locais[nome]['apto'] = avaliar_local(locais[nome])
+        gravar('locais', nome, locais[nome])
         print("Local atualizado.")
     else:
         print("Local não encontrado.")
@@ -180,12 +437,54 @@ def atualizar_local():
 def remover_local():
     nome = input("Digite o nome do local a remover: ")
     if locais.pop(nome, None):
+        gravar('locais', nome, None)
         print("Local removido.")
     else:
         print("Local não encontrado.")
 
-def calcular_capacidade_producao(andares, area):
-    return andares * area * 2  
+def importar_arquivo(tabela):
+    caminho = input("Caminho do arquivo (.csv ou .jsonl): ")
+    try:
+        # Aqui os usuários são identificados pelo nome, como no cadastro manual
+        if tabela == 'usuarios':
+            resultado = importar(caminho, 'usuarios', usuarios, gravar_lote, campo_chave='nome')
+        else:
+            resultado = importar(caminho, 'locais', locais, gravar_lote)
+    except (OSError, UnicodeDecodeError) as erro:
+        print(f"Não foi possível ler o arquivo: {erro}")
+        return
 
+    print(f"Importados: {resultado.importados} | Rejeitados: {len(resultado.rejeitados)} | {resultado.registros_por_segundo:.0f} registros/s")
+    if resultado.interrompida is not None:
+        print(f"Importação interrompida: {resultado.interrompida} O restante do arquivo não foi importado.")
+    for numero, motivo in resultado.rejeitados[:10]:
+        print(f"  Linha {numero}: {motivo}")
+    if resultado.rejeitados:
+        relatorio = caminho + '.rejeitados.csv'
+        resultado.salvar_rejeitados(relatorio)
+        print(f"Relatório completo de rejeições: {relatorio}")
+
+def exportar_arquivo(tabela):
+    caminho = input("Caminho do arquivo (.csv, .jsonl ou .parquet): ")
+    somente_aptos = input("Só os registros aptos? (s/N): ").strip().lower() == 's'
+    colunas_padrao = COLUNAS_USUARIO if tabela == 'usuarios' else COLUNAS_LOCAL
+    colunas = input(f"Colunas separadas por vírgula (Enter = {', '.join(colunas_padrao)}): ")
+    filtro = input("Filtro, como nas regras (ex.: renda / pessoas_casa <= 500; Enter = nenhum): ").strip()
+    colunas = [coluna.strip() for coluna in colunas.split(',') if coluna.strip()] or colunas_padrao
+    dados = usuarios if tabela == 'usuarios' else locais
+    try:
+        resultado = exportar(caminho, tabela, dados, colunas, SOMENTE_APTOS[tabela] if somente_aptos else None, filtro or None)
+    except (OSError, ValueError) as erro:
+        print(f"Não foi possível exportar: {erro}")
+        return
+    print(f"Exportados: {resultado.exportados} | {resultado.registros_por_segundo:.0f} registros/s | {caminho}")
 
-menu_principal()
\ No newline at end of file
+# A verificação de duplicados usa processos "spawn", que importam este arquivo: o menu só roda na execução direta
+if __name__ == '__main__':
+    iniciar()
+    try:
+        carregar_regras() # regras.json, se existir; as mesmas regras da interface gráfica
+    except ErroRegra as erro:
+        print(f"Erro nas regras: {erro} Valem as regras padrão.")
+    iniciar_alocacao()
+    menu_principal()
\ No newline at end of file
@@ -0,0 +1,399 @@
+import datetime
+import heapq
+import regras
+from geografia import GradeEspacial, coordenadas
+
+
+def concorre_a_vaga(dados):
+    """Usuário com cadastro completo, apto e sem prazo vencido (quem perdeu o prazo espera ser reagendado)."""
+    return bool(dados.get('registrado', True) and dados.get('apto')) and dados.get('local_designado') != regras.PRAZO_VENCIDO
+
+
+def origem(dados):
+    """De onde o usuário parte: (endereço, coordenadas ou None)."""
+    return dados.get('endereco'), coordenadas(dados)
+
+
+def prazo_valido(prazo):
+    """O prazo é uma data ISO (e não "N/A" ou outro texto)?"""
+    if not isinstance(prazo, str):
+        return False
+    try:
+        datetime.date.fromisoformat(prazo)
+    except ValueError:
+        return False
+    return True
+
+
+def prazo_vencido(dados, hoje=None):
+    """O usuário tem vaga e o prazo dela já passou, mas a varredura (prazos.py) ainda não o marcou?"""
+    if dados.get('local_designado') in (regras.PRAZO_VENCIDO, regras.AGUARDANDO_VAGA, "N/A", None):
+        return False
+    prazo = dados.get('prazo_comparecimento')
+    return prazo_valido(prazo) and prazo < (hoje or datetime.date.today()).isoformat()
+
+
+class _EstadoLocal:
+    """Vagas, ocupantes e horários (slots) de atendimento de um local."""
+
+    __slots__ = ('vagas', 'endereco', 'coordenadas', 'ocupantes', 'livres', 'proximo')
+
+    def __init__(self):
+        self.vagas = 0
+        self.endereco = None
+        self.coordenadas = None
+        self.ocupantes = {} # username -> slot de atendimento
+        self.livres = [] # slots devolvidos, reaproveitados do menor para o maior
+        self.proximo = 0 # primeiro slot nunca usado
+
+    def restantes(self):
+        return self.vagas - len(self.ocupantes)
+
+    def tomar_slot(self):
+        if self.livres:
+            return heapq.heappop(self.livres)
+        self.proximo += 1
+        return self.proximo - 1
+
+    def devolver_slot(self, slot):
+        heapq.heappush(self.livres, slot)
+
+
+class Alocador:
+    """Distribui os usuários aptos entre os locais aptos, respeitando as vagas de cada um.
+
+    Cada local oferece capacidade_producao // CAPACIDADE_POR_VAGA vagas. Se o usuário tem
+    coordenadas, vai para o local com vaga mais próximo dentre os que também têm (GradeEspacial);
+    senão, para um local no próprio endereço, se houver vaga, ou para o com mais vagas sobrando (heap).
+    O prazo de comparecimento vem do slot ocupado (ATENDIMENTOS_POR_DIA slots por dia, contados
+    a partir da data em que o estado foi montado) e é fixado quando o usuário recebe a vaga: só
+    muda se a designação mudar. Todas as operações são incrementais; alocar_todos() e carregar()
+    existem só para a carga inicial.
+    """
+
+    def __init__(self, capacidade_por_vaga=None, atendimentos_por_dia=None):
+        self.capacidade_por_vaga = capacidade_por_vaga or regras.CAPACIDADE_POR_VAGA
+        self.atendimentos_por_dia = atendimentos_por_dia or regras.ATENDIMENTOS_POR_DIA
+        self._limpar()
+
+    def _limpar(self):
+        self._prazos = {} # dias a partir do início -> data ISO, para não recalcular a mesma data
+        self._hoje = None
+        self._inicio = datetime.date.today() # Dia a partir do qual os slots são contados
+        self.locais = {}
+        self.por_endereco = {} # endereco -> nomes dos locais naquele endereço
+        self.designacoes = {} # username -> nome_local
+        self.prazos_designados = {} # username -> prazo fixado quando recebeu a vaga
+        self.origens = {} # username -> origem, para realocar quem perde a vaga no local mais próximo
+        self.espera = {} # username -> origem (endereço, coordenadas), na ordem de chegada
+        self.grade = GradeEspacial() # locais com coordenadas e vaga sobrando
+        self.heap = [] # (-vagas restantes, nome_local); entradas desatualizadas são descartadas ao sair
+
+    # --- Auxiliares ---
+    def vagas_do_local(self, registro):
+        if registro.get('apto') != "Sim":
+            return 0
+        try:
+            return int(float(registro.get('capacidade_producao', 0)) // self.capacidade_por_vaga)
+        except (TypeError, ValueError):
+            return 0
+
+    def prazo(self, slot):
+        """Data do slot; um slot devolvido cujo dia já passou vale para amanhã."""
+        dias = 1 + slot // self.atendimentos_por_dia
+        data = self._prazos.get(dias)
+        if data is None:
+            data = max(self._inicio + datetime.timedelta(days=dias), self._hoje + datetime.timedelta(days=1))
+            data = self._prazos[dias] = data.isoformat()
+        return data
+
+    def _virar_dia(self):
+        """Descarta as datas guardadas quando o dia muda (as de slots cujo dia passou mudam)."""
+        hoje = datetime.date.today()
+        if hoje != self._hoje:
+            self._hoje = hoje
+            self._prazos = {}
+
+    def _publicar(self, nome):
+        restantes = self.locais[nome].restantes()
+        if (nome in self.grade.posicoes) != (restantes > 0 and self.locais[nome].coordenadas is not None):
+            self._posicionar(nome)
+        if self.heap and self.heap[0][1] == nome:
+            # A entrada do topo é deste local e ficou velha: troca numa única operação
+            if restantes > 0:
+                heapq.heapreplace(self.heap, (-restantes, nome))
+            else:
+                heapq.heappop(self.heap)
+        elif restantes > 0:
+            heapq.heappush(self.heap, (-restantes, nome))
+        if len(self.heap) > 4 * len(self.locais) + 1024:
+            # Muitas entradas velhas: reconstrói o heap só com o estado atual
+            self.heap = [(-e.restantes(), n) for n, e in self.locais.items() if e.restantes() > 0]
+            heapq.heapify(self.heap)
+
+    def _posicionar(self, nome):
+        """Só locais com vaga sobrando ficam na grade, então a busca nunca esbarra num local lotado."""
+        estado = self.locais[nome]
+        self.grade.definir(nome, estado.coordenadas if estado.restantes() > 0 else None)
+
+    def _escolher_local(self, origem_usuario):
+        endereco, ponto = origem_usuario or (None, None)
+        if ponto is not None and self.grade.posicoes:
+            proximos = self.grade.mais_proximos(*ponto)
+            if proximos:
+                return proximos[0][1]
+        for nome in self.por_endereco.get(endereco, ()):
+            if self.locais[nome].restantes() > 0:
+                return nome
+        while self.heap:
+            negativo, nome = self.heap[0]
+            estado = self.locais.get(nome)
+            if estado is not None and estado.restantes() == -negativo:
+                return nome
+            heapq.heappop(self.heap)
+        return None
+
+    def _ocupar(self, username, nome, origem_usuario, prazo=None):
+        """Dá ao usuário um slot do local; `prazo` mantém o que ele já tinha nesse local."""
+        estado = self.locais[nome]
+        slot = estado.tomar_slot()
+        estado.ocupantes[username] = slot
+        self.designacoes[username] = nome
+        self.origens[username] = origem_usuario
+        prazo = self.prazos_designados[username] = prazo or self.prazo(slot)
+        self._publicar(nome)
+        return nome, prazo
+
+    def _desocupar(self, username):
+        """Retira o usuário do local em que está; devolve o nome do local, ou None."""
+        nome = self.designacoes.pop(username, None)
+        self.prazos_designados.pop(username, None)
+        self.origens.pop(username, None)
+        if nome is not None:
+            estado = self.locais[nome]
+            estado.devolver_slot(estado.ocupantes.pop(username))
+            self._publicar(nome)
+        return nome
+
+    def _atender_espera(self):
+        mudancas = {}
+        while self.espera:
+            username, origem_usuario = next(iter(self.espera.items()))
+            nome = self._escolher_local(origem_usuario)
+            if nome is None:
+                break
+            del self.espera[username]
+            mudancas[username] = self._ocupar(username, nome, origem_usuario)
+        return mudancas
+
+    # --- Usuários ---
+    def alocar(self, username, origem_usuario):
+        """Garante uma vaga a um usuário apto. Devolve (nome_local, prazo), ou None se ele ficou na fila.
+
+        `origem_usuario` é (endereço, coordenadas ou None); veja origem(). Quem já tem vaga
+        continua com ela e com o mesmo prazo.
+        """
+        nome = self.designacoes.get(username)
+        if nome is not None:
+            self.origens[username] = origem_usuario
+            return nome, self.prazos_designados[username]
+        self.espera.pop(username, None)
+        nome = self._escolher_local(origem_usuario)
+        if nome is None:
+            self.espera[username] = origem_usuario
+            return None
+        return self._ocupar(username, nome, origem_usuario)
+
+    def liberar(self, username):
+        """Retira um usuário que ficou inapto ou foi removido; a vaga vai para o primeiro da fila.
+
+        Devolve {username: (nome_local, prazo)} dos usuários que saíram da fila de espera.
+        """
+        self.espera.pop(username, None)
+        if self._desocupar(username) is None:
+            return {}
+        return self._atender_espera()
+
+    # --- Locais ---
+    def definir_local(self, nome, registro):
+        """Cadastra ou atualiza um local. Devolve {username: (nome_local, prazo) ou None} das designações alteradas."""
+        estado = self.locais.get(nome)
+        if estado is None:
+            estado = self.locais[nome] = _EstadoLocal()
+        else:
+            self.por_endereco.get(estado.endereco, set()).discard(nome)
+        estado.endereco = registro.get('endereco')
+        estado.coordenadas = coordenadas(registro)
+        self.por_endereco.setdefault(estado.endereco, set()).add(nome)
+        estado.vagas = self.vagas_do_local(registro)
+        self._posicionar(nome)
+
+        mudancas = {}
+        if estado.restantes() < 0:
+            # Capacidade diminuiu: os últimos slots perdem a vaga e são realocados
+            excedentes = sorted(estado.ocupantes.items(), key=lambda item: item[1], reverse=True)[:-estado.restantes()]
+            origens = {username: self.origens.get(username) for username, _ in excedentes}
+            for username, _ in excedentes:
+                self._desocupar(username)
+            for username, origem_usuario in origens.items():
+                destino = self._escolher_local(origem_usuario)
+                if destino is None:
+                    self.espera[username] = origem_usuario
+                    mudancas[username] = None
+                else:
+                    mudancas[username] = self._ocupar(username, destino, origem_usuario)
+        self._publicar(nome)
+        mudancas.update(self._atender_espera())
+        return mudancas
+
+    def remover_local(self, nome):
+        """Remove um local, realocando quem estava nele."""
+        if nome not in self.locais:
+            return {}
+        mudancas = self.definir_local(nome, {'endereco': self.locais[nome].endereco, 'apto': "Não"})
+        estado = self.locais.pop(nome)
+        self.por_endereco.get(estado.endereco, set()).discard(nome)
+        return mudancas
+
+    # --- Alterações feitas por outro processo ---
+    def adotar(self, tabela, itens):
+        """Reflete no estado alterações (chave, registro ou None) que outro processo já alocou e gravou.
+
+        Ninguém é realocado aqui: as designações gravadas pelo outro processo são aceitas como estão.
+        """
+        self._virar_dia() # Pode ser a primeira chamada desde a carga, ou já ser outro dia
+        if tabela == 'locais':
+            for nome, dados in itens:
+                estado = self.locais.get(nome)
+                if estado is not None:
+                    self.por_endereco.get(estado.endereco, set()).discard(nome)
+                if dados is None:
+                    if estado is not None:
+                        for username in self.locais.pop(nome).ocupantes:
+                            self.designacoes.pop(username, None)
+                            self.prazos_designados.pop(username, None)
+                            self.origens.pop(username, None)
+                        self.grade.definir(nome, None)
+                    continue
+                if estado is None:
+                    estado = self.locais[nome] = _EstadoLocal()
+                estado.endereco = dados.get('endereco')
+                estado.coordenadas = coordenadas(dados)
+                self.por_endereco.setdefault(estado.endereco, set()).add(nome)
+                estado.vagas = self.vagas_do_local(dados)
+                self._posicionar(nome)
+                self._publicar(nome)
+            return
+        for username, dados in itens:
+            self.espera.pop(username, None)
+            self._desocupar(username)
+            if dados is None or not concorre_a_vaga(dados):
+                continue
+            nome = dados.get('local_designado')
+            if nome in self.locais:
+                prazo = dados.get('prazo_comparecimento')
+                self._ocupar(username, nome, origem(dados), prazo if prazo_valido(prazo) else None)
+            elif nome == regras.AGUARDANDO_VAGA:
+                self.espera[username] = origem(dados)
+
+    # --- Carga e integração ---
+    def carregar(self, locais, usuarios):
+        """Monta o estado a partir das designações já gravadas, sem realocar ninguém (como adotar()).
+
+        `usuarios` só precisa trazer quem tem vaga, na ordem dos prazos, e quem está na fila: o
+        SQLite os busca pelo índice de local_designado, em vez de alocar_todos() percorrer o cadastro.
+        """
+        self._limpar()
+        self.adotar('locais', locais)
+        self.adotar('usuarios', usuarios)
+
+    def alocar_todos(self, usuarios, locais, redistribuir=False):
+        """Reconstrói o estado a partir do cadastro, mantendo as designações ainda válidas.
+
+        Com `redistribuir`, ninguém mantém a designação: todos são alocados de novo, no local com
+        vaga mais próximo, na ordem dos prazos que já tinham (quem já esperava mais vai primeiro).
+        Devolve {username: (nome_local, prazo) ou None} dos usuários cuja designação precisa mudar.
+        """
+        self._limpar()
+        self._virar_dia()
+        for nome, registro in locais.items():
+            self.definir_local(nome, registro)
+        designados, pendentes = [], []
+        for username, dados in usuarios.items():
+            if not concorre_a_vaga(dados):
+                continue
+            antes = (dados.get('local_designado'), dados.get('prazo_comparecimento'))
+            (designados if antes[0] in self.locais else pendentes).append((username, origem(dados), antes))
+        # Prazos ISO se ordenam como texto: os slots voltam na ordem das datas já marcadas.
+        # "N/A" e os da fila de espera ficam por último.
+        ordem = lambda item: (not prazo_valido(item[2][1]), str(item[2][1]))
+        designados.sort(key=ordem)
+        mudancas = {}
+        if redistribuir:
+            pendentes = sorted(designados + pendentes, key=lambda item: (item[2][0] not in self.locais, *ordem(item)))
+        else:
+            restantes = []
+            for username, origem_usuario, antes in designados:
+                if self.locais[antes[0]].restantes() <= 0:
+                    restantes.append((username, origem_usuario, antes))
+                    continue
+                designacao = self._ocupar(username, antes[0], origem_usuario, antes[1] if prazo_valido(antes[1]) else None)
+                if designacao != antes:
+                    mudancas[username] = designacao
+            pendentes = restantes + pendentes
+        for username, origem_usuario, antes in pendentes:
+            designacao = self.alocar(username, origem_usuario)
+            if designacao is None and antes[0] == regras.AGUARDANDO_VAGA:
+                continue
+            if designacao is not None and designacao[0] == antes[0] and prazo_valido(antes[1]):
+                # Continuou no mesmo local (redistribuição): o prazo marcado não muda
+                designacao = self.prazos_designados[username] = antes
+            if designacao != antes:
+                mudancas[username] = designacao
+        return mudancas
+
+    def processar(self, tabela, itens, usuarios):
+        """Aplica a alocação a um lote de alterações (chave, registro ou None) prestes a ser gravado.
+
+        Os usuários de `itens` recebem local_designado e prazo_comparecimento atualizados.
+        Devolve a lista (username, registro) de OUTROS usuários cuja designação mudou e que também
+        precisam ser gravados.
+        """
+        self._virar_dia()
+        mudancas = {}
+        if tabela == 'usuarios':
+            for username, dados in itens:
+                if dados is not None and prazo_vencido(dados):
+                    # Prazo passou antes da varredura: regravar o cadastro não dá um prazo novo
+                    dados['local_designado'] = regras.PRAZO_VENCIDO
+                if dados is not None and concorre_a_vaga(dados):
+                    aplicar_designacao(dados, self.alocar(username, origem(dados)))
+                else:
+                    mudancas.update(self.liberar(username))
+                    if dados is not None and dados.get('registrado', True) and dados.get('local_designado') != regras.PRAZO_VENCIDO:
+                        dados['local_designado'] = "N/A"
+                        dados['prazo_comparecimento'] = "N/A"
+            for username, dados in itens:
+                # Quem está no lote pode ter saído da fila por causa de outro item do mesmo lote
+                if username in mudancas and dados is not None:
+                    aplicar_designacao(dados, mudancas.pop(username))
+        else:
+            for nome, dados in itens:
+                mudancas.update(self.remover_local(nome) if dados is None else self.definir_local(nome, dados))
+
+        outros = []
+        for username, designacao in mudancas.items():
+            dados = usuarios.get(username)
+            if dados is not None:
+                aplicar_designacao(dados, designacao)
+                outros.append((username, dados))
+        return outros
+
+
+def aplicar_designacao(dados, designacao):
+    """Copia para o registro do usuário o resultado da alocação ((local, prazo) ou None = fila de espera)."""
+    if designacao is None:
+        dados['local_designado'] = regras.AGUARDANDO_VAGA
+        dados['prazo_comparecimento'] = "N/A"
+    else:
+        dados['local_designado'], dados['prazo_comparecimento'] = designacao
@@ -0,0 +1,721 @@
+import collections
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections.abc import MutableMapping
+from registros import TIPOS_REGISTRO, Registro, converter_tabela
+from snapshot_binario import EXTENSAO as EXTENSAO_BINARIA, TabelaMapeada, gravar_snapshot
+from snapshot_particionado import EXTENSAO as EXTENSAO_PARTICIONADA, carregar_particoes, gravar_particoes, ler_manifesto
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+# --- Configurações do Armazenamento ---
+ARQUIVO_DIARIO = 'alteracoes.jsonl'
+LIMITE_COMPACTACAO = 5000 # Quantidade de entradas no diário antes de reescrever os snapshots
+LIMITE_CACHE_SQLITE = 10000 # Registros mantidos em memória pelo backend SQLite
+LOTE_LEITURA_SQLITE = 500 # Linhas lidas por vez ao percorrer uma tabela SQLite (a trava é solta entre os lotes)
+LIMITE_ALTERACOES_SQLITE = 100000 # Entradas mantidas no registro de alterações do SQLite (tabela "alteracoes")
+
+
+def escrever_json_atomico(caminho, dados):
+    """Escreve um arquivo JSON em um temporário e o renomeia, evitando arquivos pela metade."""
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, indent=4, ensure_ascii=False, default=Registro.para_dict) # Registros compactos viram dict
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+class ConflitoVersao(Exception):
+    """Outro processo (ou operador) alterou o registro depois que ele foi lido."""
+
+    def __init__(self, mensagem, tabela=None, chave=None):
+        super().__init__(mensagem)
+        self.tabela = tabela
+        self.chave = chave
+
+
+class TravaArquivo:
+    """Trava exclusiva entre processos (flock, ou msvcrt no Windows) sobre um arquivo auxiliar.
+
+    Também é exclusiva entre as threads do próprio processo.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._trava_thread = threading.Lock()
+        self._arquivo = None
+
+    def __enter__(self):
+        self._trava_thread.acquire()
+        try:
+            if self._arquivo is None:
+                self._arquivo = open(self.caminho, 'a+b')
+            if fcntl is not None:
+                fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_EX)
+            else:
+                self._arquivo.seek(0)
+                msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_LOCK, 1) # Tenta por até ~10 s
+        except BaseException:
+            self._trava_thread.release()
+            raise
+        return self
+
+    def __exit__(self, *erro):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_UN)
+            else:
+                self._arquivo.seek(0)
+                msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._trava_thread.release()
+
+    def fechar(self):
+        with self._trava_thread:
+            if self._arquivo is not None:
+                self._arquivo.close()
+                self._arquivo = None
+
+
+def _assinatura(caminho):
+    """Identifica o estado de um arquivo sem lê-lo; None se ele não existe."""
+    try:
+        estado = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return estado.st_ino, estado.st_size, estado.st_mtime_ns
+
+
+class ArmazenamentoJSON:
+    """Snapshots JSON completos mais um diário (write-ahead) com uma linha por alteração.
+
+    Cada alteração acrescenta apenas o registro modificado ao diário; os snapshots
+    só são reescritos na compactação, e somente as tabelas que mudaram.
+
+    Vários processos podem usar os mesmos arquivos: toda escrita acontece sob uma trava de
+    arquivo, cada entrada do diário leva a identificação do processo que a gravou, e cada
+    compactação começa uma nova "geração" do diário (primeira linha). sincronizar() lê só o
+    trecho novo do diário para trazer o que os outros gravaram; uma alteração feita sobre um
+    registro que outro processo gravou depois da última leitura é descartada como conflito.
+
+    Com formato_snapshot='binario', os snapshots ficam em arquivos .snap mapeados em memória
+    (snapshot_binario.py) e cada registro só é decodificado quando usado. Na primeira execução
+    eles são criados a partir dos .json existentes.
+
+    Com formato_snapshot='particionado', cada tabela fica numa pasta .partes com vários arquivos
+    (snapshot_particionado.py), lidos e gravados em paralelo; a compactação só reescreve as
+    partes que têm alguma chave alterada no diário.
+    """
+
+    def __init__(self, arquivo_usuarios, arquivo_locais, arquivo_diario=ARQUIVO_DIARIO, limite_compactacao=LIMITE_COMPACTACAO,
+                 formato_snapshot='json'):
+        self.arquivos = {'usuarios': arquivo_usuarios, 'locais': arquivo_locais}
+        self.formato_snapshot = formato_snapshot
+        if formato_snapshot == 'binario':
+            self.snapshots = {tabela: os.path.splitext(caminho)[0] + EXTENSAO_BINARIA for tabela, caminho in self.arquivos.items()}
+        elif formato_snapshot == 'particionado':
+            self.snapshots = {tabela: os.path.splitext(caminho)[0] + EXTENSAO_PARTICIONADA for tabela, caminho in self.arquivos.items()}
+        else:
+            self.snapshots = dict(self.arquivos)
+        self.arquivo_diario = arquivo_diario
+        self.limite_compactacao = limite_compactacao
+        self.entradas_diario = 0 # Entradas na geração atual do diário, de todos os processos
+        self.tabelas_alteradas = set()
+        self.chaves_alteradas = set() # (tabela, chave) no diário desde o último snapshot, para o particionado
+        self.processo = uuid.uuid4().hex[:12] # Identifica no diário as entradas deste processo
+        self._final_proprio = f', "p": "{self.processo}"}}\n'.encode('utf-8') # Como terminam as linhas deste processo
+        self.trava = TravaArquivo(arquivo_diario + '.lock')
+        self.conflitos = collections.deque() # (tabela, chave) cujas alterações foram descartadas por conflito
+        self.bases = {} # (tabela, chave) -> (geração, posição) lida quando a alteração foi registrada
+        # Leitura para a memória (thread da interface)
+        self.lido = (None, 0) # (geração, bytes do diário) já aplicados às tabelas em memória
+        self._assinatura_lida = None
+        self._assinaturas_snapshots = {}
+        # Leitura para detectar conflitos (thread que grava)
+        self._escaneado = (None, 0)
+        self._ultima_alheia = {} # (tabela, chave) -> posição da última entrada gravada por outro processo
+
+    def carregar_tabela(self, tabela):
+        """Lê o snapshot de uma tabela. Pode lançar json.JSONDecodeError (ou ValueError, no binário)."""
+        caminho = self.snapshots[tabela]
+        if self.formato_snapshot == 'binario' and not os.path.exists(caminho) and os.path.exists(self.arquivos[tabela]):
+            # Primeira execução no formato binário. Dois processos convertendo juntos gravam o mesmo conteúdo.
+            with open(self.arquivos[tabela], 'r', encoding='utf-8') as f:
+                gravar_snapshot(caminho, tabela, json.load(f))
+        elif self.formato_snapshot == 'particionado' and ler_manifesto(caminho) is None and os.path.exists(self.arquivos[tabela]):
+            # Sem manifesto, a pasta nem existe ou a conversão foi interrompida: converte de novo
+            with open(self.arquivos[tabela], 'r', encoding='utf-8') as f:
+                gravar_particoes(caminho, tabela, json.load(f))
+        self._assinaturas_snapshots[tabela] = _assinatura(caminho)
+        if not os.path.exists(caminho):
+            return {}
+        if self.formato_snapshot == 'binario':
+            return TabelaMapeada(caminho, tabela)
+        if self.formato_snapshot == 'particionado':
+            return carregar_particoes(caminho, tabela)
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return converter_tabela(tabela, json.load(f))
+
+    def _gravar_snapshot(self, tabela, dados, completo=False):
+        if self.formato_snapshot == 'binario':
+            gravar_snapshot(self.snapshots[tabela], tabela, dados)
+        elif self.formato_snapshot == 'particionado':
+            alteradas = None if completo else [chave for nome, chave in self.chaves_alteradas if nome == tabela]
+            gravar_particoes(self.snapshots[tabela], tabela, dados, alteradas)
+        else:
+            escrever_json_atomico(self.snapshots[tabela], dados)
+
+    # --- Leitura do diário ---
+    def _ler_diario(self, geracao, posicao, pular_proprias=False):
+        """Entradas completas do diário a partir de `posicao`, com a posição final de cada uma.
+
+        Devolve (geração atual, [(fim, entrada)], nova posição, reiniciou). Se o diário é de
+        outra geração (houve compactação), lê desde o começo e reiniciou é True. Com
+        pular_proprias, as entradas deste processo nem são decodificadas (entrada None).
+        """
+        try:
+            arquivo = open(self.arquivo_diario, 'rb')
+        except FileNotFoundError:
+            return None, [], 0, geracao is not None or posicao > 0
+        with arquivo:
+            primeira = arquivo.readline()
+            atual, inicio = None, 0
+            if primeira.startswith(b'{"geracao"'):
+                atual, inicio = json.loads(primeira)['geracao'], len(primeira)
+            reiniciou = atual != geracao or posicao > os.fstat(arquivo.fileno()).st_size
+            if reiniciou or posicao < inicio:
+                posicao = inicio
+            arquivo.seek(posicao)
+            dados = arquivo.read()
+        completo = dados.rfind(b'\n') + 1 # Uma escrita em andamento fica para a próxima leitura
+        entradas = []
+        fim = posicao
+        propria = self._final_proprio if pular_proprias else None
+        for linha in dados[:completo].splitlines(keepends=True):
+            fim += len(linha)
+            if propria is not None and linha.endswith(propria):
+                entradas.append((fim, None))
+                continue
+            try:
+                entradas.append((fim, json.loads(linha)))
+            except json.JSONDecodeError:
+                break # Linha corrompida (queda durante a escrita): ignora o restante
+        return atual, entradas, fim, reiniciou
+
+    def reproduzir_diario(self, tabelas):
+        """Reaplica sobre as tabelas carregadas as alterações registradas após o último snapshot."""
+        with self.trava:
+            if any(_assinatura(self.snapshots[nome]) != assinatura for nome, assinatura in self._assinaturas_snapshots.items()):
+                # Outro processo compactou enquanto os snapshots eram lidos
+                self._recarregar(tabelas)
+                return
+            self._assinatura_lida = _assinatura(self.arquivo_diario)
+            geracao, entradas, posicao, _ = self._ler_diario(None, 0)
+            for _, entrada in entradas:
+                self._aplicar(tabelas, entrada)
+            self.lido = self._escaneado = (geracao, posicao)
+            self.entradas_diario = len(entradas)
+            self.tabelas_alteradas = {entrada['t'] for _, entrada in entradas}
+            self.chaves_alteradas = {(entrada['t'], entrada['k']) for _, entrada in entradas}
+
+    def _aplicar(self, tabelas, entrada):
+        tabela = tabelas[entrada['t']]
+        if entrada['d'] is None:
+            tabela.pop(entrada['k'], None)
+        else:
+            tabela[entrada['k']] = TIPOS_REGISTRO[entrada['t']](entrada['d'])
+
+    def sincronizar(self, tabelas, alteradas=()):
+        """Aplica às tabelas o que outros processos gravaram desde a última leitura.
+
+        Quando nada mudou, custa um os.stat do diário. Devolve a lista (tabela, chave, registro
+        ou None) aplicada. `alteradas` são as (tabela, chave) que quem chama vai gravar em
+        seguida: a posição lida fica anotada para que a gravação detecte conflitos.
+        """
+        mudancas = []
+        assinatura = _assinatura(self.arquivo_diario)
+        if assinatura != self._assinatura_lida:
+            with self.trava:
+                geracao, posicao = self.lido
+                nova_geracao, entradas, nova_posicao, reiniciou = self._ler_diario(geracao, posicao, pular_proprias=True)
+                if reiniciou:
+                    mudancas = self._recarregar(tabelas)
+                else:
+                    for _, entrada in entradas:
+                        if entrada is not None and entrada.get('p') != self.processo:
+                            self._aplicar(tabelas, entrada)
+                            mudancas.append((entrada['t'], entrada['k'], tabelas[entrada['t']].get(entrada['k'])))
+                    self.lido = (nova_geracao, nova_posicao)
+                self._assinatura_lida = assinatura
+        lido = self.lido
+        for chave in alteradas:
+            self.bases[chave] = lido
+        return mudancas
+
+    def _recarregar(self, tabelas):
+        """Depois de uma compactação feita por outro processo: relê tudo e aplica só as diferenças."""
+        novas = {nome: self.carregar_tabela(nome) for nome in tabelas}
+        geracao, entradas, posicao, _ = self._ler_diario(None, 0)
+        for _, entrada in entradas:
+            self._aplicar(novas, entrada)
+        mudancas = []
+        for nome, atual in tabelas.items():
+            nova = novas[nome]
+            for chave in [chave for chave in atual if chave not in nova and (nome, chave) not in self.bases]:
+                del atual[chave]
+                mudancas.append((nome, chave, None))
+            for chave, registro in nova.items():
+                if (nome, chave) in self.bases:
+                    continue # Alteração deste processo ainda não gravada: ela prevalece
+                antigo = atual.get(chave)
+                if antigo is None or dict(antigo) != dict(registro):
+                    atual[chave] = registro
+                    mudancas.append((nome, chave, registro))
+        self.lido = (geracao, posicao)
+        return mudancas
+
+    # --- Escrita (thread que grava) ---
+    def _escanear(self):
+        """Acompanha o diário para saber quais registros outros processos gravaram, e onde."""
+        geracao, posicao = self._escaneado
+        geracao, entradas, posicao, reiniciou = self._ler_diario(geracao, posicao, pular_proprias=True)
+        if reiniciou:
+            self._ultima_alheia = {}
+            self.entradas_diario = 0
+            self.tabelas_alteradas = set()
+            self.chaves_alteradas = set()
+        self.entradas_diario += len(entradas)
+        for fim, entrada in entradas:
+            if entrada is None:
+                continue # Própria: a tabela já foi anotada ao gravar
+            self.tabelas_alteradas.add(entrada['t'])
+            self.chaves_alteradas.add((entrada['t'], entrada['k']))
+            if entrada.get('p') != self.processo:
+                self._ultima_alheia[(entrada['t'], entrada['k'])] = fim
+        self._escaneado = (geracao, posicao)
+
+    def _alterado_por_outro(self, tabela, chave):
+        base = self.bases.pop((tabela, chave), None)
+        alheia = self._ultima_alheia.get((tabela, chave))
+        if base is None or alheia is None:
+            return False
+        geracao_base, posicao_base = base
+        return geracao_base != self._escaneado[0] or alheia > posicao_base
+
+    def registrar(self, tabela, chave, dados):
+        """Acrescenta ao diário o novo estado de um registro (dados=None indica remoção)."""
+        self.registrar_lote(tabela, [(chave, dados)])
+
+    def registrar_lote(self, tabela, itens):
+        """Acrescenta várias alterações (chave, dados) ao diário com uma única escrita.
+
+        Alterações sobre registros que outro processo gravou depois da leitura anotada em
+        sincronizar() não são gravadas: vão para `conflitos`.
+        """
+        with self.trava:
+            self._escanear()
+            linhas = []
+            gravadas = []
+            for chave, dados in itens:
+                if self._alterado_por_outro(tabela, chave):
+                    self.conflitos.append((tabela, chave))
+                    continue
+                gravadas.append((tabela, chave))
+                linhas.append(json.dumps({'t': tabela, 'k': chave, 'd': dados, 'p': self.processo},
+                                         ensure_ascii=False, default=Registro.para_dict) + '\n')
+            if not linhas:
+                return
+            conteudo = ''.join(linhas).encode('utf-8')
+            with open(self.arquivo_diario, 'ab') as diario:
+                diario.write(conteudo)
+            geracao, posicao = self._escaneado
+            self._escaneado = (geracao, posicao + len(conteudo))
+            self.entradas_diario += len(linhas)
+            self.tabelas_alteradas.add(tabela)
+            self.chaves_alteradas.update(gravadas)
+
+    def precisa_compactar(self):
+        return self.entradas_diario >= self.limite_compactacao
+
+    def compactar(self, tabelas, forcar=False):
+        """Reescreve os snapshots das tabelas alteradas e começa uma nova geração do diário.
+
+        Se o diário só tem entradas deste processo, as tabelas recebidas (da memória) já estão
+        completas; senão os snapshots são refeitos a partir do disco (snapshot + diário).
+        """
+        with self.trava:
+            self._escanear()
+            if not forcar and not self.precisa_compactar():
+                return # Outro processo compactou primeiro
+            da_memoria = not self._ultima_alheia and self._escaneado[0] == self.lido[0]
+            if not da_memoria:
+                tabelas = {nome: self.carregar_tabela(nome) for nome in self.arquivos}
+                for _, entrada in self._ler_diario(None, 0)[1]:
+                    self._aplicar(tabelas, entrada)
+            for nome, dados in tabelas.items():
+                if forcar or nome in self.tabelas_alteradas or not os.path.exists(self.snapshots[nome]):
+                    self._gravar_snapshot(nome, dados, completo=forcar)
+            # Os snapshots já contêm tudo: o diário recomeça vazio, numa nova geração.
+            # Se houver queda antes disso, reaplicar as entradas é inofensivo.
+            geracao = uuid.uuid4().hex
+            cabecalho = (json.dumps({'geracao': geracao}) + '\n').encode('utf-8')
+            temporario = self.arquivo_diario + '.tmp'
+            with open(temporario, 'wb') as f:
+                f.write(cabecalho)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.arquivo_diario)
+            self._escaneado = (geracao, len(cabecalho))
+            self._ultima_alheia = {}
+            self.entradas_diario = 0
+            self.tabelas_alteradas = set()
+            self.chaves_alteradas = set()
+            if da_memoria:
+                self.lido = (geracao, len(cabecalho)) # A memória já reflete os snapshots novos
+            self._assinatura_lida = None
+
+    def fechar(self):
+        self.trava.fechar()
+
+
+# --- Backend SQLite ---
+# Colunas de cada tabela (a primeira é a chave). Campos que não estão aqui vão para "extras" em JSON.
+COLUNAS = {
+    'usuarios': (('username', 'TEXT PRIMARY KEY'), ('senha', 'TEXT'), ('nome', 'TEXT'), ('idade', 'INTEGER'),
+                 ('endereco', 'TEXT'), ('pessoas_casa', 'INTEGER'), ('renda', 'REAL'), ('profissao', 'TEXT'),
+                 ('apto', 'INTEGER'), ('local_designado', 'TEXT'), ('prazo_comparecimento', 'TEXT'),
+                 ('registrado', 'INTEGER')),
+    'locais': (('nome_local', 'TEXT PRIMARY KEY'), ('endereco', 'TEXT'), ('responsavel', 'TEXT'), ('contato', 'TEXT'),
+               ('andares', 'INTEGER'), ('area', 'REAL'), ('capacidade_producao', 'REAL'), ('apto', 'TEXT'),
+               ('mensagem', 'TEXT')),
+}
+COLUNAS_BOOLEANAS = {'usuarios': ('apto', 'registrado'), 'locais': ()}
+INDICES = {
+    'usuarios': ('apto', 'idade', 'renda', 'endereco', 'nome', 'local_designado'),
+    'locais': ('apto', 'endereco', 'responsavel', 'capacidade_producao'),
+}
+
+
+class TabelaSQLite(MutableMapping):
+    """Dicionário que lê e grava linhas do SQLite sob demanda, sem carregar a tabela inteira.
+
+    Os registros lidos ficam num pequeno cache (mapa de identidade), para que alterações
+    feitas no dicionário retornado sejam vistas por quem chamar registrar() em seguida.
+    Assim como no backend JSON, atribuir ou remover um registro não grava nada: a gravação
+    acontece em registrar()/registrar_lote(). Até lá, a chave removida fica marcada e some
+    das leituras. A conexão é compartilhada com o gravador em segundo plano, por isso toda
+    leitura também passa pela trava do banco.
+    """
+
+    def __init__(self, banco, tabela, limite_cache=LIMITE_CACHE_SQLITE):
+        self.banco = banco
+        self.tabela = tabela
+        self.limite_cache = limite_cache
+        self._cache = {}
+        self._removidas = set() # Chaves removidas do dicionário que o banco ainda não apagou
+        self._tipo = TIPOS_REGISTRO[tabela]
+        colunas = [nome for nome, _ in COLUNAS[tabela]]
+        self._chave = colunas[0]
+        self._campos = colunas[1:]
+        self._booleanos = COLUNAS_BOOLEANAS[tabela]
+        # Instruções fixas e parametrizadas: o sqlite3 as prepara uma vez e reaproveita
+        self.sql_buscar = f"SELECT * FROM {tabela} WHERE {self._chave} = ?"
+        self.sql_existe = f"SELECT 1 FROM {tabela} WHERE {self._chave} = ?"
+        self.sql_chaves = f"SELECT {self._chave} FROM {tabela} ORDER BY rowid"
+        self.sql_todos = f"SELECT * FROM {tabela} ORDER BY rowid"
+        self.sql_pagina = f"SELECT {self._chave} FROM {tabela} ORDER BY rowid LIMIT ? OFFSET ?"
+        self.sql_contar = f"SELECT COUNT(*) FROM {tabela}"
+        self.sql_gravar = (f"INSERT OR REPLACE INTO {tabela} ({', '.join(colunas)}, extras) "
+                           f"VALUES ({', '.join('?' * (len(colunas) + 1))})")
+        self.sql_remover = f"DELETE FROM {tabela} WHERE {self._chave} = ?"
+
+    # --- Conversão entre linhas e registros ---
+    def linha_para_registro(self, linha):
+        registro = self._tipo()
+        for campo in self._campos:
+            valor = linha[campo]
+            if valor is not None:
+                registro[campo] = bool(valor) if campo in self._booleanos else valor
+        if linha['extras']:
+            registro.update(json.loads(linha['extras']))
+        return registro
+
+    def registro_para_linha(self, chave, registro):
+        valores = [chave]
+        for campo in self._campos:
+            valor = registro.get(campo)
+            valores.append(int(valor) if campo in self._booleanos and valor is not None else valor)
+        extras = {campo: valor for campo, valor in registro.items() if campo not in self._campos and campo != self._chave}
+        valores.append(json.dumps(extras, ensure_ascii=False) if extras else None)
+        return valores
+
+    def esvaziar_cache(self, chaves=None):
+        """Descarta os registros em cache (todos, ou só `chaves`) que outro processo alterou. Remoções pendentes continuam."""
+        if chaves is None:
+            self._cache = {}
+            return
+        for chave in chaves:
+            self._cache.pop(chave, None)
+
+    def _consultar(self, sql, parametros=()):
+        with self.banco.trava:
+            return self.banco.conexao.execute(sql, parametros).fetchall()
+
+    def _percorrer(self, sql, parametros=()):
+        """Linhas de uma consulta longa, em lotes: a trava não fica presa enquanto quem chama as usa."""
+        with self.banco.trava:
+            cursor = self.banco.conexao.execute(sql, parametros)
+        while True:
+            with self.banco.trava:
+                linhas = cursor.fetchmany(LOTE_LEITURA_SQLITE)
+            if not linhas:
+                return
+            yield from linhas
+
+    def _chaves(self, linhas):
+        removidas = self._removidas
+        return [chave for (chave,) in linhas if chave not in removidas]
+
+    def _guardar_cache(self, chave, registro):
+        if len(self._cache) >= self.limite_cache:
+            del self._cache[next(iter(self._cache))] # Descarta o mais antigo
+        self._cache[chave] = registro
+
+    # --- Interface de dicionário ---
+    def __getitem__(self, chave):
+        if chave in self._cache:
+            return self._cache[chave]
+        if chave in self._removidas:
+            raise KeyError(chave)
+        linhas = self._consultar(self.sql_buscar, (chave,))
+        if not linhas:
+            raise KeyError(chave)
+        registro = self.linha_para_registro(linhas[0])
+        self._guardar_cache(chave, registro)
+        return registro
+
+    def __contains__(self, chave):
+        if chave in self._cache:
+            return True
+        if chave in self._removidas:
+            return False
+        return bool(self._consultar(self.sql_existe, (chave,)))
+
+    def __setitem__(self, chave, registro):
+        self._removidas.discard(chave)
+        self._guardar_cache(chave, registro)
+
+    def __delitem__(self, chave):
+        if chave not in self:
+            raise KeyError(chave)
+        self._cache.pop(chave, None)
+        self._removidas.add(chave) # Apagada do banco quando a remoção for gravada
+
+    def __iter__(self):
+        removidas = self._removidas
+        for (chave,) in self._percorrer(self.sql_chaves):
+            if chave not in removidas:
+                yield chave
+
+    def __len__(self):
+        total = self._consultar(self.sql_contar)[0][0]
+        # Só descontam as remoções pendentes de chaves que ainda estão no banco
+        return total - sum(1 for chave in list(self._removidas) if self._consultar(self.sql_existe, (chave,)))
+
+    def chaves_pagina(self, inicio, quantidade):
+        """Devolve só as chaves de uma página, para as listagens paginadas."""
+        return self._chaves(self._consultar(self.sql_pagina, (quantidade, inicio)))
+
+    def chaves_ordenadas(self, campo, inicio, quantidade, decrescente=False):
+        """Chaves de uma página na ordem de uma coluna (campo=None: da própria chave)."""
+        coluna = self._chave if campo is None else campo
+        if coluna not in self._campos and coluna != self._chave:
+            raise ValueError(f"Não é possível ordenar por '{campo}'.")
+        direcao = 'DESC' if decrescente else 'ASC'
+        sql = f"SELECT {self._chave} FROM {self.tabela} ORDER BY {coluna} {direcao}, rowid {direcao} LIMIT ? OFFSET ?"
+        return self._chaves(self._consultar(sql, (quantidade, inicio)))
+
+    def consultar(self, **condicoes):
+        """Chaves que atendem às condições campo=valor ou campo=(mínimo, máximo), usando os índices do banco."""
+        clausulas = []
+        parametros = []
+        for campo, condicao in condicoes.items():
+            if campo not in self._campos:
+                raise ValueError(f"Campo desconhecido: '{campo}'.")
+            if isinstance(condicao, tuple):
+                minimo, maximo = condicao
+                if minimo is not None:
+                    clausulas.append(f"{campo} >= ?")
+                    parametros.append(minimo)
+                if maximo is not None:
+                    clausulas.append(f"{campo} <= ?")
+                    parametros.append(maximo)
+            else:
+                clausulas.append(f"{campo} = ?")
+                parametros.append(int(condicao) if isinstance(condicao, bool) else condicao)
+        if not clausulas:
+            raise ValueError("Informe ao menos uma condição.")
+        sql = f"SELECT {self._chave} FROM {self.tabela} WHERE {' AND '.join(clausulas)} ORDER BY {self._chave}"
+        return self._chaves(self._consultar(sql, parametros))
+
+    def items(self):
+        """Percorre a tabela com um único cursor, sem uma consulta por registro."""
+        return self._itens(self.sql_todos)
+
+    def _itens(self, sql, parametros=()):
+        removidas = self._removidas
+        for linha in self._percorrer(sql, parametros):
+            chave = linha[self._chave]
+            if chave not in removidas:
+                yield chave, self._cache.get(chave) or self.linha_para_registro(linha)
+
+    def values(self):
+        for _, registro in self.items():
+            yield registro
+
+    # --- Escrita ---
+    def gravar(self, chave, registro):
+        """Grava (ou remove, se registro for None) uma única linha."""
+        with self.banco.trava, self.banco.conexao:
+            if registro is None:
+                self.banco.conexao.execute(self.sql_remover, (chave,))
+                self._removidas.discard(chave)
+            else:
+                self.banco.conexao.execute(self.sql_gravar, self.registro_para_linha(chave, registro))
+            self.banco.anotar_alteracoes(self.tabela, [chave])
+
+    def gravar_lote(self, itens):
+        """Grava (ou remove, quando o registro é None) vários registros (chave, registro) numa única transação."""
+        itens = list(itens)
+        with self.banco.trava, self.banco.conexao:
+            self.banco.conexao.executemany(self.sql_gravar, (self.registro_para_linha(c, r) for c, r in itens if r is not None))
+            self.banco.conexao.executemany(self.sql_remover, ((c,) for c, r in itens if r is None))
+            self._removidas.difference_update(c for c, r in itens if r is None)
+            self.banco.anotar_alteracoes(self.tabela, [c for c, _ in itens])
+
+
+class ArmazenamentoSQLite:
+    """Backend SQLite em modo WAL, com índices nas colunas consultadas com frequência.
+
+    Tem a mesma interface do ArmazenamentoJSON, mas carregar_tabela() não lê nada:
+    devolve uma TabelaSQLite que busca cada linha apenas quando ela é usada. Cada gravação
+    anota (tabela, chave) na tabela "alteracoes", na mesma transação, para que os outros
+    processos saibam em sincronizar() quais linhas mudaram.
+    """
+
+    def __init__(self, arquivo_banco, importar_de=None):
+        # A conexão é compartilhada com o gravador em segundo plano; as escritas passam pela trava
+        self.conexao = sqlite3.connect(arquivo_banco, cached_statements=256, check_same_thread=False)
+        self.trava = threading.Lock()
+        self.conexao.row_factory = sqlite3.Row
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.processo = uuid.uuid4().hex[:12] # Identifica no registro de alterações as gravações deste processo
+        self._criar_tabelas()
+        self.tabelas = {nome: TabelaSQLite(self, nome) for nome in COLUNAS}
+        self._versao_dados = self._ler_versao_dados()
+        self._ultima_alteracao = self.conexao.execute("SELECT COALESCE(MAX(seq), 0) FROM alteracoes").fetchone()[0]
+        if importar_de:
+            self._importar_json(*importar_de)
+
+    def _criar_tabelas(self):
+        with self.conexao:
+            for tabela, colunas in COLUNAS.items():
+                definicao = ', '.join(f"{nome} {tipo}" for nome, tipo in colunas)
+                self.conexao.execute(f"CREATE TABLE IF NOT EXISTS {tabela} ({definicao}, extras TEXT)")
+                for coluna in INDICES[tabela]:
+                    self.conexao.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabela}_{coluna} ON {tabela} ({coluna})")
+            self.conexao.execute("CREATE TABLE IF NOT EXISTS alteracoes "
+                                 "(seq INTEGER PRIMARY KEY AUTOINCREMENT, tabela TEXT, chave TEXT, processo TEXT)")
+
+    def _importar_json(self, arquivo_usuarios, arquivo_locais):
+        """Na primeira execução, importa os arquivos JSON existentes para o banco vazio."""
+        for tabela, caminho in (('usuarios', arquivo_usuarios), ('locais', arquivo_locais)):
+            if not os.path.exists(caminho):
+                continue
+            if self.conexao.execute(f"SELECT 1 FROM {tabela} LIMIT 1").fetchone():
+                continue
+            with open(caminho, 'r', encoding='utf-8') as f:
+                self.tabelas[tabela].gravar_lote(json.load(f).items())
+
+    def carregar_tabela(self, tabela):
+        return self.tabelas[tabela]
+
+    def reproduzir_diario(self, tabelas):
+        """O SQLite já grava cada alteração de forma transacional; não há diário a reaplicar."""
+
+    def _ler_versao_dados(self):
+        with self.trava:
+            return self.conexao.execute("PRAGMA data_version").fetchone()[0]
+
+    def anotar_alteracoes(self, tabela, chaves):
+        """Registra as chaves gravadas; chamado dentro da transação da gravação, com a trava já tomada."""
+        self.conexao.executemany("INSERT INTO alteracoes (tabela, chave, processo) VALUES (?, ?, ?)",
+                                 ((tabela, chave, self.processo) for chave in chaves))
+        # Descarta as entradas antigas; as duas buscas são pela chave primária
+        self.conexao.execute("DELETE FROM alteracoes WHERE seq <= (SELECT MAX(seq) FROM alteracoes) - ?",
+                             (LIMITE_ALTERACOES_SQLITE,))
+
+    def sincronizar(self, tabelas, alteradas=()):
+        """Aplica às tabelas o que outros processos gravaram no banco desde a última chamada.
+
+        Quando nada mudou, custa um PRAGMA. Devolve a lista (tabela, chave, registro ou None)
+        alterada, lida do registro de alterações; se as entradas mais antigas que faltavam já
+        foram descartadas, esvazia os caches e devolve None (não dá para saber quais mudaram).
+        """
+        versao = self._ler_versao_dados()
+        if versao == self._versao_dados:
+            return []
+        self._versao_dados = versao
+        with self.trava:
+            primeira = self.conexao.execute("SELECT MIN(seq) FROM alteracoes").fetchone()[0]
+            linhas = self.conexao.execute("SELECT seq, tabela, chave, processo FROM alteracoes WHERE seq > ? ORDER BY seq",
+                                          (self._ultima_alteracao,)).fetchall()
+        perdidas = primeira is not None and primeira > self._ultima_alteracao + 1
+        if linhas:
+            self._ultima_alteracao = linhas[-1]['seq']
+        if perdidas:
+            for tabela in self.tabelas.values():
+                tabela.esvaziar_cache()
+            return None
+        # Cada (tabela, chave) uma vez, com o registro como está agora no banco
+        externas = dict.fromkeys((linha['tabela'], linha['chave']) for linha in linhas if linha['processo'] != self.processo)
+        for tabela, chave in externas:
+            self.tabelas[tabela].esvaziar_cache([chave])
+        return [(tabela, chave, tabelas[tabela].get(chave)) for tabela, chave in externas]
+
+    def usuarios_alocados(self, fila):
+        """Usuários com vaga num local cadastrado (na ordem dos prazos) e, depois, os com local_designado = `fila`.
+
+        As duas consultas usam o índice de local_designado: o alocador é montado sem ler os
+        demais usuários (veja Alocador.carregar()).
+        """
+        usuarios = self.tabelas['usuarios']
+        yield from usuarios._itens("SELECT * FROM usuarios WHERE local_designado IN (SELECT nome_local FROM locais) "
+                                   "ORDER BY prazo_comparecimento")
+        yield from usuarios._itens("SELECT * FROM usuarios WHERE local_designado = ? ORDER BY rowid", (fila,))
+
+    def registrar(self, tabela, chave, dados):
+        self.tabelas[tabela].gravar(chave, dados)
+
+    def registrar_lote(self, tabela, itens):
+        self.tabelas[tabela].gravar_lote(itens)
+
+    def precisa_compactar(self):
+        return False
+
+    def compactar(self, tabelas, forcar=False):
+        """Transfere o conteúdo do WAL para o arquivo principal do banco."""
+        with self.trava:
+            self.conexao.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def fechar(self):
+        self.conexao.close()
@@ -0,0 +1,81 @@
+import hashlib
+import hmac
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# --- Configurações de Hash de Senha ---
+ALGORITMO = 'pbkdf2_sha256'
+ITERACOES = 200000 # Custo proposital: cada verificação leva da ordem de 100 ms
+# Conferido quando o usuário não existe (ou não tem senha), para que a resposta leve o mesmo
+# tempo e não revele quais usernames estão cadastrados. Nenhuma senha gera esse hash.
+HASH_FICTICIO = f"{ALGORITMO}${ITERACOES}${'0' * 32}${'0' * 64}"
+
+
+def gerar_hash(senha, iteracoes=ITERACOES):
+    """Gera o hash de uma senha no formato algoritmo$iterações$sal$hash."""
+    sal = os.urandom(16)
+    derivada = hashlib.pbkdf2_hmac('sha256', senha.encode('utf-8'), sal, iteracoes)
+    return f"{ALGORITMO}${iteracoes}${sal.hex()}${derivada.hex()}"
+
+def conferir_senha(senha, armazenada):
+    """Confere uma senha com o valor armazenado (hash ou, em cadastros antigos, texto puro)."""
+    if not armazenada:
+        return False
+    if senha_em_texto_puro(armazenada):
+        return hmac.compare_digest(senha.encode('utf-8'), armazenada.encode('utf-8'))
+    try:
+        _, iteracoes, sal, esperado = armazenada.split('$')
+        derivada = hashlib.pbkdf2_hmac('sha256', senha.encode('utf-8'), bytes.fromhex(sal), int(iteracoes))
+    except (TypeError, ValueError):
+        return False # Hash gravado corrompido: ninguém entra com ele
+    return hmac.compare_digest(derivada.hex(), esperado)
+
+def senha_em_texto_puro(armazenada):
+    """Indica se a senha foi gravada antes do uso de hash e deve ser convertida no próximo login."""
+    return not armazenada.startswith(ALGORITMO + '$')
+
+
+class ServicoAutenticacao:
+    """Gera e confere hashes de senha fora da thread da interface.
+
+    As threads coordenam os pedidos (e devolvem um Future para quem chamou); o cálculo do
+    PBKDF2 em si roda num pool de processos, para várias verificações usarem vários núcleos.
+    """
+
+    def __init__(self, processos=None, threads=8):
+        self.processos = processos
+        self.threads = threads
+        self._pool_processos = None
+        self._pool_threads = None
+
+    def _iniciar(self):
+        if self._pool_threads is None:
+            # "spawn" evita duplicar o processo da interface gráfica (Tk) com fork
+            self._pool_processos = ProcessPoolExecutor(max_workers=self.processos, mp_context=multiprocessing.get_context('spawn'))
+            self._pool_threads = ThreadPoolExecutor(max_workers=self.threads)
+
+    def verificar(self, senha, armazenada):
+        """Devolve um Future com True/False. Sem senha armazenada, confere com HASH_FICTICIO (sempre False)."""
+        self._iniciar()
+        armazenada = armazenada or HASH_FICTICIO
+        if senha_em_texto_puro(armazenada):
+            # Nada a derivar: a comparação é imediata
+            return self._pool_threads.submit(conferir_senha, senha, armazenada)
+        return self._pool_threads.submit(lambda: self._pool_processos.submit(conferir_senha, senha, armazenada).result())
+
+    def gerar(self, senha):
+        """Devolve um Future com o hash da senha."""
+        self._iniciar()
+        return self._pool_threads.submit(lambda: self._pool_processos.submit(gerar_hash, senha).result())
+
+    def submeter(self, funcao, *argumentos):
+        """Devolve um Future com funcao(*argumentos), rodando numa das threads (ex.: login conferido pelo serviço)."""
+        self._iniciar()
+        return self._pool_threads.submit(funcao, *argumentos)
+
+    def encerrar(self):
+        if self._pool_threads is not None:
+            self._pool_threads.shutdown(wait=False, cancel_futures=True)
+            self._pool_processos.shutdown(wait=False, cancel_futures=True)
+            self._pool_threads = self._pool_processos = None
@@ -0,0 +1,47 @@
+"""Mede quantas verificações de login por segundo o serviço de autenticação sustenta.
+
+Compara a verificação em série (como se fosse feita na thread da interface) com a
+verificação concorrente pelo ServicoAutenticacao, que usa um pool de processos.
+
+Uso: python bench_autenticacao.py [quantidade_de_logins]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from autenticacao import ServicoAutenticacao, conferir_senha, gerar_hash
+
+
+def medir(nome, verificar, pares):
+    inicio = time.perf_counter()
+    aceitos = verificar(pares)
+    segundos = time.perf_counter() - inicio
+    print(f"{nome:11} {len(pares):>6} logins  {aceitos:>6} aceitos  {segundos:8.2f} s  {len(pares) / segundos:>8.1f} logins/s")
+
+
+def em_serie(pares):
+    return sum(conferir_senha(senha, armazenada) for senha, armazenada in pares)
+
+
+def concorrente(pares):
+    servico = ServicoAutenticacao()
+    try:
+        futuros = [servico.verificar(senha, armazenada) for senha, armazenada in pares]
+        return sum(futuro.result() for futuro in futuros)
+    finally:
+        servico.encerrar()
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    armazenada = gerar_hash('senha')
+    # Metade das tentativas com a senha certa, metade errada
+    pares = [('senha' if i % 2 == 0 else 'errada', armazenada) for i in range(quantidade)]
+    print(f"{os.cpu_count()} núcleos")
+    medir('em série', em_serie, pares)
+    medir('concorrente', concorrente, pares)
+
+
+if __name__ == '__main__':
+    main()
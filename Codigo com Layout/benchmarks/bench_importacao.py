@@ -0,0 +1,43 @@
+"""Mede a vazão (registros/s) da importação em lote de usuários, nos backends JSON e SQLite.
+
+Uso: python bench_importacao.py [quantidade_de_registros]
+"""
+import csv
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from armazenamento import ArmazenamentoJSON, ArmazenamentoSQLite
+from importacao import importar
+
+
+def gerar_csv(caminho, quantidade, semente=42):
+    aleatorio = random.Random(semente)
+    with open(caminho, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(['username', 'senha', 'nome', 'idade', 'endereco', 'pessoas_casa', 'renda', 'profissao'])
+        for i in range(quantidade):
+            escritor.writerow([f'usuario{i}', 'senha', f'Pessoa {i}', aleatorio.randint(10, 90), f'Rua {aleatorio.randint(1, 5000)}, {i}',
+                               aleatorio.randint(1, 8), round(aleatorio.uniform(0, 6000), 2), aleatorio.choice(['Agricultor', 'Professor', 'Autônomo'])])
+
+
+def medir(nome, armazenamento, caminho):
+    usuarios = armazenamento.carregar_tabela('usuarios')
+    resultado = importar(caminho, 'usuarios', usuarios, armazenamento.registrar_lote)
+    armazenamento.fechar()
+    print(f"{nome:8} {resultado.importados:>9} importados  {resultado.segundos:8.2f} s  {resultado.registros_por_segundo:>10.0f} registros/s")
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'usuarios.csv')
+        gerar_csv(caminho, quantidade)
+        medir('json', ArmazenamentoJSON(os.path.join(pasta, 'u.json'), os.path.join(pasta, 'l.json'), os.path.join(pasta, 'd.jsonl')), caminho)
+        medir('sqlite', ArmazenamentoSQLite(os.path.join(pasta, 'cadastro.db')), caminho)
+
+
+if __name__ == '__main__':
+    main()
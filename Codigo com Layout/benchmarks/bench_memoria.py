@@ -0,0 +1,64 @@
+"""Compara a memória por registro de dicts comuns e dos registros compactos (registros.py).
+
+Os registros são gerados, gravados em JSON e lidos de volta, como acontece ao carregar o cadastro,
+para que as strings repetidas (mensagem, prazo, profissão...) venham duplicadas do arquivo.
+
+Uso: python bench_memoria.py [quantidade_de_registros]
+"""
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import regras
+from registros import converter_tabela
+
+
+def gerar_json(tabela, quantidade, semente=42):
+    aleatorio = random.Random(semente)
+    registros = {}
+    for i in range(quantidade):
+        endereco = f'Rua {aleatorio.randint(1, 500)}'
+        if tabela == 'usuarios':
+            registro = regras.montar_usuario(f'Pessoa {i}', aleatorio.randint(10, 90), endereco, aleatorio.randint(1, 8),
+                                             round(aleatorio.uniform(0, 6000), 2), aleatorio.choice(['Agricultor', 'Professor', 'Autônomo']),
+                                             senha='pbkdf2_sha256$200000$' + '%032x' % aleatorio.getrandbits(128))
+            registro['local_designado'] = f'Local {aleatorio.randint(1, 200)}'
+            registro['prazo_comparecimento'] = f'2026-11-{aleatorio.randint(1, 28):02d}'
+        else:
+            registro = regras.montar_local(f'Local {i}', endereco, f'Responsável {i}', f'9{i:08d}',
+                                           aleatorio.randint(1, 20), round(aleatorio.uniform(10, 500), 1))
+        registros[f'{tabela}{i}'] = dict(registro)
+    return json.dumps(registros)
+
+
+def medir(texto, converter):
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    dados = json.loads(texto)
+    if converter:
+        converter(dados)
+    segundos = time.perf_counter() - inicio
+    gc.collect()
+    usado, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return usado / len(dados), segundos, dados
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for tabela in ('usuarios', 'locais'):
+        texto = gerar_json(tabela, quantidade)
+        antes, segundos_antes, _ = medir(texto, None)
+        depois, segundos_depois, _ = medir(texto, lambda dados: converter_tabela(tabela, dados))
+        print(f"{tabela:8} dict: {antes:7.0f} bytes/registro ({segundos_antes:5.2f} s)   "
+              f"compacto: {depois:7.0f} bytes/registro ({segundos_depois:5.2f} s)   economia: {1 - depois / antes:5.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Snapshot particionado (snapshot_particionado.py): tempo de carga por quantidade de processos.
+
+Gera um cadastro, grava usuarios.json e o mesmo cadastro em partes, e compara a carga do JSON
+inteiro (json.load + converter_tabela, como o formato 'json') com a carga das partes usando
+1, 2, 4... processos, até o número de núcleos. Mede também a compactação depois de alterar
+poucos registros, que só reescreve as partes deles.
+
+Uso: python bench_particoes.py [quantidade_de_usuarios] [particoes]
+"""
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from armazenamento import escrever_json_atomico
+from gerador import gerar_cadastro
+from registros import converter_tabela
+from snapshot_particionado import PARTICOES, carregar_particoes, gravar_particoes
+
+ALTERADOS = 10 # Registros alterados antes da gravação parcial
+
+
+def cronometrar(funcao, *argumentos, **nomeados):
+    inicio = time.perf_counter()
+    resultado = funcao(*argumentos, **nomeados)
+    return resultado, time.perf_counter() - inicio
+
+
+def carregar_json(caminho):
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return converter_tabela('usuarios', json.load(f))
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    particoes = int(sys.argv[2]) if len(sys.argv) > 2 else PARTICOES
+    nucleos = os.cpu_count() or 1
+    usuarios, _ = gerar_cadastro(quantidade)
+    pasta = tempfile.mkdtemp(prefix='bench_particoes_')
+    try:
+        arquivo = os.path.join(pasta, 'usuarios.json')
+        partes = os.path.join(pasta, 'usuarios.partes')
+        escrever_json_atomico(arquivo, usuarios)
+        print(f"{quantidade} usuários, {os.path.getsize(arquivo) / 2 ** 20:.0f} MB em JSON, {particoes} partes, {nucleos} núcleo(s)")
+
+        _, segundos = cronometrar(gravar_particoes, partes, 'usuarios', usuarios, particoes=particoes, processos=1)
+        print(f"Gravação de todas as partes, 1 processo: {segundos:6.2f} s")
+        if nucleos > 1:
+            _, segundos = cronometrar(gravar_particoes, partes, 'usuarios', usuarios, processos=nucleos)
+            print(f"Gravação de todas as partes, {nucleos} processos: {segundos:6.2f} s")
+
+        _, base = cronometrar(carregar_json, arquivo)
+        print(f"JSON inteiro:             {base:6.2f} s")
+        processos = 1
+        while True:
+            carregados, segundos = cronometrar(carregar_particoes, partes, 'usuarios', processos=processos)
+            assert len(carregados) == quantidade
+            print(f"Partes, {processos:3d} processo(s): {segundos:6.2f} s  ({base / segundos:4.1f}x o JSON inteiro)")
+            if processos >= nucleos:
+                break
+            processos = min(processos * 2, nucleos)
+
+        aleatorio = random.Random(42)
+        alterados = aleatorio.sample(sorted(usuarios), ALTERADOS)
+        for username in alterados:
+            usuarios[username]['renda'] = round(aleatorio.uniform(0, 6000), 2)
+        reescritas, segundos = cronometrar(gravar_particoes, partes, 'usuarios', usuarios, alterados)
+        print(f"{ALTERADOS} usuários alterados: {reescritas} parte(s) reescrita(s) em {segundos:.2f} s")
+        _, segundos = cronometrar(escrever_json_atomico, arquivo, usuarios)
+        print(f"Mesma gravação no JSON inteiro: {segundos:.2f} s")
+    finally:
+        shutil.rmtree(pasta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Busca do local mais próximo (geografia.py): consultas por segundo e alocação do cadastro inteiro.
+
+Compara a GradeEspacial com a comparação contra todos os locais e mede alocar_todos() com
+usuários e locais espalhados numa região do tamanho de uma região metropolitana.
+
+Uso: python bench_proximidade.py [quantidade_de_locais] [quantidade_de_usuarios]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from alocacao import Alocador
+from geografia import GradeEspacial, distancia_km
+
+REGIAO = ((-24.0, -23.3), (-47.0, -46.2)) # (latitudes, longitudes)
+CONSULTAS = 20000
+AMOSTRA_FORCA_BRUTA = 500
+
+
+def ponto(aleatorio):
+    return aleatorio.uniform(*REGIAO[0]), aleatorio.uniform(*REGIAO[1])
+
+
+def main():
+    quantidade_locais = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    quantidade_usuarios = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    aleatorio = random.Random(42)
+    pontos_locais = {f"Local {i}": ponto(aleatorio) for i in range(quantidade_locais)}
+    consultas = [ponto(aleatorio) for _ in range(CONSULTAS)]
+
+    grade = GradeEspacial()
+    inicio = time.perf_counter()
+    for nome, coordenadas in pontos_locais.items():
+        grade.definir(nome, coordenadas)
+    print(f"{quantidade_locais} locais na grade em {time.perf_counter() - inicio:.3f} s")
+
+    inicio = time.perf_counter()
+    resultados = [grade.mais_proximos(*consulta) for consulta in consultas]
+    segundos = time.perf_counter() - inicio
+    print(f"Grade:        {CONSULTAS / segundos:10,.0f} consultas/s ({segundos / CONSULTAS * 1000:.3f} ms cada)")
+
+    inicio = time.perf_counter()
+    forca_bruta = [min((distancia_km(*consulta, *coordenadas), nome) for nome, coordenadas in pontos_locais.items())
+                   for consulta in consultas[:AMOSTRA_FORCA_BRUTA]]
+    segundos = time.perf_counter() - inicio
+    print(f"Força bruta:  {AMOSTRA_FORCA_BRUTA / segundos:10,.0f} consultas/s ({segundos / AMOSTRA_FORCA_BRUTA * 1000:.3f} ms cada)")
+    if [nome for _, nome in forca_bruta] != [resultado[0][1] for resultado in resultados[:AMOSTRA_FORCA_BRUTA]]:
+        print("  resultados diferentes entre a grade e a força bruta!")
+
+    locais = {nome: {'endereco': nome, 'apto': "Sim", 'capacidade_producao': float(aleatorio.choice((1000, 5000, 20000))),
+                     'latitude': latitude, 'longitude': longitude}
+              for nome, (latitude, longitude) in pontos_locais.items()}
+    usuarios = {}
+    for i in range(quantidade_usuarios):
+        latitude, longitude = ponto(aleatorio)
+        usuarios[f"usuario{i}"] = {'endereco': f"Rua {i}", 'apto': True, 'registrado': True, 'local_designado': "N/A",
+                                   'prazo_comparecimento': "N/A", 'latitude': latitude, 'longitude': longitude}
+    inicio = time.perf_counter()
+    designacoes = Alocador().alocar_todos(usuarios, locais, redistribuir=True)
+    segundos = time.perf_counter() - inicio
+    alocados = sum(designacao is not None for designacao in designacoes.values())
+    print(f"alocar_todos: {quantidade_usuarios} usuários ({alocados} com vaga) em {segundos:.2f} s "
+          f"({quantidade_usuarios / segundos:,.0f} usuários/s)")
+
+
+if __name__ == '__main__':
+    main()
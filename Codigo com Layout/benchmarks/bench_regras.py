@@ -0,0 +1,62 @@
+"""Vazão do motor de regras (motor_regras.py): registros avaliados por segundo.
+
+Compara, para cada regra (as padrão e uma mais elaborada), a avaliação registro a registro
+(a usada a cada cadastro) com a avaliação em colunas do numpy (a usada nos recálculos em lote),
+sobre registros sintéticos gerados já em colunas.
+
+Uso: python bench_regras.py [quantidade_de_registros]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import regras
+from motor_regras import Regra
+
+REGRAS_MEDIDAS = dict(regras.REGRAS_PADRAO,
+                      aptidao_elaborada="idade >= 18 and renda / pessoas_casa <= 700 and profissao not in ('Político', 'Juiz')")
+AMOSTRA_ESCALAR = 200000 # A versão registro a registro é medida numa amostra e extrapolada
+
+
+def gerar_colunas(quantidade, semente=42):
+    aleatorio = np.random.default_rng(semente)
+    return {
+        'idade': aleatorio.integers(10, 90, quantidade).astype(float),
+        'renda': np.round(aleatorio.uniform(0, 6000, quantidade), 2),
+        'pessoas_casa': aleatorio.integers(1, 9, quantidade).astype(float),
+        'profissao': aleatorio.choice(np.array(['Agricultor', 'Professor', 'Político', 'Autônomo'], dtype=object), quantidade),
+        'andares': aleatorio.integers(1, 20, quantidade).astype(float),
+        'area': np.round(aleatorio.uniform(10, 500, quantidade), 1),
+        'capacidade_producao': np.round(aleatorio.uniform(0, 20000, quantidade), 1),
+    }
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    colunas = gerar_colunas(quantidade)
+    amostra = min(quantidade, AMOSTRA_ESCALAR)
+    registros = [{campo: valores[i].item() for campo, valores in colunas.items()} for i in range(amostra)]
+
+    print(f"{quantidade} registros ({amostra} na avaliação registro a registro)")
+    for nome, expressao in REGRAS_MEDIDAS.items():
+        regra = Regra(expressao)
+        inicio = time.perf_counter()
+        escalar = [regra(registro) for registro in registros]
+        por_segundo_escalar = amostra / (time.perf_counter() - inicio)
+
+        regra.colunas({campo: valores[:1] for campo, valores in colunas.items()}, 1) # Compila fora da medida
+        inicio = time.perf_counter()
+        vetorial = regra.colunas(colunas, quantidade)
+        por_segundo_vetorial = quantidade / (time.perf_counter() - inicio)
+
+        if not np.array_equal(np.asarray(escalar, dtype=float), vetorial[:amostra].astype(float)):
+            print(f"  {nome}: resultados diferentes entre as duas avaliações!")
+        print(f"{nome:20} registro a registro: {por_segundo_escalar:12,.0f}/s   "
+              f"colunas: {por_segundo_vetorial:14,.0f}/s   ({por_segundo_vetorial / por_segundo_escalar:5.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Mede quantas requisições por segundo o serviço do cadastro (servico.py) atende em localhost.
+
+Gera um cadastro sintético numa pasta temporária, sobe o serviço num processo separado e abre
+várias conexões persistentes ao mesmo tempo, cada uma lendo registros (GET) ou gravando lotes
+de um registro (POST .../lote, com regras, alocação e versão conferidas no servidor).
+
+Uso: python bench_servico.py [quantidade_de_usuarios] [conexoes] [requisicoes_por_conexao]
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+PASTA_CODIGO = os.path.join(PASTA_BENCHMARKS, '..')
+sys.path.insert(0, PASTA_CODIGO)
+from gerador import gerar_cadastro, gravar_cadastro
+
+PORTA = 8799
+
+
+async def cliente(chaves, quantidade, gravar, semente):
+    """Uma conexão persistente fazendo `quantidade` requisições em sequência; devolve (ok, conflitos)."""
+    aleatorio = random.Random(semente)
+    leitor, escritor = await asyncio.open_connection('127.0.0.1', PORTA)
+    ok = conflitos = 0
+    for _ in range(quantidade):
+        chave = aleatorio.choice(chaves)
+        if gravar:
+            # Gravação cega (versão None): mede o caminho de escrita, não a taxa de conflitos
+            corpo = json.dumps({'itens': [[chave, {'senha': 'x', 'nome': f'Pessoa {chave}', 'idade': 30, 'endereco': 'Rua 1',
+                                                   'pessoas_casa': 2, 'renda': float(aleatorio.randint(500, 4000)),
+                                                   'profissao': 'Agricultor', 'registrado': True}, None]]}).encode()
+            escritor.write(b'POST /usuarios/lote HTTP/1.1\r\nHost: localhost\r\nContent-Length: %d\r\n\r\n%s' % (len(corpo), corpo))
+        else:
+            escritor.write(f'GET /usuarios/registros/{chave} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+        status = int((await leitor.readline()).split()[1])
+        tamanho = 0
+        while True:
+            linha = await leitor.readline()
+            if linha == b'\r\n':
+                break
+            if linha.lower().startswith(b'content-length:'):
+                tamanho = int(linha.split(b':')[1])
+        await leitor.readexactly(tamanho)
+        ok += status == 200
+        conflitos += status == 409
+    escritor.close()
+    return ok, conflitos
+
+
+async def medir(nome, chaves, conexoes, quantidade, gravar):
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(cliente(chaves, quantidade, gravar, semente) for semente in range(conexoes)))
+    segundos = time.perf_counter() - inicio
+    total = conexoes * quantidade
+    ok = sum(r[0] for r in resultados)
+    print(f"{nome:9} {conexoes:>4} conexões  {total:>7} requisições  {ok:>7} ok  {segundos:7.2f} s  {total / segundos:>9.0f} req/s")
+
+
+def esperar_servico(processo):
+    for _ in range(600):
+        if processo.poll() is not None:
+            raise RuntimeError(f"O serviço terminou ao iniciar: {processo.stderr.read()}")
+        try:
+            socket.create_connection(('127.0.0.1', PORTA)).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("O serviço não respondeu a tempo.")
+
+
+def main():
+    quantidade_usuarios = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    conexoes = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    requisicoes = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    with tempfile.TemporaryDirectory() as pasta:
+        usuarios, locais = gerar_cadastro(quantidade_usuarios)
+        gravar_cadastro(pasta, usuarios, locais)
+        chaves = list(usuarios)
+        del usuarios, locais
+        processo = subprocess.Popen([sys.executable, os.path.join(PASTA_CODIGO, 'servico.py'), '--porta', str(PORTA)],
+                                    cwd=pasta, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        try:
+            esperar_servico(processo)
+            print(f"{quantidade_usuarios} usuários no cadastro")
+            asyncio.run(medir('leitura', chaves, conexoes, requisicoes, gravar=False))
+            asyncio.run(medir('gravação', chaves, conexoes, requisicoes, gravar=True))
+        finally:
+            processo.terminate()
+            processo.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Gerador reprodutível de cadastros sintéticos, no mesmo formato gravado pelo programa.
+
+Uso: python gerador.py quantidade_de_usuarios [quantidade_de_locais] [pasta_de_saida]
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import regras
+from alocacao import Alocador, aplicar_designacao
+from armazenamento import escrever_json_atomico
+from autenticacao import gerar_hash
+from registros import Usuario
+
+SEMENTE = 42
+PROFISSOES = ('Agricultor', 'Professor', 'Autônomo', 'Comerciante', 'Pedreiro', 'Cozinheira', 'Motorista', 'Enfermeira')
+PRIMEIROS_NOMES = ('Ana', 'João', 'Maria', 'José', 'Francisca', 'Antônio', 'Luíza', 'Carlos', 'Paulo', 'Beatriz', 'Pedro', 'Fernanda')
+SOBRENOMES = ('Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Rodrigues', 'Almeida', 'Gonçalves')
+FRACAO_NAO_REGISTRADOS = 0.05 # Usuários que criaram a conta mas não preencheram os dados
+
+
+def quantidade_padrao_de_locais(quantidade_usuarios):
+    return max(10, quantidade_usuarios // 50)
+
+
+def gerar_cadastro(quantidade_usuarios, quantidade_locais=None, semente=SEMENTE):
+    """Gera (usuarios, locais) com aptidão, capacidade, local designado e prazo já calculados.
+
+    A mesma semente sempre produz o mesmo cadastro (exceto as datas de prazo, relativas a hoje).
+    """
+    if quantidade_locais is None:
+        quantidade_locais = quantidade_padrao_de_locais(quantidade_usuarios)
+    aleatorio = random.Random(semente)
+    ruas = max(10, quantidade_usuarios // 20) # Vários usuários por rua, para haver locais no mesmo endereço
+    senha = gerar_hash('senha', iteracoes=1000) # Um único hash barato: login não é medido aqui
+
+    locais = {}
+    for i in range(quantidade_locais):
+        nome_local = f'Local {i}'
+        locais[nome_local] = regras.montar_local(nome_local, f'Rua {aleatorio.randint(1, ruas)}', f'Responsável {i}',
+                                                 f'(11) 9{aleatorio.randint(0, 99999999):08d}', aleatorio.randint(1, 20),
+                                                 round(aleatorio.uniform(10, 500), 1))
+
+    usuarios = {}
+    for i in range(quantidade_usuarios):
+        username = f'usuario{i}'
+        if aleatorio.random() < FRACAO_NAO_REGISTRADOS:
+            usuarios[username] = Usuario(senha=senha, registrado=False)
+            continue
+        nome = f'{aleatorio.choice(PRIMEIROS_NOMES)} {aleatorio.choice(SOBRENOMES)} {i}'
+        usuarios[username] = regras.montar_usuario(nome, aleatorio.randint(14, 90), f'Rua {aleatorio.randint(1, ruas)}',
+                                                   aleatorio.randint(1, 8), round(aleatorio.uniform(1, 6000), 2),
+                                                   aleatorio.choice(PROFISSOES), senha=senha)
+
+    for username, designacao in Alocador().alocar_todos(usuarios, locais).items():
+        aplicar_designacao(usuarios[username], designacao)
+    return usuarios, locais
+
+
+def gravar_cadastro(pasta, usuarios, locais):
+    """Grava os snapshots usuarios.json e locais.json, como o backend JSON faz na compactação."""
+    escrever_json_atomico(os.path.join(pasta, 'usuarios.json'), usuarios)
+    escrever_json_atomico(os.path.join(pasta, 'locais.json'), locais)
+
+
+def main():
+    quantidade_usuarios = int(sys.argv[1])
+    quantidade_locais = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    pasta = sys.argv[3] if len(sys.argv) > 3 else '.'
+    usuarios, locais = gerar_cadastro(quantidade_usuarios, quantidade_locais)
+    gravar_cadastro(pasta, usuarios, locais)
+    print(f"{len(usuarios)} usuários e {len(locais)} locais gravados em {os.path.abspath(pasta)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""Suíte de benchmarks do crud_layout, com resultados em JSON para comparar versões.
+
+Para cada tamanho, um processo separado gera um cadastro sintético (gerador.py, com semente
+fixa), grava os snapshots numa pasta temporária e mede, sobre o código de crud_layout:
+carregar_dados, as regras sobre o cadastro inteiro, adicionar/atualizar/remover, salvar_dados,
+a compactação completa e o preenchimento das tabelas da interface numa janela Tk oculta.
+
+Uso:
+    python suite.py [--tamanhos 1000 100000 1000000] [--armazenamento json binario particionado sqlite]
+                    [--saida resultados.json] [--comparar resultados_anteriores.json]
+
+Sem tela (servidor, CI), rode com xvfb-run para medir também a interface; sem ela, as medidas
+de Tk saem como indisponíveis e o restante é medido normalmente.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import islice
+
+PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+PASTA_CODIGO = os.path.join(PASTA_BENCHMARKS, '..')
+sys.path.insert(0, PASTA_CODIGO)
+sys.path.insert(0, PASTA_BENCHMARKS)
+
+TAMANHOS = (1000, 100000, 1000000)
+OPERACOES = 1000 # Adições, atualizações e remoções medidas em cada tabela
+LIMIAR_REGRESSAO = 1.10 # Mais de 10% mais lento que a referência é apontado na comparação
+
+
+def cronometrar(funcao, *args):
+    inicio = time.perf_counter()
+    funcao(*args)
+    return time.perf_counter() - inicio
+
+
+def memoria_maxima_mb():
+    try:
+        import resource
+    except ImportError:
+        return None # Windows
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# --- Medição (roda no processo filho) ---
+def medir_cadastro(quantidade_usuarios, quantidade_locais, armazenamento, semente, pasta):
+    from gerador import gerar_cadastro, gravar_cadastro
+
+    medidas = {}
+    inicio = time.perf_counter()
+    usuarios, locais = gerar_cadastro(quantidade_usuarios, quantidade_locais, semente)
+    gravar_cadastro(pasta, usuarios, locais)
+    medidas['gerar_cadastro_s'] = time.perf_counter() - inicio
+    del usuarios, locais
+    gc.collect()
+    if armazenamento == 'binario':
+        # Convertidos antes, como numa instalação que já usa o formato: carregar_dados mede a partida a frio
+        from snapshot_binario import EXTENSAO, converter
+        inicio = time.perf_counter()
+        for tabela in ('usuarios', 'locais'):
+            converter(os.path.join(pasta, tabela + '.json'), os.path.join(pasta, tabela + EXTENSAO), tabela)
+        medidas['converter_snapshot_s'] = time.perf_counter() - inicio
+    elif armazenamento == 'particionado':
+        from snapshot_particionado import EXTENSAO, gravar_particoes
+        inicio = time.perf_counter()
+        for tabela in ('usuarios', 'locais'):
+            with open(os.path.join(pasta, tabela + '.json'), 'r', encoding='utf-8') as f:
+                gravar_particoes(os.path.join(pasta, tabela + EXTENSAO), tabela, json.load(f))
+        medidas['converter_snapshot_s'] = time.perf_counter() - inicio
+
+    # crud_layout usa caminhos relativos e lê o tipo de armazenamento ao ser importado
+    os.chdir(pasta)
+    os.environ['CRUD_ARMAZENAMENTO'] = armazenamento
+    inicio = time.perf_counter()
+    import crud_layout as app
+    app.iniciar_armazenamento()
+    medidas['importar_modulo_s'] = time.perf_counter() - inicio # No SQLite, inclui a importação dos JSON
+
+    medidas['carregar_dados_s'] = cronometrar(app.carregar_dados)
+
+    def verificar_todos():
+        for dados in app.usuarios.values():
+            if dados.get('registrado', True):
+                app.verificar_aptidao_usuario(dados)
+
+    def calcular_todos():
+        for dados in app.locais.values():
+            app.calcular_capacidade_producao(dados)
+
+    medidas['verificar_aptidao_usuario_todos_s'] = cronometrar(verificar_todos)
+    medidas['calcular_capacidade_producao_todos_s'] = cronometrar(calcular_todos)
+    medidas['recalcular_cadastro_s'] = cronometrar(app.recalcular_cadastro)
+
+    medidas.update(medir_operacoes(app))
+    medidas['salvar_dados_s'] = cronometrar(app.salvar_dados) # Grava o que as operações deixaram pendente
+    medidas['compactar_completo_s'] = cronometrar(app.armazenamento.compactar, {'usuarios': app.usuarios, 'locais': app.locais}, True)
+    medidas.update(medir_interface(app))
+
+    app.gravador.encerrar()
+    app.servico_autenticacao.encerrar()
+    medidas['memoria_maxima_mb'] = memoria_maxima_mb()
+    return medidas
+
+
+def medir_operacoes(app):
+    """Mesmo caminho dos handlers da interface (montar, alterar o registro, registrar), sem os widgets."""
+    medidas = {}
+    quantidade = min(OPERACOES, max(1, len(app.usuarios) // 10))
+    existentes = list(islice((username for username, dados in app.usuarios.items() if dados.get('registrado', True)), quantidade))
+    novos = [f'benchmark{i}' for i in range(quantidade)]
+
+    def adicionar_usuarios():
+        for i, username in enumerate(novos):
+            app.usuarios[username] = app.montar_usuario(f'Pessoa {i}', 20 + i % 50, f'Rua {i}', 3, 1000 + i, 'Agricultor', senha='x')
+            app.registrar_alteracao('usuarios', username)
+
+    def atualizar_usuarios():
+        for i, username in enumerate(existentes):
+            dados = app.usuarios[username]
+            dados['renda'] = float(500 + i % 3000)
+            dados['apto'] = app.verificar_aptidao_usuario(dados)
+            app.registrar_alteracao('usuarios', username)
+
+    def remover_usuarios():
+        for username in novos:
+            del app.usuarios[username]
+            app.registrar_alteracao('usuarios', username)
+
+    for nome, funcao, total in (('adicionar_usuario', adicionar_usuarios, len(novos)),
+                                ('atualizar_usuario', atualizar_usuarios, len(existentes)),
+                                ('remover_usuario', remover_usuarios, len(novos))):
+        medidas[f'{nome}_us'] = cronometrar(funcao) / max(1, total) * 1e6
+
+    nomes_locais = [f'Local benchmark {i}' for i in range(min(quantidade, 100))]
+
+    def adicionar_locais():
+        for i, nome_local in enumerate(nomes_locais):
+            app.locais[nome_local] = app.montar_local(nome_local, f'Rua {i}', 'Responsável', '(11) 90000-0000', 5, 200)
+            app.registrar_alteracao('locais', nome_local)
+
+    def atualizar_locais():
+        for nome_local in nomes_locais:
+            dados = app.locais[nome_local]
+            dados['andares'] += 1
+            dados['capacidade_producao'] = app.calcular_capacidade_producao(dados)
+            dados['apto'] = app.avaliar_local(dados)
+            app.registrar_alteracao('locais', nome_local)
+
+    def remover_locais():
+        for nome_local in nomes_locais:
+            del app.locais[nome_local]
+            app.registrar_alteracao('locais', nome_local)
+
+    for nome, funcao in (('adicionar_local', adicionar_locais), ('atualizar_local', atualizar_locais), ('remover_local', remover_locais)):
+        medidas[f'{nome}_us'] = cronometrar(funcao) / len(nomes_locais) * 1e6
+    return medidas
+
+
+def medir_interface(app):
+    """Preenche as tabelas de usuários e locais numa janela oculta."""
+    import tkinter
+    try:
+        inicio = time.perf_counter()
+        janela = app.App() # Chama carregar_dados de novo, como na abertura do programa
+        janela.withdraw()
+        medidas = {'abrir_interface_s': time.perf_counter() - inicio}
+    except tkinter.TclError as erro:
+        return {'interface': f"indisponível: {erro}"}
+
+    def preencher(popular, tabela):
+        popular()
+        janela.update_idletasks()
+        tabela.proxima_pagina()
+        janela.update_idletasks()
+
+    medidas['populate_user_tree_s'] = cronometrar(preencher, janela.populate_user_tree, janela.tabela_usuarios)
+    medidas['populate_local_tree_s'] = cronometrar(preencher, janela.populate_local_tree, janela.tabela_locais)
+    janela.destroy()
+    return medidas
+
+
+# --- Execução e comparação (processo principal) ---
+def versao_do_codigo():
+    try:
+        saida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PASTA_CODIGO, capture_output=True, text=True, check=True)
+        return saida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar_tamanho(quantidade_usuarios, quantidade_locais, armazenamento, semente):
+    """Mede um tamanho num processo novo, para que um não influencie a memória e o cache do outro."""
+    comando = [sys.executable, os.path.abspath(__file__), '--medir', str(quantidade_usuarios), str(quantidade_locais), armazenamento, str(semente)]
+    processo = subprocess.run(comando, capture_output=True, text=True)
+    if processo.returncode != 0:
+        return {'erro': processo.stderr.strip().splitlines()[-1] if processo.stderr.strip() else f"código {processo.returncode}"}
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+def comparar(atual, referencia):
+    """Mostra, para cada medida em comum, a razão atual/referência e aponta as regressões."""
+    anteriores = {(r['usuarios'], r['armazenamento']): r['medidas'] for r in referencia['resultados']}
+    print(f"\nComparação com {referencia.get('versao')} ({referencia.get('data')}):")
+    for resultado in atual['resultados']:
+        base = anteriores.get((resultado['usuarios'], resultado['armazenamento']))
+        if base is None:
+            continue
+        print(f"  {resultado['usuarios']} usuários, {resultado['armazenamento']}:")
+        for nome, valor in resultado['medidas'].items():
+            anterior = base.get(nome)
+            if not isinstance(valor, (int, float)) or not isinstance(anterior, (int, float)) or not anterior:
+                continue
+            razao = valor / anterior
+            marca = "  <-- regressão" if razao > LIMIAR_REGRESSAO else ""
+            print(f"    {nome:40} {anterior:12.4f} -> {valor:12.4f}  ({razao:5.2f}x){marca}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=list(TAMANHOS), help="quantidades de usuários")
+    parser.add_argument('--locais', type=int, help="quantidade de locais (padrão: 1 para cada 50 usuários)")
+    parser.add_argument('--armazenamento', nargs='+', default=['json'], choices=['json', 'binario', 'particionado', 'sqlite'])
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default='resultados.json')
+    parser.add_argument('--comparar', help="arquivo JSON de uma execução anterior")
+    parser.add_argument('--medir', nargs=4, help=argparse.SUPPRESS) # Uso interno: processo filho
+    argumentos = parser.parse_args()
+
+    if argumentos.medir:
+        quantidade_usuarios, quantidade_locais, armazenamento, semente = argumentos.medir
+        with tempfile.TemporaryDirectory() as pasta:
+            medidas = medir_cadastro(int(quantidade_usuarios), int(quantidade_locais), armazenamento, int(semente), pasta)
+            os.chdir(PASTA_BENCHMARKS) # Sai da pasta antes de apagá-la
+        print(json.dumps(medidas))
+        return
+
+    from gerador import quantidade_padrao_de_locais
+    resultados = []
+    for armazenamento in argumentos.armazenamento:
+        for quantidade in argumentos.tamanhos:
+            quantidade_locais = argumentos.locais or quantidade_padrao_de_locais(quantidade)
+            print(f"{armazenamento}: {quantidade} usuários, {quantidade_locais} locais...", flush=True)
+            medidas = executar_tamanho(quantidade, quantidade_locais, armazenamento, argumentos.semente)
+            for nome, valor in medidas.items():
+                print(f"  {nome:40} {valor:.4f}" if isinstance(valor, float) else f"  {nome:40} {valor}")
+            resultados.append({'usuarios': quantidade, 'locais': quantidade_locais, 'armazenamento': armazenamento, 'medidas': medidas})
+
+    relatorio = {
+        'versao': versao_do_codigo(),
+        'data': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'semente': argumentos.semente,
+        'resultados': resultados,
+    }
+    with open(argumentos.saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=4, ensure_ascii=False)
+    print(f"\nResultados gravados em {argumentos.saida}")
+
+    if argumentos.comparar:
+        with open(argumentos.comparar, 'r', encoding='utf-8') as f:
+            comparar(relatorio, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""Cliente do serviço do cadastro (servico.py), com a mesma interface dos armazenamentos locais.
+
+As tabelas remotas se comportam como dicionários: registros lidos ficam em cache junto com a
+versão em que foram lidos, e essa versão vai junto em cada gravação. Se outro operador alterou
+o registro antes, a gravação é recusada com ConflitoRemoto e o registro sai do cache.
+Os usuários chegam sem a senha; o login é conferido pelo serviço (conferir_senha). Com
+CRUD_TOKEN definido, ele vai em todas as requisições.
+"""
+import http.client
+import json
+import os
+from collections.abc import MutableMapping
+from urllib.parse import quote, urlencode, urlsplit
+
+from armazenamento import ConflitoVersao
+from registros import TIPOS_REGISTRO, Registro
+
+URL_PADRAO = 'http://127.0.0.1:8765'
+TAMANHO_PAGINA_REMOTA = 1000 # Registros por requisição ao percorrer uma tabela inteira
+TEMPO_LIMITE = 30 # Segundos
+
+
+class ErroRemoto(Exception):
+    """O serviço recusou a requisição ou respondeu com erro."""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class ConflitoRemoto(ErroRemoto, ConflitoVersao):
+    """O serviço recusou a gravação: outro operador alterou o registro depois que ele foi lido."""
+
+
+class ClienteServico:
+    """Conexão HTTP persistente com o serviço; reconecta uma vez se ela tiver caído."""
+
+    def __init__(self, url=URL_PADRAO, token=None):
+        partes = urlsplit(url)
+        self.endereco = partes.hostname or '127.0.0.1'
+        self.porta = partes.port or 80
+        self.conexao = None
+        token = token or os.environ.get('CRUD_TOKEN')
+        self._cabecalhos = {'Authorization': f'Bearer {token}'} if token else {}
+
+    def requisitar(self, metodo, caminho, corpo=None):
+        dados = json.dumps(corpo, ensure_ascii=False, default=Registro.para_dict).encode('utf-8') if corpo is not None else None
+        cabecalhos = dict(self._cabecalhos)
+        if dados is not None:
+            cabecalhos['Content-Type'] = 'application/json'
+        for tentativa in (1, 2):
+            if self.conexao is None:
+                self.conexao = http.client.HTTPConnection(self.endereco, self.porta, timeout=TEMPO_LIMITE)
+            try:
+                self.conexao.request(metodo, caminho, body=dados, headers=cabecalhos)
+                resposta = self.conexao.getresponse()
+                status, conteudo = resposta.status, resposta.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                self.conexao.close()
+                self.conexao = None
+                if tentativa == 2:
+                    raise
+        resultado = json.loads(conteudo) if conteudo else {}
+        if status == 409:
+            raise ConflitoRemoto(status, resultado.get('erro', "Conflito de versão."))
+        if status >= 400:
+            raise ErroRemoto(status, resultado.get('erro', f"Erro {status} do serviço."))
+        return resultado
+
+    def fechar(self):
+        if self.conexao is not None:
+            self.conexao.close()
+            self.conexao = None
+
+
+class TabelaRemota(MutableMapping):
+    """Tabela do serviço vista como dicionário; escritas só saem em ArmazenamentoRemoto.registrar_lote."""
+
+    def __init__(self, cliente, tabela):
+        self.cliente = cliente
+        self.tabela = tabela
+        self._tipo = TIPOS_REGISTRO[tabela]
+        self._cache = {}
+        self.versoes = {} # Versão lida de cada chave; 0 = registro novo, ainda não gravado
+        self._caminho = '/' + quote(tabela, safe='')
+
+    def _guardar(self, chave, dados, versao):
+        registro = self._cache.get(chave)
+        if registro is None:
+            registro = self._cache[chave] = self._tipo(dados)
+        else:
+            # Mantém a identidade do objeto que a interface pode estar usando
+            registro.clear()
+            registro.update(dados)
+        self.versoes[chave] = versao
+        return registro
+
+    def descartar(self, chave):
+        self._cache.pop(chave, None)
+        self.versoes.pop(chave, None)
+
+    def __getitem__(self, chave):
+        registro = self._cache.get(chave)
+        if registro is not None:
+            return registro
+        try:
+            resposta = self.cliente.requisitar('GET', f"{self._caminho}/registros/{quote(chave, safe='')}")
+        except ErroRemoto as erro:
+            if erro.status == 404:
+                raise KeyError(chave)
+            raise
+        return self._guardar(chave, resposta['dados'], resposta['versao'])
+
+    def __contains__(self, chave):
+        try:
+            self[chave]
+        except KeyError:
+            return False
+        return True
+
+    def __setitem__(self, chave, registro):
+        self._cache[chave] = registro
+        self.versoes.setdefault(chave, 0)
+
+    def __delitem__(self, chave):
+        self[chave] # Garante a versão lida, que vai junto no pedido de remoção
+        del self._cache[chave]
+
+    def buscar_varios(self, chaves):
+        """Traz ao cache, numa só requisição, a versão atual dos registros (com o que outros operadores alteraram)."""
+        if not chaves:
+            return
+        registros = self.cliente.requisitar('POST', f"{self._caminho}/varios", {'chaves': list(chaves)})['registros']
+        for chave in chaves:
+            item = registros.get(chave)
+            if item is None:
+                self.descartar(chave) # Removido por outro operador
+            else:
+                self._guardar(chave, item['dados'], item['versao'])
+
+    def chaves_pagina(self, inicio, quantidade):
+        parametros = urlencode({'inicio': inicio, 'quantidade': quantidade})
+        return self.cliente.requisitar('GET', f"{self._caminho}?{parametros}")['chaves']
+
+    def chaves_ordenadas(self, campo, inicio, quantidade, decrescente=False):
+        parametros = urlencode({'campo': campo or '', 'inicio': inicio, 'quantidade': quantidade, 'decrescente': int(decrescente)})
+        return self.cliente.requisitar('GET', f"{self._caminho}/ordem?{parametros}")['chaves']
+
+    def consultar(self, **condicoes):
+        return set(self.cliente.requisitar('POST', f"{self._caminho}/consulta", {'condicoes': condicoes})['chaves'])
+
+    def buscar(self, texto):
+        return self.cliente.requisitar('GET', f"{self._caminho}/busca?{urlencode({'texto': texto})}")['chaves']
+
+    def __iter__(self):
+        inicio = 0
+        while True:
+            chaves = self.chaves_pagina(inicio, TAMANHO_PAGINA_REMOTA)
+            yield from chaves
+            if len(chaves) < TAMANHO_PAGINA_REMOTA:
+                break
+            inicio += len(chaves)
+
+    def items(self):
+        """Percorre a tabela trazendo uma página de registros por requisição."""
+        inicio = 0
+        while True:
+            parametros = urlencode({'inicio': inicio, 'quantidade': TAMANHO_PAGINA_REMOTA})
+            registros = self.cliente.requisitar('GET', f"{self._caminho}/pagina?{parametros}")['registros']
+            for chave, item in registros.items():
+                yield chave, self._guardar(chave, item['dados'], item['versao'])
+            if len(registros) < TAMANHO_PAGINA_REMOTA:
+                break
+            inicio += len(registros)
+
+    def itens_sem_guardar(self):
+        """Como items(), mas os registros trazidos não ficam no cache (exportação de tabelas grandes)."""
+        inicio = 0
+        while True:
+            parametros = urlencode({'inicio': inicio, 'quantidade': TAMANHO_PAGINA_REMOTA})
+            registros = self.cliente.requisitar('GET', f"{self._caminho}/pagina?{parametros}")['registros']
+            for chave, item in registros.items():
+                yield chave, self._tipo(item['dados'])
+            if len(registros) < TAMANHO_PAGINA_REMOTA:
+                break
+            inicio += len(registros)
+
+    def values(self):
+        return (registro for _, registro in self.items())
+
+    def __len__(self):
+        return self.cliente.requisitar('GET', f"{self._caminho}?quantidade=0")['total']
+
+    def __bool__(self):
+        return bool(self.chaves_pagina(0, 1))
+
+
+class ArmazenamentoRemoto:
+    """Armazenamento cujas tabelas estão no serviço; regras, alocação e gravação em disco ficam com ele."""
+
+    def __init__(self, url=URL_PADRAO, token=None):
+        self.cliente = ClienteServico(url, token)
+        self._cliente_login = ClienteServico(url, token) # O login roda fora da thread da interface: conexão própria
+        self.tabelas = {}
+
+    def carregar_tabela(self, tabela):
+        self.tabelas[tabela] = TabelaRemota(self.cliente, tabela)
+        return self.tabelas[tabela]
+
+    def reproduzir_diario(self, tabelas):
+        pass # O diário é do serviço
+
+    def sincronizar(self, tabelas, alteradas=()):
+        return [] # As versões são conferidas pelo serviço a cada gravação
+
+    def registrar(self, tabela, chave, dados):
+        return self.registrar_lote(tabela, [(chave, dados)])
+
+    def registrar_lote(self, tabela, itens):
+        """Envia o lote com as versões lidas e aplica no cache a resposta do serviço.
+
+        Devolve (tabela, chave, registro ou None) de tudo que o serviço alterou, inclusive os
+        outros usuários realocados por causa do lote.
+        """
+        remota = self.tabelas[tabela]
+        pedido = [[chave, dados, remota.versoes.get(chave)] for chave, dados in itens]
+        try:
+            resposta = self.cliente.requisitar('POST', f"/{quote(tabela, safe='')}/lote", {'itens': pedido})
+        except ConflitoRemoto:
+            for chave, _ in itens:
+                remota.descartar(chave) # A próxima leitura traz a versão atual
+            raise
+        alterados = []
+        for nome_tabela, chave, dados, versao in resposta['alterados']:
+            tabela_alterada = self.tabelas.get(nome_tabela)
+            if tabela_alterada is None:
+                continue
+            if dados is None:
+                tabela_alterada.descartar(chave)
+                alterados.append((nome_tabela, chave, None))
+            else:
+                alterados.append((nome_tabela, chave, tabela_alterada._guardar(chave, dados, versao)))
+        return alterados
+
+    def conferir_senha(self, username, senha):
+        """Confere o login no serviço (o hash da senha não sai de lá). Bloqueia pelo tempo do PBKDF2."""
+        return self._cliente_login.requisitar('POST', '/login', {'usuario': username, 'senha': senha})['ok']
+
+    def recalcular(self):
+        return self.cliente.requisitar('POST', '/recalcular')
+
+    def redistribuir(self):
+        return self.cliente.requisitar('POST', '/redistribuir')['alterados']
+
+    def estatisticas(self):
+        return self.cliente.requisitar('GET', '/estatisticas')
+
+    def prazos(self, dias):
+        return set(self.cliente.requisitar('GET', f'/prazos?dias={int(dias)}')['chaves'])
+
+    def duplicados(self, username):
+        resposta = self.cliente.requisitar('GET', f"/duplicados?{urlencode({'usuario': username})}")
+        return [tuple(item) for item in resposta['duplicados']]
+
+    def precisa_compactar(self):
+        return False
+
+    def compactar(self, tabelas, forcar=False):
+        self.cliente.requisitar('POST', '/salvar')
+
+    def fechar(self):
+        self.cliente.fechar()
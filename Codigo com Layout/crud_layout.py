@@ -1,13 +1,37 @@
-import datetime
 import pandas as pd
-import json
 import os
+import time
 import customtkinter as ctk
-from tkinter import messagebox, ttk
+from tkinter import messagebox, ttk, filedialog
+from armazenamento import ArmazenamentoJSON, ArmazenamentoSQLite, ConflitoVersao
+from cliente import ArmazenamentoRemoto, ErroRemoto, URL_PADRAO
+from tabela_virtual import TabelaPaginada
+from regras import verificar_aptidao_usuario, calcular_capacidade_producao, avaliar_local, montar_usuario, montar_local, carregar_regras, faixas_afetadas, AGUARDANDO_VAGA
+from recalculo_lote import recalcular_usuarios, recalcular_locais
+from importacao import importar
+from exportacao import exportar, COLUNAS as COLUNAS_EXPORTACAO, SOMENTE_APTOS
+from indices import IndicesTabela, IndiceBusca, OrdenacoesTabela, consultar, ordenacao, chaves_nas_faixas
+from alocacao import Alocador, aplicar_designacao
+from estatisticas import EstatisticasCadastro, formatar_resumo, DIAS_PRAZO
+from prazos import AgendaPrazos, varrer
+from duplicados import IndiceDuplicados, verificar_cadastro
+from geografia import carregar_gazetteer, aplicar_coordenadas
+from autenticacao import ServicoAutenticacao, senha_em_texto_puro
+from gravacao import GravadorSegundoPlano
+from registros import Usuario
+from telemetria import medir
+from motor_regras import ErroRegra
+import regras
+import telemetria
 
 # --- Configurações e Variáveis Globais ---
 ARQUIVO_USUARIOS = 'usuarios.json'
 ARQUIVO_LOCAIS = 'locais.json'
+ARQUIVO_DIARIO = 'alteracoes.jsonl'
+ARQUIVO_BANCO = 'cadastro.db'
+TIPO_ARMAZENAMENTO = os.environ.get('CRUD_ARMAZENAMENTO', 'json') # 'json', 'binario', 'particionado', 'sqlite' ou 'remoto' (servico.py)
+URL_SERVICO = os.environ.get('CRUD_SERVICO', URL_PADRAO)
+JANELA_GRAVACAO = float(os.environ.get('CRUD_JANELA_GRAVACAO', '0.2')) # Segundos juntando edições antes de gravar
 
 usuarios = {}
 locais = {}
@@ -17,46 +41,326 @@ ADMIN_PASSWORD = 'admin'
 
 current_user_data = None # Para guardar o username do usuário logado
 
+# Telemetria (CRUD_TELEMETRIA=1): o tempo esperando resposta nos diálogos não conta na latência dos handlers
+messagebox = telemetria.dialogos_sem_cronometro(messagebox)
+filedialog = telemetria.dialogos_sem_cronometro(filedialog)
+
+INTERVALO_VERIFICACAO_MS = 20 # Frequência com que a interface confere tarefas em segundo plano
+INTERVALO_SINCRONIZACAO_MS = 1000 # Frequência com que a interface procura alterações feitas por outros processos
+INTERVALO_VARREDURA_MS = 60000 # Frequência da varredura dos prazos de comparecimento vencidos
+
+# Hash e verificação de senhas rodam fora da thread da interface
+servico_autenticacao = ServicoAutenticacao()
+
+# Índices secundários em memória (no backend SQLite, o próprio banco faz esse papel)
+indices = {'usuarios': IndicesTabela('usuarios'), 'locais': IndicesTabela('locais')}
+# Busca textual (prefixos de palavras), montada no primeiro uso e mantida a cada alteração
+indices_busca = {'usuarios': IndiceBusca('usuarios'), 'locais': IndiceBusca('locais')}
+# Ordem de cada coluna das listagens, montada no primeiro clique no cabeçalho e mantida a cada alteração
+ordenacoes = {'usuarios': OrdenacoesTabela(), 'locais': OrdenacoesTabela()}
+
+# Coluna das listagens -> campo do registro (None: a própria chave)
+CAMPOS_COLUNAS = {
+    'usuarios': {"Usuario": None, "Nome": 'nome', "Idade": 'idade', "Endereco": 'endereco', "Apto": 'apto'},
+    'locais': {"Nome do Local": None, "Endereço": 'endereco', "Responsável": 'responsavel', "Capacidade": 'capacidade_producao', "Apto": 'apto'},
+}
+
+# Contagens, somas e histogramas do painel de estatísticas, montados na primeira consulta
+estatisticas = EstatisticasCadastro()
+# Prazos de comparecimento por dia, montados na primeira varredura e mantidos a cada alteração
+agenda_prazos = AgendaPrazos()
+# Blocos de nome e endereço dos usuários, montados na primeira conferência de duplicados e mantidos a cada alteração
+indice_duplicados = IndiceDuplicados()
+
+# Distribui os usuários aptos entre as vagas dos locais aptos
+alocador = Alocador()
+alocador_desatualizado = False # Outro processo alterou o cadastro sem dizer o quê: refazer antes de alocar
+
+# Versão de cada registro nesta sessão: muda a cada alteração, feita aqui ou por outro processo
+versoes = {'usuarios': {}, 'locais': {}}
+
+# Criados por iniciar_armazenamento(), chamado só no processo principal: os processos dos pools
+# (senhas, duplicados) usam "spawn" e reimportam este módulo, e não podem abrir o banco nem iniciar o gravador
+armazenamento = None
+gravador = None
+
+def iniciar_armazenamento():
+    """Abre o armazenamento escolhido em CRUD_ARMAZENAMENTO e inicia o gravador em segundo plano."""
+    global armazenamento, gravador
+    if TIPO_ARMAZENAMENTO == 'remoto':
+        # Cadastro compartilhado: regras, alocação e gravação em disco ficam com o serviço
+        armazenamento = ArmazenamentoRemoto(URL_SERVICO)
+    elif TIPO_ARMAZENAMENTO == 'sqlite':
+        # Importa os arquivos JSON existentes na primeira execução com o banco vazio
+        armazenamento = ArmazenamentoSQLite(ARQUIVO_BANCO, importar_de=(ARQUIVO_USUARIOS, ARQUIVO_LOCAIS))
+    elif TIPO_ARMAZENAMENTO == 'binario':
+        # Diário como no JSON, snapshots .snap mapeados em memória (criados dos .json na primeira execução)
+        armazenamento = ArmazenamentoJSON(ARQUIVO_USUARIOS, ARQUIVO_LOCAIS, ARQUIVO_DIARIO, formato_snapshot='binario')
+    elif TIPO_ARMAZENAMENTO == 'particionado':
+        # Diário como no JSON, snapshots em partes lidas e gravadas em paralelo (criadas dos .json na primeira execução)
+        armazenamento = ArmazenamentoJSON(ARQUIVO_USUARIOS, ARQUIVO_LOCAIS, ARQUIVO_DIARIO, formato_snapshot='particionado')
+    else:
+        armazenamento = ArmazenamentoJSON(ARQUIVO_USUARIOS, ARQUIVO_LOCAIS, ARQUIVO_DIARIO)
+
+    # As gravações saem da thread da interface: os handlers só marcam o que mudou
+    gravador = GravadorSegundoPlano(armazenamento, lambda: {'usuarios': usuarios, 'locais': locais}, janela=JANELA_GRAVACAO)
+
 # --- Funções de Carregamento e Salvamento de Dados ---
+@medir()
 def carregar_dados():
-    """Carrega os dados dos arquivos JSON."""
-    global usuarios, locais
-    if os.path.exists(ARQUIVO_USUARIOS):
-        try:
-            with open(ARQUIVO_USUARIOS, 'r', encoding='utf-8') as f:
-                usuarios = json.load(f)
-        except json.JSONDecodeError:
-            messagebox.showerror("Erro de Leitura", "Erro ao ler o arquivo de usuários. O arquivo pode estar corrompido.")
-            usuarios = {}
-    if os.path.exists(ARQUIVO_LOCAIS):
-        try:
-            with open(ARQUIVO_LOCAIS, 'r', encoding='utf-8') as f:
-                locais = json.load(f)
-        except json.JSONDecodeError:
-            messagebox.showerror("Erro de Leitura", "Erro ao ler o arquivo de locais. O arquivo pode estar corrompido.")
-            locais = {}
-
-def salvar_dados():
-    """Salva os dados nos arquivos JSON."""
-    with open(ARQUIVO_USUARIOS, 'w', encoding='utf-8') as f:
-        json.dump(usuarios, f, indent=4, ensure_ascii=False)
-    with open(ARQUIVO_LOCAIS, 'w', encoding='utf-8') as f:
-        json.dump(locais, f, indent=4, ensure_ascii=False)
-
-# --- Lógica de Negócios ---
-def verificar_aptidao_usuario(idade, renda):
-    """Verifica se um usuário é apto com base na idade e renda."""
+    """Carrega os dados do armazenamento (snapshots + diário, ou tabelas SQLite sob demanda)."""
+    global usuarios, locais, alocador_desatualizado
     try:
-        return int(idade) >= 18 and float(renda) <= 2000
-    except ValueError:
-        return False # Caso a idade ou renda não sejam números válidos
-
-def calcular_capacidade_producao(andares, area):
-    """Calcula a capacidade de produção de um local."""
+        carregar_regras()
+    except ErroRegra as erro:
+        messagebox.showerror("Erro nas Regras", f"{erro}\nValem as regras padrão.")
+    try:
+        usuarios = armazenamento.carregar_tabela('usuarios')
+    except ValueError: # json.JSONDecodeError ou snapshot binário inválido
+        messagebox.showerror("Erro de Leitura", "Erro ao ler o arquivo de usuários. O arquivo pode estar corrompido.")
+        usuarios = {}
     try:
-        return int(andares) * float(area) * 2
+        locais = armazenamento.carregar_tabela('locais')
     except ValueError:
-        return 0 # Caso andares ou área não sejam números válidos
+        messagebox.showerror("Erro de Leitura", "Erro ao ler o arquivo de locais. O arquivo pode estar corrompido.")
+        locais = {}
+    armazenamento.reproduzir_diario({'usuarios': usuarios, 'locais': locais})
+    estatisticas.descartar()
+    agenda_prazos.descartar()
+    indice_duplicados.descartar()
+    if TIPO_ARMAZENAMENTO == 'remoto':
+        return # Índices e alocação ficam com o serviço
+    for tabela, dados in (('usuarios', usuarios), ('locais', locais)):
+        ordenacoes[tabela] = OrdenacoesTabela()
+        if getattr(dados, 'sob_demanda', False):
+            indices[tabela] = IndicesTabela(tabela) # Montados na primeira consulta
+        elif not hasattr(dados, 'consultar'):
+            indices[tabela].construir(dados)
+    if getattr(usuarios, 'sob_demanda', False):
+        # Alocar agora decodificaria o snapshot inteiro: fica para a primeira gravação
+        alocador_desatualizado = True
+    else:
+        reconstruir_alocacao()
+
+def reconstruir_alocacao(redistribuir=False):
+    """Refaz o estado do alocador; só os usuários sem vaga válida recebem nova designação.
+
+    Com `redistribuir`, todos são alocados de novo, cada um no local com vaga mais próximo.
+    No SQLite, fora a redistribuição, as designações gravadas valem como estão e só quem tem
+    vaga ou está na fila é lido, pelo índice. Devolve quantos usuários mudaram de designação.
+    """
+    global alocador_desatualizado
+    alocador_desatualizado = False
+    if not redistribuir and hasattr(armazenamento, 'usuarios_alocados'):
+        gravador.descarregar() # O banco precisa conter as designações ainda pendentes deste processo
+        alocador.carregar(locais.items(), armazenamento.usuarios_alocados(AGUARDANDO_VAGA))
+        return 0
+    alterados = []
+    for username, designacao in alocador.alocar_todos(usuarios, locais, redistribuir).items():
+        aplicar_designacao(usuarios[username], designacao)
+        alterados.append((username, usuarios[username]))
+    if alterados:
+        _gravar('usuarios', alterados)
+    return len(alterados)
+
+@medir()
+def salvar_dados():
+    """Grava as alterações pendentes. Pode lançar a falha de escrita (OSError, sqlite3.Error)."""
+    gravador.descarregar()
+
+def registrar_alteracao(tabela, chave):
+    """Grava apenas o registro alterado (ou a sua remoção)."""
+    dados = (usuarios if tabela == 'usuarios' else locais).get(chave)
+    registrar_lote(tabela, [(chave, dados)])
+
+def registrar_lote(tabela, itens):
+    """Grava de uma vez vários registros (chave, dados) alterados.
+
+    Antes de gravar, o alocador atualiza local e prazo dos usuários; se a alteração mexer na
+    designação de outros usuários (vaga liberada, local removido...), eles também são gravados.
+    """
+    itens = list(itens)
+    if TIPO_ARMAZENAMENTO == 'remoto':
+        # O serviço aplica regras e alocação e devolve tudo que mudou (pode lançar ConflitoVersao)
+        alterados = armazenamento.registrar_lote(tabela, itens)
+        telemetria.contar_registros(len(alterados))
+        return
+    # Traz antes o que outros processos gravaram; lança ConflitoVersao se foi num destes registros
+    sincronizar_dados([(tabela, chave) for chave, _ in itens])
+    if alocador_desatualizado:
+        reconstruir_alocacao()
+    outros = alocador.processar(tabela, itens, usuarios)
+    _gravar(tabela, itens)
+    if outros:
+        _gravar('usuarios', outros)
+
+def _gravar(tabela, itens):
+    telemetria.contar_registros(len(itens))
+    for chave, dados in itens:
+        atualizar_estruturas(tabela, chave, dados)
+    gravador.marcar(tabela, itens) # A escrita (e a compactação, se preciso) acontece no gravador
+
+def atualizar_estruturas(tabela, chave, dados):
+    """Mantém as estruturas derivadas (índices, versão) em dia com a alteração de um registro."""
+    versoes[tabela][chave] = versoes[tabela].get(chave, 0) + 1
+    if not hasattr(usuarios if tabela == 'usuarios' else locais, 'consultar'):
+        indices[tabela].atualizar(chave, dados)
+        ordenacoes[tabela].atualizar(chave, dados)
+    indices_busca[tabela].atualizar(chave, dados)
+    estatisticas.atualizar(tabela, chave, dados)
+    if tabela == 'usuarios':
+        agenda_prazos.atualizar(chave, dados)
+        indice_duplicados.atualizar(chave, dados)
+
+def sincronizar_dados(alteradas=()):
+    """Aplica o que outros processos gravaram no mesmo cadastro.
+
+    Devolve as (tabela, chave) alteradas, ou None se o armazenamento não sabe dizer quais.
+    `alteradas` são as (tabela, chave) prestes a ser gravadas aqui; se outro processo gravou
+    uma delas, a versão dele prevalece e ConflitoVersao é lançado.
+    """
+    global alocador_desatualizado
+    externas = armazenamento.sincronizar({'usuarios': usuarios, 'locais': locais}, alteradas)
+    if externas is None:
+        alocador_desatualizado = True
+        estatisticas.descartar()
+        agenda_prazos.descartar()
+        indice_duplicados.descartar()
+        return None
+    for tabela in ('locais', 'usuarios'): # Locais primeiro: as designações dos usuários apontam para eles
+        itens = [(chave, dados) for nome, chave, dados in externas if nome == tabela]
+        if itens:
+            alocador.adotar(tabela, itens)
+            for chave, dados in itens:
+                atualizar_estruturas(tabela, chave, dados)
+    alteradas_fora = {(tabela, chave) for tabela, chave, _ in externas}
+    for tabela, chave in alteradas:
+        if (tabela, chave) in alteradas_fora:
+            raise ConflitoVersao(f"'{chave}' foi alterado em outra estação. A alteração feita aqui foi descartada.", tabela, chave)
+    return list(alteradas_fora)
+
+def versao_registro(tabela, chave):
+    dados = usuarios if tabela == 'usuarios' else locais
+    if hasattr(dados, 'versoes'):
+        return dados.versoes.get(chave, 0) # Tabela remota: versão do serviço
+    return versoes[tabela].get(chave, 0)
+
+def conferir_versao(tabela, chave, versao_lida):
+    """Lança ConflitoVersao se o registro mudou depois de carregado no formulário."""
+    if versao_lida is not None and versao_registro(tabela, chave) != versao_lida:
+        raise ConflitoVersao(f"'{chave}' foi alterado em outra estação enquanto era editado. Selecione-o de novo.", tabela, chave)
+
+def consultar_registros(tabela, **condicoes):
+    """Consulta indexada: campo=valor ou campo=(mínimo, máximo). Devolve a lista de chaves."""
+    return consultar(usuarios if tabela == 'usuarios' else locais, indices[tabela], **condicoes)
+
+def resumo_estatisticas():
+    """Valores do painel de estatísticas, sem percorrer o cadastro (só a primeira consulta o percorre)."""
+    if TIPO_ARMAZENAMENTO == 'remoto':
+        return armazenamento.estatisticas() # Mantidas pelo serviço
+    if not estatisticas.construido:
+        estatisticas.construir(usuarios, locais)
+    return estatisticas.resumo()
+
+def ordem_registros(tabela, campo):
+    """Ordem de uma coluna (campo=None: da chave) para as listagens paginadas."""
+    return ordenacao(usuarios if tabela == 'usuarios' else locais, ordenacoes[tabela], campo)
+
+def prazos_proximos(dias):
+    """Usuários com prazo de comparecimento de hoje até daqui a `dias` - 1 dias, sem percorrer o cadastro."""
+    if TIPO_ARMAZENAMENTO == 'remoto':
+        return armazenamento.prazos(dias)
+    if not agenda_prazos.construido:
+        agenda_prazos.construir(usuarios)
+    return agenda_prazos.proximos(dias)
+
+def varrer_prazos():
+    """Marca os usuários cujo prazo venceu, liberando as vagas deles para a fila de espera. Devolve quantos."""
+    if TIPO_ARMAZENAMENTO == 'remoto':
+        return 0 # O serviço faz as próprias varreduras
+    alterados = varrer(agenda_prazos, usuarios)
+    if alterados:
+        registrar_lote('usuarios', alterados)
+    return len(alterados)
+
+def possiveis_duplicados(username):
+    """Cadastros parecidos com o de `username` [(outro, semelhança, motivo)], sem percorrer o cadastro."""
+    if TIPO_ARMAZENAMENTO == 'remoto':
+        return armazenamento.duplicados(username)
+    if not indice_duplicados.construido:
+        indice_duplicados.construir(usuarios)
+    return indice_duplicados.verificar(username, usuarios.get(username), usuarios)
+
+@medir()
+def verificar_duplicados():
+    """Todos os pares de possíveis duplicados do cadastro [(username, outro, semelhança, motivo)]."""
+    return verificar_cadastro(usuarios, reservados=(ADMIN_USERNAME,))
+
+def importar_coordenadas(caminho):
+    """Preenche latitude e longitude de locais e usuários pelo gazetteer CSV e grava os alterados.
+
+    Devolve {tabela: (alterados, endereços não encontrados)} e as linhas ignoradas do gazetteer.
+    Lança OSError ou ValueError se o arquivo não puder ser lido.
+    """
+    gazetteer = carregar_gazetteer(caminho)
+    resumo = {}
+    for tabela, dados in (('locais', locais), ('usuarios', usuarios)): # Locais primeiro: os usuários são alocados perto deles
+        alterados, nao_encontrados = aplicar_coordenadas(dados, gazetteer)
+        if alterados:
+            registrar_lote(tabela, alterados)
+        resumo[tabela] = (len(alterados), nao_encontrados)
+    return resumo, gazetteer.ignoradas
+
+def redistribuir_locais():
+    """Aloca de novo todo o cadastro de uma vez, cada usuário no local com vaga mais próximo. Devolve quantos mudaram."""
+    if TIPO_ARMAZENAMENTO == 'remoto':
+        return armazenamento.redistribuir()
+    sincronizar_dados()
+    return reconstruir_alocacao(redistribuir=True)
+
+def filtrar_registros(tabela, busca='', dias_prazo=None, **condicoes):
+    """Chaves cujos registros contêm as palavras de `busca` (por prefixo) e atendem às condições indexadas.
+
+    Com `dias_prazo`, só os usuários com prazo de comparecimento nos próximos dias.
+    """
+    chaves = set(prazos_proximos(dias_prazo)) if dias_prazo is not None else None
+    dados = usuarios if tabela == 'usuarios' else locais
+    if busca.strip() and hasattr(dados, 'buscar'):
+        encontradas = set(dados.buscar(busca)) # Tabela remota: o índice de busca está no serviço
+        chaves = encontradas if chaves is None else chaves & encontradas
+    elif busca.strip():
+        indice = indices_busca[tabela]
+        if not indice.construido:
+            indice.construir(dados)
+        chaves = indice.buscar(busca) if chaves is None else chaves & indice.buscar(busca)
+    if condicoes:
+        encontradas = consultar_registros(tabela, **condicoes)
+        chaves = set(encontradas) if chaves is None else chaves.intersection(encontradas)
+    return sorted(chaves) if chaves is not None else None
+
+# --- Lógica de Negócios ---
+# As regras (verificar_aptidao_usuario, calcular_capacidade_producao, avaliar_local) ficam em regras.py
+def recalcular_cadastro():
+    """Relê regras.json e reavalia o cadastro, gravando só o que mudou.
+
+    Se uma regra só mudou de limite num campo com índice de faixa (idade >= 18 para idade >= 21),
+    só os registros entre o limite antigo e o novo são reavaliados; sem mudança nas regras, tudo é.
+    Lança ErroRegra se o arquivo de regras for inválido (as regras em vigor continuam valendo).
+    """
+    if TIPO_ARMAZENAMENTO == 'remoto':
+        alterados = armazenamento.recalcular()
+        return alterados['usuarios'], alterados['locais']
+    alteradas = carregar_regras()
+    chaves = {}
+    for tabela, dados in (('usuarios', usuarios), ('locais', locais)):
+        chaves[tabela] = chaves_nas_faixas(dados, indices[tabela], tabela, faixas_afetadas(tabela, alteradas)) if alteradas else None
+    usuarios_alterados = recalcular_usuarios(usuarios, chaves['usuarios'])
+    locais_alterados = recalcular_locais(locais, chaves['locais'])
+    if usuarios_alterados:
+        registrar_lote('usuarios', usuarios_alterados)
+    if locais_alterados:
+        registrar_lote('locais', locais_alterados)
+    return len(usuarios_alterados), len(locais_alterados)
 
 # --- Classes da Interface Gráfica ---
 
@@ -71,10 +375,19 @@ class App(ctk.CTk):
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
+        telemetria.iniciar()
         carregar_dados() # Carrega os dados ao iniciar a aplicação
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.user_form_version = None # Versão do registro carregado em cada formulário
+        self.local_form_version = None
+        self.common_form_version = None
+        self.sort_columns = {} # tabela -> (coluna ordenada, decrescente)
 
         self.create_widgets()
         self.show_login_frame()
+        self.after(INTERVALO_SINCRONIZACAO_MS, self.poll_external_changes)
+        self.after(INTERVALO_SINCRONIZACAO_MS, self.sweep_deadlines)
 
     def create_widgets(self):
         # --- Frame de Login ---
@@ -91,7 +404,8 @@ class App(ctk.CTk):
         self.login_password_entry = ctk.CTkEntry(self.login_frame, placeholder_text="Senha", show="*", width=200)
         self.login_password_entry.grid(row=3, column=0, pady=5)
 
-        ctk.CTkButton(self.login_frame, text="Entrar", command=self.attempt_login).grid(row=4, column=0, pady=10)
+        self.login_button = ctk.CTkButton(self.login_frame, text="Entrar", command=self.attempt_login)
+        self.login_button.grid(row=4, column=0, pady=10)
         ctk.CTkButton(self.login_frame, text="Não tem conta? Registre-se", command=self.show_register_frame, fg_color="gray").grid(row=5, column=0, pady=5)
 
         # --- Frame de Registro ---
@@ -115,13 +429,79 @@ class App(ctk.CTk):
         # --- Frame do Menu do Administrador ---
         self.admin_menu_frame = ctk.CTkFrame(self)
         self.admin_menu_frame.grid(row=0, column=0, sticky="nsew", padx=20, pady=20)
-        self.admin_menu_frame.grid_rowconfigure((0,1,2,3,4,5,6), weight=1)
+        self.admin_menu_frame.grid_rowconfigure((0,1,2,3,4,5,6,7), weight=1)
         self.admin_menu_frame.grid_columnconfigure(0, weight=1)
 
         ctk.CTkLabel(self.admin_menu_frame, text="Menu do Administrador", font=("Roboto", 24)).grid(row=0, column=0, pady=20)
         ctk.CTkButton(self.admin_menu_frame, text="Gerenciar Usuários", command=self.show_manage_users_admin_frame).grid(row=1, column=0, pady=10, ipadx=20, ipady=10)
         ctk.CTkButton(self.admin_menu_frame, text="Gerenciar Locais", command=self.show_manage_locais_frame).grid(row=2, column=0, pady=10, ipadx=20, ipady=10)
-        ctk.CTkButton(self.admin_menu_frame, text="Sair", command=self.logout, fg_color="red").grid(row=3, column=0, pady=20)
+        ctk.CTkButton(self.admin_menu_frame, text="Recalcular Aptidões", command=self.recalculate_registry_gui).grid(row=3, column=0, pady=10, ipadx=20, ipady=10)
+        ctk.CTkButton(self.admin_menu_frame, text="Estatísticas", command=self.show_statistics_frame).grid(row=4, column=0, pady=10, ipadx=20, ipady=10)
+        ctk.CTkButton(self.admin_menu_frame, text="Importar Coordenadas", command=self.import_coordinates_gui).grid(row=5, column=0, pady=10, ipadx=20, ipady=10)
+        ctk.CTkButton(self.admin_menu_frame, text="Diagnóstico", command=self.show_diagnostics_frame).grid(row=6, column=0, pady=10, ipadx=20, ipady=10)
+        ctk.CTkButton(self.admin_menu_frame, text="Sair", command=self.logout, fg_color="red").grid(row=7, column=0, pady=20)
+
+        # --- Frame de Estatísticas (Admin) ---
+        self.statistics_frame = ctk.CTkFrame(self)
+        self.statistics_frame.grid(row=0, column=0, sticky="nsew", padx=20, pady=20)
+        self.statistics_frame.grid_rowconfigure(1, weight=1)
+        self.statistics_frame.grid_columnconfigure(0, weight=1)
+
+        ctk.CTkLabel(self.statistics_frame, text="Estatísticas do Cadastro", font=("Roboto", 20)).grid(row=0, column=0, pady=10)
+        self.statistics_label = ctk.CTkLabel(self.statistics_frame, text="", font=("Courier", 13), justify="left", anchor="nw")
+        self.statistics_label.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
+
+        statistics_button_frame = ctk.CTkFrame(self.statistics_frame)
+        statistics_button_frame.grid(row=2, column=0, pady=10)
+        ctk.CTkButton(statistics_button_frame, text="Atualizar", command=self.refresh_statistics).pack(side="left", padx=5)
+        ctk.CTkButton(statistics_button_frame, text="Voltar", command=self.show_admin_menu_frame).pack(side="left", padx=5)
+
+        # --- Frame de Possíveis Duplicados (Admin) ---
+        self.duplicates_frame = ctk.CTkFrame(self)
+        self.duplicates_frame.grid(row=0, column=0, sticky="nsew", padx=20, pady=20)
+        self.duplicates_frame.grid_rowconfigure(2, weight=1)
+        self.duplicates_frame.grid_columnconfigure(0, weight=1)
+
+        ctk.CTkLabel(self.duplicates_frame, text="Possíveis Duplicados", font=("Roboto", 20)).grid(row=0, column=0, pady=10)
+        self.duplicates_label = ctk.CTkLabel(self.duplicates_frame, text="")
+        self.duplicates_label.grid(row=1, column=0, pady=5)
+        self.duplicates_tree = ttk.Treeview(self.duplicates_frame, columns=("Usuário", "Possível Duplicado", "Semelhança", "Motivo"), show="headings")
+        self.duplicates_tree.grid(row=2, column=0, sticky="nsew", padx=10, pady=10)
+        for col in self.duplicates_tree["columns"]:
+            self.duplicates_tree.heading(col, text=col)
+            self.duplicates_tree.column(col, width=150, anchor="w")
+        self.duplicates_tree.column("Semelhança", width=90, anchor="center")
+        self.duplicate_pairs = {} # (username, outro) -> (semelhança, motivo), à espera de revisão
+        self.duplicate_rows = {} # linha da Treeview -> par
+
+        duplicates_button_frame = ctk.CTkFrame(self.duplicates_frame)
+        duplicates_button_frame.grid(row=3, column=0, pady=10)
+        ctk.CTkButton(duplicates_button_frame, text="Verificar Cadastro", command=self.scan_duplicates_gui).pack(side="left", padx=5)
+        ctk.CTkButton(duplicates_button_frame, text="Remover Usuário", command=lambda: self.remove_duplicate_gui(0), fg_color="red").pack(side="left", padx=5)
+        ctk.CTkButton(duplicates_button_frame, text="Remover Duplicado", command=lambda: self.remove_duplicate_gui(1), fg_color="red").pack(side="left", padx=5)
+        ctk.CTkButton(duplicates_button_frame, text="Não é Duplicado", command=self.dismiss_duplicate_gui).pack(side="left", padx=5)
+        ctk.CTkButton(duplicates_button_frame, text="Voltar", command=self.show_manage_users_admin_frame).pack(side="left", padx=5)
+
+        # --- Frame de Diagnóstico (Admin) ---
+        self.diagnostics_frame = ctk.CTkFrame(self)
+        self.diagnostics_frame.grid(row=0, column=0, sticky="nsew", padx=20, pady=20)
+        self.diagnostics_frame.grid_rowconfigure(2, weight=1)
+        self.diagnostics_frame.grid_columnconfigure(0, weight=1)
+
+        ctk.CTkLabel(self.diagnostics_frame, text="Diagnóstico", font=("Roboto", 20)).grid(row=0, column=0, pady=10)
+        self.diagnostics_label = ctk.CTkLabel(self.diagnostics_frame, text="")
+        self.diagnostics_label.grid(row=1, column=0, pady=5)
+        self.diagnostics_tree = ttk.Treeview(self.diagnostics_frame, columns=("Operação", "Chamadas", "Média (ms)", "p95 (ms)", "Máx (ms)", "Registros", "Erros"), show="headings")
+        self.diagnostics_tree.grid(row=2, column=0, sticky="nsew", padx=10, pady=10)
+        for col in self.diagnostics_tree["columns"]:
+            self.diagnostics_tree.heading(col, text=col)
+            self.diagnostics_tree.column(col, width=80, anchor="center")
+        self.diagnostics_tree.column("Operação", width=200, anchor="w")
+
+        diagnostics_button_frame = ctk.CTkFrame(self.diagnostics_frame)
+        diagnostics_button_frame.grid(row=3, column=0, pady=10)
+        ctk.CTkButton(diagnostics_button_frame, text="Atualizar", command=self.refresh_diagnostics).pack(side="left", padx=5)
+        ctk.CTkButton(diagnostics_button_frame, text="Voltar", command=self.show_admin_menu_frame).pack(side="left", padx=5)
 
         # --- Frame de Gerenciamento de Usuários (Admin) ---
         self.manage_users_admin_frame = ctk.CTkFrame(self)
@@ -182,7 +562,7 @@ class App(ctk.CTk):
         self.user_tree.bind("<<TreeviewSelect>>", self.load_selected_user_to_form)
 
         for col in self.user_tree["columns"]:
-            self.user_tree.heading(col, text=col)
+            self.user_tree.heading(col, text=col, command=lambda coluna=col: self.sort_tree_by('usuarios', coluna))
             self.user_tree.column(col, width=80, anchor="center")
 
         # Configurar scrollbar
@@ -190,10 +570,28 @@ class App(ctk.CTk):
         vsb.grid(row=1, column=2, rowspan=5, sticky="ns", padx=0, pady=10)
         self.user_tree.configure(yscrollcommand=vsb.set)
 
+        # Só a página visível da tabela é materializada na Treeview
+        self.tabela_usuarios = TabelaPaginada(self.user_tree, lambda: usuarios, self.format_user_row,
+                                              ao_mudar_pagina=lambda pagina, total: self.user_page_label.configure(text=f"Página {pagina + 1} de {total}"))
+
         button_row_frame = ctk.CTkFrame(self.manage_users_admin_frame)
         button_row_frame.grid(row=6, column=1, pady=10)
+        self.user_search_entry = ctk.CTkEntry(button_row_frame, placeholder_text="Buscar...", width=150)
+        self.user_search_entry.pack(side="left", padx=5)
+        self.user_search_entry.bind("<KeyRelease>", lambda event: self.filter_users_gui())
+        self.user_apto_option = ctk.CTkOptionMenu(button_row_frame, values=["Todos", "Aptos", "Não aptos", f"Prazo em {DIAS_PRAZO} dias", "Prazo vencido"], width=130, command=lambda opcao: self.filter_users_gui())
+        self.user_apto_option.pack(side="left", padx=5)
+        ctk.CTkButton(button_row_frame, text="<", width=30, command=self.tabela_usuarios.pagina_anterior).pack(side="left", padx=5)
+        self.user_page_label = ctk.CTkLabel(button_row_frame, text="")
+        self.user_page_label.pack(side="left", padx=5)
+        ctk.CTkButton(button_row_frame, text=">", width=30, command=self.tabela_usuarios.proxima_pagina).pack(side="left", padx=5)
         ctk.CTkButton(button_row_frame, text="Remover Selecionado", command=self.remove_user_admin_gui, fg_color="red").pack(side="left", padx=5)
-        ctk.CTkButton(self.manage_users_admin_frame, text="Voltar", command=self.show_admin_menu_frame).grid(row=7, column=0, columnspan=2, pady=10)
+        ctk.CTkButton(button_row_frame, text="Importar Arquivo", command=lambda: self.import_file_gui('usuarios')).pack(side="left", padx=5)
+        ctk.CTkButton(button_row_frame, text="Exportar", command=lambda: self.export_file_gui('usuarios')).pack(side="left", padx=5)
+        users_bottom_frame = ctk.CTkFrame(self.manage_users_admin_frame)
+        users_bottom_frame.grid(row=7, column=0, columnspan=2, pady=10)
+        ctk.CTkButton(users_bottom_frame, text="Possíveis Duplicados", command=self.show_duplicates_frame).pack(side="left", padx=5)
+        ctk.CTkButton(users_bottom_frame, text="Voltar", command=self.show_admin_menu_frame).pack(side="left", padx=5)
 
         # --- Frame de Gerenciamento de Locais (Admin) ---
         self.manage_locais_frame = ctk.CTkFrame(self)
@@ -246,7 +644,7 @@ class App(ctk.CTk):
         self.local_tree.bind("<<TreeviewSelect>>", self.load_selected_local_to_form)
 
         for col in self.local_tree["columns"]:
-            self.local_tree.heading(col, text=col)
+            self.local_tree.heading(col, text=col, command=lambda coluna=col: self.sort_tree_by('locais', coluna))
             self.local_tree.column(col, width=80, anchor="center")
         
         # Configurar scrollbar para locais
@@ -254,9 +652,23 @@ class App(ctk.CTk):
         vsb_local.grid(row=1, column=2, rowspan=4, sticky="ns", padx=0, pady=10)
         self.local_tree.configure(yscrollcommand=vsb_local.set)
 
+        self.tabela_locais = TabelaPaginada(self.local_tree, lambda: locais, self.format_local_row,
+                                            ao_mudar_pagina=lambda pagina, total: self.local_page_label.configure(text=f"Página {pagina + 1} de {total}"))
+
         local_action_button_frame = ctk.CTkFrame(self.manage_locais_frame)
         local_action_button_frame.grid(row=5, column=1, pady=10)
+        self.local_search_entry = ctk.CTkEntry(local_action_button_frame, placeholder_text="Buscar...", width=150)
+        self.local_search_entry.pack(side="left", padx=5)
+        self.local_search_entry.bind("<KeyRelease>", lambda event: self.filter_locais_gui())
+        self.local_apto_option = ctk.CTkOptionMenu(local_action_button_frame, values=["Todos", "Aptos", "Não aptos"], width=110, command=lambda opcao: self.filter_locais_gui())
+        self.local_apto_option.pack(side="left", padx=5)
+        ctk.CTkButton(local_action_button_frame, text="<", width=30, command=self.tabela_locais.pagina_anterior).pack(side="left", padx=5)
+        self.local_page_label = ctk.CTkLabel(local_action_button_frame, text="")
+        self.local_page_label.pack(side="left", padx=5)
+        ctk.CTkButton(local_action_button_frame, text=">", width=30, command=self.tabela_locais.proxima_pagina).pack(side="left", padx=5)
         ctk.CTkButton(local_action_button_frame, text="Remover Selecionado", command=self.remove_local_gui, fg_color="red").pack(side="left", padx=5)
+        ctk.CTkButton(local_action_button_frame, text="Importar Arquivo", command=lambda: self.import_file_gui('locais')).pack(side="left", padx=5)
+        ctk.CTkButton(local_action_button_frame, text="Exportar", command=lambda: self.export_file_gui('locais')).pack(side="left", padx=5)
 
         ctk.CTkButton(self.manage_locais_frame, text="Voltar", command=self.show_admin_menu_frame).grid(row=6, column=0, columnspan=2, pady=10)
 
@@ -309,6 +721,9 @@ class App(ctk.CTk):
         self.admin_menu_frame.grid_forget()
         self.manage_users_admin_frame.grid_forget()
         self.manage_locais_frame.grid_forget()
+        self.statistics_frame.grid_forget()
+        self.duplicates_frame.grid_forget()
+        self.diagnostics_frame.grid_forget()
         self.user_menu_frame.grid_forget()
         frame.grid(row=0, column=0, sticky="nsew")
 
@@ -336,13 +751,136 @@ class App(ctk.CTk):
         self.populate_local_tree() # Atualiza a lista de locais
         self.clear_local_form() # Limpa o formulário
 
+    def show_statistics_frame(self):
+        self.show_frame(self.statistics_frame)
+        self.refresh_statistics()
+
+    def show_duplicates_frame(self):
+        self.show_frame(self.duplicates_frame)
+        self.populate_duplicates_tree()
+
+    def show_diagnostics_frame(self):
+        self.show_frame(self.diagnostics_frame)
+        self.refresh_diagnostics()
+
     def show_user_menu_frame(self, username):
         global current_user_data
         current_user_data = username
         self.show_frame(self.user_menu_frame)
         self.load_user_common_data(username)
 
+    # --- Estatísticas ---
+    @medir()
+    def refresh_statistics(self):
+        self.statistics_label.configure(text=formatar_resumo(resumo_estatisticas()))
+
+    # --- Possíveis Duplicados ---
+    def check_duplicates(self, username, avisar=True):
+        """Confere um cadastro recém-gravado; os pares encontrados vão para a revisão do administrador."""
+        encontrados = possiveis_duplicados(username)
+        for outro, semelhanca, motivo in encontrados:
+            if (outro, username) not in self.duplicate_pairs:
+                self.duplicate_pairs[(username, outro)] = (semelhanca, motivo)
+        if encontrados and avisar:
+            linhas = "\n".join(f"{outro} ({motivo.lower()}, {semelhanca:.0%})" for outro, semelhanca, motivo in encontrados[:5])
+            messagebox.showwarning("Possível Duplicado", f"O cadastro de {username} se parece com:\n{linhas}\n\nO par ficou na lista de possíveis duplicados.")
+
+    def populate_duplicates_tree(self):
+        self.duplicates_tree.delete(*self.duplicates_tree.get_children())
+        self.duplicate_rows = {}
+        pares = sorted(self.duplicate_pairs.items(), key=lambda item: -item[1][0])
+        for par, (semelhanca, motivo) in pares:
+            iid = self.duplicates_tree.insert("", "end", values=(*par, f"{semelhanca:.0%}", motivo))
+            self.duplicate_rows[iid] = par
+        self.duplicates_label.configure(text=f"{len(pares)} par(es) à espera de revisão")
+
+    @medir()
+    def scan_duplicates_gui(self):
+        inicio = time.perf_counter()
+        pares = verificar_duplicados()
+        self.duplicate_pairs = {(username, outro): (semelhanca, motivo) for username, outro, semelhanca, motivo in pares}
+        self.populate_duplicates_tree()
+        messagebox.showinfo("Verificação Concluída", f"{len(pares)} par(es) de possíveis duplicados encontrados em {time.perf_counter() - inicio:.1f} s.")
+
+    def selected_duplicate(self):
+        par = self.duplicate_rows.get(self.duplicates_tree.focus())
+        if par is None:
+            messagebox.showerror("Erro", "Selecione um par de usuários.")
+        return par
+
+    def dismiss_duplicate_gui(self):
+        par = self.selected_duplicate()
+        if par is not None:
+            self.duplicate_pairs.pop(par, None)
+            self.populate_duplicates_tree()
+
+    @medir()
+    def remove_duplicate_gui(self, posicao):
+        par = self.selected_duplicate()
+        if par is None:
+            return
+        username = par[posicao]
+        if messagebox.askyesno("Confirmar Remoção", f"Tem certeza que deseja remover o usuário {username}?"):
+            if usuarios.pop(username, None):
+                registrar_alteracao('usuarios', username)
+                self.tabela_usuarios.atualizar_registro(username)
+            self.duplicate_pairs = {outro_par: valor for outro_par, valor in self.duplicate_pairs.items() if username not in outro_par}
+            self.populate_duplicates_tree()
+
+    # --- Diagnóstico ---
+    def refresh_diagnostics(self):
+        if not telemetria.ATIVA:
+            self.diagnostics_label.configure(text="Telemetria desativada. Inicie o programa com CRUD_TELEMETRIA=1.")
+            return
+        self.diagnostics_label.configure(text=f"Latência por operação (histograma completo em {telemetria.ARQUIVO_TELEMETRIA})")
+        self.diagnostics_tree.delete(*self.diagnostics_tree.get_children())
+        for nome, dados in telemetria.resumo().items():
+            self.diagnostics_tree.insert("", "end", values=(nome, dados['chamadas'], f"{dados['media_ms']:.2f}", f"{dados['p95_ms']:.2f}",
+                                                            f"{dados['maximo_ms']:.2f}", dados['registros'], dados['erros']))
+
+    # --- Tarefas em Segundo Plano ---
+    def run_in_background(self, future, callback):
+        """Chama callback(resultado) na thread da interface quando o Future terminar."""
+        if future.done():
+            callback(future.result())
+        else:
+            self.after(INTERVALO_VERIFICACAO_MS, self.run_in_background, future, callback)
+
+    def poll_external_changes(self):
+        """Traz as alterações gravadas por outras estações e avisa das gravações descartadas por conflito."""
+        self.after(INTERVALO_SINCRONIZACAO_MS, self.poll_external_changes)
+        alteradas = sincronizar_dados()
+        if alteradas is None or any(tabela == 'usuarios' for tabela, _ in alteradas):
+            self.tabela_usuarios.recarregar()
+        if alteradas is None or any(tabela == 'locais' for tabela, _ in alteradas):
+            self.tabela_locais.recarregar()
+        conflitos = getattr(armazenamento, 'conflitos', None)
+        descartadas = []
+        while conflitos:
+            descartadas.append(conflitos.popleft()[1])
+        if descartadas:
+            messagebox.showwarning("Alterações Descartadas",
+                                   f"Outra estação gravou antes as alterações de: {', '.join(map(str, descartadas[:10]))}"
+                                   + (f" e mais {len(descartadas) - 10}" if len(descartadas) > 10 else "")
+                                   + ".\nA versão dela foi mantida.")
+
+    def sweep_deadlines(self):
+        """Varredura periódica dos prazos vencidos; custa proporcional aos que venceram desde a última."""
+        self.after(INTERVALO_VARREDURA_MS, self.sweep_deadlines)
+        try:
+            vencidos = varrer_prazos()
+        except ConflitoVersao:
+            vencidos = 0 # Outra estação alterou um deles agora: fica para a próxima varredura
+        if vencidos:
+            self.tabela_usuarios.recarregar()
+
+    def store_password_hash(self, username, senha_hash):
+        if username in usuarios:
+            usuarios[username]['senha'] = senha_hash
+            registrar_alteracao('usuarios', username)
+
     # --- Funções de Autenticação ---
+    @medir()
     def attempt_login(self):
         username = self.login_username_entry.get()
         password = self.login_password_entry.get()
@@ -350,12 +888,35 @@ class App(ctk.CTk):
         if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
             messagebox.showinfo("Login", "Login de Administrador efetuado com sucesso!")
             self.show_admin_menu_frame()
-        elif username in usuarios and usuarios[username].get('senha') == password:
-            messagebox.showinfo("Login", f"Bem-vindo, {username}!")
-            self.show_user_menu_frame(username)
         else:
+            # A verificação do hash é lenta de propósito: roda fora da thread da interface. Um
+            # username inexistente também paga o PBKDF2, para o tempo da resposta não revelá-lo.
+            self.login_button.configure(state="disabled")
+            inicio = time.perf_counter()
+            if TIPO_ARMAZENAMENTO == 'remoto':
+                # O serviço não entrega o hash: ele mesmo confere (e converte senhas antigas)
+                future = servico_autenticacao.submeter(armazenamento.conferir_senha, username, password)
+            else:
+                armazenada = usuarios[username].get('senha', '') if username in usuarios else ''
+                future = servico_autenticacao.verificar(password, armazenada)
+            future.add_done_callback(lambda f: telemetria.registrar('verificacao_senha', (time.perf_counter() - inicio) * 1000))
+            self.run_in_background(future, lambda ok: self.finish_login(username, password, ok))
+
+    @medir()
+    def finish_login(self, username, password, ok):
+        self.login_button.configure(state="normal")
+        if not ok or username not in usuarios:
             messagebox.showerror("Login Inválido", "Usuário ou senha incorretos.")
-
+            return
+        if TIPO_ARMAZENAMENTO == 'remoto':
+            usuarios.descartar(username) # O serviço pode ter convertido a senha: a versão em cache ficou velha
+        elif senha_em_texto_puro(usuarios[username].get('senha', '')):
+            # Cadastro antigo: converte a senha para hash a partir deste login
+            self.run_in_background(servico_autenticacao.gerar(password), lambda senha_hash: self.store_password_hash(username, senha_hash))
+        messagebox.showinfo("Login", f"Bem-vindo, {username}!")
+        self.show_user_menu_frame(username)
+
+    @medir()
     def register_user(self):
         username = self.reg_username_entry.get()
         password = self.reg_password_entry.get()
@@ -373,32 +934,180 @@ class App(ctk.CTk):
             messagebox.showerror("Erro de Registro", "As senhas não coincidem.")
             return
 
-        usuarios[username] = {
-            "senha": password, # Em um sistema real, a senha seria hashada
+        self.run_in_background(servico_autenticacao.gerar(password), lambda senha_hash: self.finish_register(username, senha_hash))
+
+    @medir()
+    def finish_register(self, username, senha_hash):
+        if username in usuarios: # Registrado por outro caminho enquanto o hash era gerado
+            messagebox.showerror("Erro de Registro", "Nome de usuário já existe ou é reservado. Tente outro.")
+            return
+        usuarios[username] = Usuario({
+            "senha": senha_hash,
             "registrado": False # Marcador para indicar que os dados completos ainda precisam ser preenchidos
-        }
-        salvar_dados()
+        })
+        registrar_alteracao('usuarios', username)
         messagebox.showinfo("Registro", "Usuário registrado com sucesso! Faça login para preencher seus dados.")
         self.show_login_frame()
 
     def logout(self):
         global current_user_data
         current_user_data = None
+        self.flush_pending_writes()
         messagebox.showinfo("Sair", "Você foi desconectado.")
         self.show_login_frame()
 
+    def flush_pending_writes(self):
+        """Espera o gravador terminar; devolve False (e avisa) se a escrita falhou."""
+        try:
+            salvar_dados()
+        except Exception as erro:
+            messagebox.showerror("Erro ao Salvar", f"Não foi possível gravar as alterações: {erro}")
+            return False
+        return True
+
+    def on_close(self):
+        if not self.flush_pending_writes():
+            if not messagebox.askyesno("Sair", "Algumas alterações não foram gravadas. Sair mesmo assim?"):
+                return
+        try:
+            gravador.encerrar()
+        except Exception:
+            pass # Já avisado acima
+        armazenamento.fechar()
+        servico_autenticacao.encerrar()
+        telemetria.encerrar()
+        self.destroy()
+
+    def report_callback_exception(self, tipo, erro, rastreamento):
+        """Conflitos de versão e erros do serviço viram avisos; os demais seguem o tratamento padrão do Tk."""
+        if isinstance(erro, ConflitoVersao):
+            messagebox.showwarning("Registro Alterado", str(erro))
+            # Redesenhar as páginas traz a versão atual dos registros
+            self.tabela_usuarios.mostrar_pagina()
+            self.tabela_locais.mostrar_pagina()
+        elif isinstance(erro, (ErroRemoto, ConnectionError)):
+            messagebox.showerror("Erro no Serviço", f"Não foi possível falar com o serviço do cadastro: {erro}")
+        else:
+            super().report_callback_exception(tipo, erro, rastreamento)
+
+    @medir()
+    def recalculate_registry_gui(self):
+        try:
+            usuarios_alterados, locais_alterados = recalcular_cadastro()
+        except ErroRegra as erro:
+            messagebox.showerror("Erro nas Regras", str(erro))
+            return
+        messagebox.showinfo("Recálculo", f"Recálculo concluído.\nUsuários alterados: {usuarios_alterados}\nLocais alterados: {locais_alterados}")
+
+    @medir()
+    def import_coordinates_gui(self):
+        caminho = filedialog.askopenfilename(title="Gazetteer (endereco, latitude, longitude)", filetypes=[("CSV", "*.csv"), ("Todos os arquivos", "*.*")])
+        if not caminho:
+            return
+        try:
+            resumo, ignoradas = importar_coordenadas(caminho)
+        except (OSError, UnicodeDecodeError, ValueError) as erro:
+            messagebox.showerror("Erro", f"Não foi possível ler o gazetteer: {erro}")
+            return
+        mensagem = "\n".join(f"{'Usuários' if tabela == 'usuarios' else 'Locais'}: {alterados} com coordenadas novas, {nao_encontrados} endereço(s) não encontrado(s)"
+                             for tabela, (alterados, nao_encontrados) in resumo.items())
+        if ignoradas:
+            mensagem += f"\nLinhas ignoradas no gazetteer: {len(ignoradas)} (ex.: linha {ignoradas[0][0]}: {ignoradas[0][1]})"
+        if messagebox.askyesno("Coordenadas Importadas", f"{mensagem}\n\nRedistribuir agora todos os usuários pelos locais mais próximos? Os prazos de comparecimento serão refeitos."):
+            mudaram = redistribuir_locais()
+            messagebox.showinfo("Redistribuição", f"{mudaram} usuário(s) mudaram de local ou de prazo.")
+
+    @medir()
+    def import_file_gui(self, tabela):
+        caminho = filedialog.askopenfilename(title="Importar registros", filetypes=[("CSV ou JSONL", "*.csv *.jsonl"), ("Todos os arquivos", "*.*")])
+        if not caminho:
+            return
+
+        dados = usuarios if tabela == 'usuarios' else locais
+        reservados = (ADMIN_USERNAME,) if tabela == 'usuarios' else ()
+        try:
+            resultado = importar(caminho, tabela, dados, registrar_lote, reservados=reservados)
+        except (OSError, UnicodeDecodeError) as erro:
+            messagebox.showerror("Erro", f"Não foi possível ler o arquivo: {erro}")
+            return
+
+        mensagem = (f"Importados: {resultado.importados}\nRejeitados: {len(resultado.rejeitados)}\n"
+                    f"Velocidade: {resultado.registros_por_segundo:.0f} registros/s")
+        if resultado.rejeitados:
+            relatorio = caminho + '.rejeitados.csv'
+            resultado.salvar_rejeitados(relatorio)
+            mensagem += f"\nRelatório de rejeições: {relatorio}"
+        if resultado.interrompida is not None:
+            # Os lotes anteriores ao conflito ficaram gravados; o resto do arquivo não foi importado
+            messagebox.showwarning("Importação interrompida", f"{resultado.interrompida}\n"
+                                   f"Só os {resultado.importados} primeiros registros válidos foram importados.\n\n{mensagem}")
+        else:
+            messagebox.showinfo("Importação", mensagem)
+        if tabela == 'usuarios':
+            self.populate_user_tree()
+        else:
+            self.populate_local_tree()
+
+    @medir()
+    def export_file_gui(self, tabela):
+        caminho = filedialog.asksaveasfilename(title="Exportar registros", defaultextension=".csv",
+                                               filetypes=[("CSV", "*.csv"), ("JSONL", "*.jsonl"), ("Parquet", "*.parquet")])
+        if not caminho:
+            return
+        condicoes = SOMENTE_APTOS[tabela] if messagebox.askyesno("Exportar", "Exportar só os registros aptos?") else None
+        colunas = None
+        if messagebox.askyesno("Exportar", "Exportar só as colunas da listagem? (Não: todas as colunas)"):
+            colunas = [COLUNAS_EXPORTACAO[tabela][0] if campo is None else campo for campo in CAMPOS_COLUNAS[tabela].values()]
+
+        dados = usuarios if tabela == 'usuarios' else locais
+        reservados = (ADMIN_USERNAME,) if tabela == 'usuarios' else ()
+        try:
+            resultado = exportar(caminho, tabela, dados, colunas, condicoes, reservados=reservados)
+        except (OSError, ValueError) as erro:
+            messagebox.showerror("Erro", f"Não foi possível exportar: {erro}")
+            return
+        messagebox.showinfo("Exportação", f"Exportados: {resultado.exportados}\nArquivo: {caminho}\n"
+                                          f"Velocidade: {resultado.registros_por_segundo:.0f} registros/s")
+
+    @medir()
+    def sort_tree_by(self, tabela, coluna):
+        """Clique no cabeçalho: ordena a listagem pela coluna; um novo clique inverte a ordem."""
+        tree, paginada = (self.user_tree, self.tabela_usuarios) if tabela == 'usuarios' else (self.local_tree, self.tabela_locais)
+        anterior, decrescente = self.sort_columns.get(tabela, (None, False))
+        decrescente = not decrescente if coluna == anterior else False
+        self.sort_columns[tabela] = (coluna, decrescente)
+        for col in tree["columns"]:
+            tree.heading(col, text=col + ((" ▼" if decrescente else " ▲") if col == coluna else ""))
+        campo = CAMPOS_COLUNAS[tabela][coluna]
+        paginada.ordenar_por(lambda: ordem_registros(tabela, campo), decrescente)
+
     # --- Funções de Gerenciamento de Usuários (Admin) ---
+    @medir(tamanho=lambda self: len(self.tabela_usuarios.visiveis))
     def populate_user_tree(self):
-        for i in self.user_tree.get_children():
-            self.user_tree.delete(i)
+        self.tabela_usuarios.mostrar_pagina()
+
+    @medir()
+    def filter_users_gui(self):
+        busca = self.user_search_entry.get()
+        opcao = self.user_apto_option.get()
+        dias_prazo = DIAS_PRAZO if opcao.startswith("Prazo em") else None
+        if opcao == "Prazo vencido":
+            condicoes = {'local_designado': regras.PRAZO_VENCIDO}
+        else:
+            condicoes = {} if opcao == "Todos" or dias_prazo else {'apto': opcao == "Aptos"}
+        if not busca.strip() and not condicoes and dias_prazo is None:
+            self.tabela_usuarios.definir_filtro(None)
+        else:
+            self.tabela_usuarios.definir_filtro(lambda: filtrar_registros('usuarios', busca, dias_prazo, **condicoes))
 
-        for username, data in usuarios.items():
-            if username != ADMIN_USERNAME: # Não exibe o admin na lista de usuários gerenciáveis
-                user_name = data.get('nome', 'N/A')
-                user_idade = data.get('idade', 'N/A')
-                user_endereco = data.get('endereco', 'N/A')
-                user_apto = "Sim" if data.get('apto') else "Não" if data.get('apto') is not None else "N/A"
-                self.user_tree.insert("", "end", iid=username, values=(username, user_name, user_idade, user_endereco, user_apto))
+    def format_user_row(self, username, data):
+        if username == ADMIN_USERNAME: # Não exibe o admin na lista de usuários gerenciáveis
+            return None
+        user_name = data.get('nome', 'N/A')
+        user_idade = data.get('idade', 'N/A')
+        user_endereco = data.get('endereco', 'N/A')
+        user_apto = "Sim" if data.get('apto') else "Não" if data.get('apto') is not None else "N/A"
+        return (username, user_name, user_idade, user_endereco, user_apto)
 
     def load_selected_user_to_form(self, event):
         selected_item = self.user_tree.focus() # Get the iid directly
@@ -410,9 +1119,10 @@ class App(ctk.CTk):
 
         if user_data:
             self.clear_user_form()
+            self.user_form_version = versao_registro('usuarios', username)
             self.admin_user_username_entry.insert(0, username)
             self.admin_user_username_entry.configure(state="disabled") # Não permite alterar o username
-            self.admin_user_password_entry.insert(0, user_data.get('senha', ''))
+            # A senha não é exibida (só o hash é guardado); preencher o campo troca a senha
             self.admin_user_name_entry.insert(0, user_data.get('nome', ''))
             self.admin_user_idade_entry.insert(0, str(user_data.get('idade', '')))
             self.admin_user_endereco_entry.insert(0, user_data.get('endereco', ''))
@@ -421,6 +1131,7 @@ class App(ctk.CTk):
             self.admin_user_profissao_entry.insert(0, user_data.get('profissao', ''))
 
     def clear_user_form(self):
+        self.user_form_version = None
         self.admin_user_username_entry.configure(state="normal")
         self.admin_user_username_entry.delete(0, ctk.END)
         self.admin_user_password_entry.delete(0, ctk.END)
@@ -431,6 +1142,7 @@ class App(ctk.CTk):
         self.admin_user_renda_entry.delete(0, ctk.END)
         self.admin_user_profissao_entry.delete(0, ctk.END)
 
+    @medir()
     def add_user_admin_gui(self):
         username = self.admin_user_username_entry.get()
         senha = self.admin_user_password_entry.get()
@@ -448,45 +1160,38 @@ class App(ctk.CTk):
             messagebox.showerror("Erro", "Nome de usuário já existe ou é reservado.")
             return
         try:
-            idade_int = int(idade)
-            pessoas_casa_int = int(pessoas_casa)
-            renda_float = float(renda)
-        except ValueError:
-            messagebox.showerror("Erro", "Idade, Pessoas na Casa e Renda devem ser números.")
+            usuario = montar_usuario(nome, idade, endereco, pessoas_casa, renda, profissao)
+        except ValueError as erro:
+            messagebox.showerror("Erro", str(erro))
             return
 
-        apto = verificar_aptidao_usuario(idade_int, renda_float)
-        local_designado = endereco if apto else "N/A"
-        prazo_comparecimento = (datetime.date.today() + datetime.timedelta(days=15)).isoformat() if apto else "N/A"
-
-        usuarios[username] = {
-            "senha": senha,
-            "nome": nome,
-            "idade": idade_int,
-            "endereco": endereco,
-            "pessoas_casa": pessoas_casa_int,
-            "renda": renda_float,
-            "profissao": profissao,
-            "apto": apto,
-            "local_designado": local_designado,
-            "prazo_comparecimento": prazo_comparecimento,
-            "registrado": True
-        }
-        salvar_dados()
+        self.run_in_background(servico_autenticacao.gerar(senha), lambda senha_hash: self.finish_add_user(username, usuario, senha_hash))
+
+    @medir()
+    def finish_add_user(self, username, usuario, senha_hash):
+        if username in usuarios:
+            messagebox.showerror("Erro", "Nome de usuário já existe ou é reservado.")
+            return
+        usuario['senha'] = senha_hash
+        usuarios[username] = usuario
+        registrar_alteracao('usuarios', username)
         messagebox.showinfo("Sucesso", "Usuário adicionado!")
         self.clear_user_form()
-        self.populate_user_tree()
+        self.tabela_usuarios.atualizar_registro(username)
+        self.check_duplicates(username)
 
+    @medir()
     def update_user_admin_gui(self):
         username = self.admin_user_username_entry.get()
         if not username or username not in usuarios or username == ADMIN_USERNAME:
             messagebox.showerror("Erro", "Selecione um usuário para atualizar ou o usuário não existe.")
             return
 
+        conferir_versao('usuarios', username, self.user_form_version)
         # Coleta os valores dos campos. Se estiverem vazios, mantém os valores existentes
         user_data = usuarios[username]
         
-        user_data['senha'] = self.admin_user_password_entry.get() or user_data.get('senha', '')
+        nova_senha = self.admin_user_password_entry.get()
         user_data['nome'] = self.admin_user_name_entry.get() or user_data.get('nome', '')
         
         try:
@@ -507,17 +1212,21 @@ class App(ctk.CTk):
             messagebox.showerror("Erro", "Idade, Pessoas na Casa e Renda devem ser números.")
             return
 
-        # Recalcular aptidão e prazos
-        user_data['apto'] = verificar_aptidao_usuario(user_data['idade'], user_data['renda'])
-        user_data['local_designado'] = user_data['endereco'] if user_data['apto'] else "N/A"
-        user_data['prazo_comparecimento'] = (datetime.date.today() + datetime.timedelta(days=30)).isoformat() if user_data['apto'] else "N/A"
+        # Recalcular aptidão (local e prazo são definidos pelo alocador ao gravar)
+        user_data['apto'] = verificar_aptidao_usuario(user_data)
         user_data['registrado'] = True
+        if user_data.get('local_designado') == regras.PRAZO_VENCIDO:
+            user_data['local_designado'] = "N/A" # Salvo pelo administrador: volta a concorrer a uma vaga
 
-        salvar_dados()
+        registrar_alteracao('usuarios', username)
+        if nova_senha:
+            self.run_in_background(servico_autenticacao.gerar(nova_senha), lambda senha_hash: self.store_password_hash(username, senha_hash))
         messagebox.showinfo("Sucesso", "Usuário atualizado!")
         self.clear_user_form()
-        self.populate_user_tree()
+        self.tabela_usuarios.atualizar_registro(username)
+        self.check_duplicates(username)
 
+    @medir()
     def remove_user_admin_gui(self):
         selected_item = self.user_tree.focus() # Get the iid directly
         if not selected_item:
@@ -531,22 +1240,32 @@ class App(ctk.CTk):
 
         if messagebox.askyesno("Confirmar Remoção", f"Tem certeza que deseja remover o usuário {username}?"):
             if usuarios.pop(username, None):
-                salvar_dados()
+                registrar_alteracao('usuarios', username)
                 messagebox.showinfo("Sucesso", "Usuário removido!")
-                self.populate_user_tree()
+                self.tabela_usuarios.atualizar_registro(username)
                 self.clear_user_form()
             else:
                 messagebox.showerror("Erro", "Usuário não encontrado.")
 
     # --- Funções de Gerenciamento de Locais (Admin) ---
+    @medir(tamanho=lambda self: len(self.tabela_locais.visiveis))
     def populate_local_tree(self):
-        for i in self.local_tree.get_children():
-            self.local_tree.delete(i)
+        self.tabela_locais.mostrar_pagina()
+
+    @medir()
+    def filter_locais_gui(self):
+        busca = self.local_search_entry.get()
+        opcao = self.local_apto_option.get()
+        condicoes = {} if opcao == "Todos" else {'apto': "Sim" if opcao == "Aptos" else "Não"}
+        if not busca.strip() and not condicoes:
+            self.tabela_locais.definir_filtro(None)
+        else:
+            self.tabela_locais.definir_filtro(lambda: filtrar_registros('locais', busca, **condicoes))
 
-        for nome_local, data in locais.items():
-            capacidade = data.get('capacidade_producao', 'N/A')
-            apto = data.get('apto', 'N/A')
-            self.local_tree.insert("", "end", iid=nome_local, values=(nome_local, data.get('endereco', ''), data.get('responsavel', ''), capacidade, apto))
+    def format_local_row(self, nome_local, data):
+        capacidade = data.get('capacidade_producao', 'N/A')
+        apto = data.get('apto', 'N/A')
+        return (nome_local, data.get('endereco', ''), data.get('responsavel', ''), capacidade, apto)
 
     def load_selected_local_to_form(self, event):
         selected_item = self.local_tree.focus()
@@ -558,6 +1277,7 @@ class App(ctk.CTk):
 
         if local_data:
             self.clear_local_form()
+            self.local_form_version = versao_registro('locais', nome_local)
             self.local_nome_entry.insert(0, nome_local)
             self.local_nome_entry.configure(state="disabled") # Não permite alterar o nome do local
             self.local_endereco_entry.insert(0, local_data.get('endereco', ''))
@@ -567,6 +1287,7 @@ class App(ctk.CTk):
             self.local_area_entry.insert(0, str(local_data.get('area', '')))
 
     def clear_local_form(self):
+        self.local_form_version = None
         self.local_nome_entry.configure(state="normal")
         self.local_nome_entry.delete(0, ctk.END)
         self.local_endereco_entry.delete(0, ctk.END)
@@ -575,6 +1296,7 @@ class App(ctk.CTk):
         self.local_andares_entry.delete(0, ctk.END)
         self.local_area_entry.delete(0, ctk.END)
 
+    @medir()
     def add_local_gui(self):
         nome_local = self.local_nome_entry.get()
         endereco = self.local_endereco_entry.get()
@@ -590,37 +1312,25 @@ class App(ctk.CTk):
             messagebox.showerror("Erro", "Nome de local já existe.")
             return
         try:
-            andares_int = int(andares)
-            area_float = float(area)
-        except ValueError:
-            messagebox.showerror("Erro", "Andares e Área devem ser números.")
+            local = montar_local(nome_local, endereco, responsavel, contato, andares, area)
+        except ValueError as erro:
+            messagebox.showerror("Erro", str(erro))
             return
 
-        capacidade = calcular_capacidade_producao(andares_int, area_float)
-        apto = "Sim" if capacidade >= 1000 else "Não"
-
-        locais[nome_local] = {
-            "nome_local": nome_local,
-            "endereco": endereco,
-            "responsavel": responsavel,
-            "contato": contato,
-            "andares": andares_int,
-            "area": area_float,
-            "capacidade_producao": capacidade,
-            "apto": apto,
-            "mensagem": "O responsável será contatado para mais informações."
-        }
-        salvar_dados()
+        locais[nome_local] = local
+        registrar_alteracao('locais', nome_local)
         messagebox.showinfo("Sucesso", "Local adicionado!")
         self.clear_local_form()
-        self.populate_local_tree()
+        self.tabela_locais.atualizar_registro(nome_local)
 
+    @medir()
     def update_local_gui(self):
         nome_local = self.local_nome_entry.get()
         if not nome_local or nome_local not in locais:
             messagebox.showerror("Erro", "Selecione um local para atualizar ou o local não existe.")
             return
 
+        conferir_versao('locais', nome_local, self.local_form_version)
         local_data = locais[nome_local]
 
         local_data['endereco'] = self.local_endereco_entry.get() or local_data.get('endereco', '')
@@ -637,15 +1347,15 @@ class App(ctk.CTk):
             messagebox.showerror("Erro", "Andares e Área devem ser números.")
             return
 
-        capacidade = calcular_capacidade_producao(local_data['andares'], local_data['area'])
-        local_data['capacidade_producao'] = capacidade
-        local_data['apto'] = "Sim" if capacidade >= 1000 else "Não"
+        local_data['capacidade_producao'] = calcular_capacidade_producao(local_data)
+        local_data['apto'] = avaliar_local(local_data)
 
-        salvar_dados()
+        registrar_alteracao('locais', nome_local)
         messagebox.showinfo("Sucesso", "Local atualizado!")
         self.clear_local_form()
-        self.populate_local_tree()
+        self.tabela_locais.atualizar_registro(nome_local)
 
+    @medir()
     def remove_local_gui(self):
         selected_item = self.local_tree.focus()
         if not selected_item:
@@ -655,16 +1365,18 @@ class App(ctk.CTk):
         nome_local = self.local_tree.item(selected_item, "iid")
         if messagebox.askyesno("Confirmar Remoção", f"Tem certeza que deseja remover o local {nome_local}?"):
             if locais.pop(nome_local, None):
-                salvar_dados()
+                registrar_alteracao('locais', nome_local)
                 messagebox.showinfo("Sucesso", "Local removido!")
-                self.populate_local_tree()
+                self.tabela_locais.atualizar_registro(nome_local)
                 self.clear_local_form()
             else:
                 messagebox.showerror("Erro", "Local não encontrado.")
 
     # --- Funções do Usuário Comum ---
+    @medir()
     def load_user_common_data(self, username):
         user_data = usuarios.get(username)
+        self.common_form_version = versao_registro('usuarios', username)
         if user_data and user_data.get('registrado'):
             self.user_common_name_entry.delete(0, ctk.END)
             self.user_common_name_entry.insert(0, user_data.get('nome', ''))
@@ -695,6 +1407,7 @@ class App(ctk.CTk):
             if user_data and not user_data.get('registrado'):
                 messagebox.showinfo("Preencher Dados", "Por favor, preencha seus dados completos.")
 
+    @medir()
     def save_user_common_data(self):
         username = current_user_data
         if not username:
@@ -708,38 +1421,21 @@ class App(ctk.CTk):
         renda = self.user_common_renda_entry.get()
         profissao = self.user_common_profissao_entry.get()
 
-        if not all([nome, idade, endereco, pessoas_casa, renda, profissao]):
-            messagebox.showerror("Erro", "Todos os campos devem ser preenchidos.")
-            return
-
         try:
-            idade_int = int(idade)
-            pessoas_casa_int = int(pessoas_casa)
-            renda_float = float(renda)
-        except ValueError:
-            messagebox.showerror("Erro", "Idade, Pessoas na Casa e Renda devem ser números.")
+            dados = montar_usuario(nome, idade, endereco, pessoas_casa, renda, profissao)
+        except ValueError as erro:
+            messagebox.showerror("Erro", str(erro))
             return
 
-        apto = verificar_aptidao_usuario(idade_int, renda_float)
-        local_designado = endereco if apto else "N/A"
-        prazo_comparecimento = (datetime.date.today() + datetime.timedelta(days=30)).isoformat() if apto else "N/A"
-
-        usuarios[username].update({
-            "nome": nome,
-            "idade": idade_int,
-            "endereco": endereco,
-            "pessoas_casa": pessoas_casa_int,
-            "renda": renda_float,
-            "profissao": profissao,
-            "apto": apto,
-            "local_designado": local_designado,
-            "prazo_comparecimento": prazo_comparecimento,
-            "registrado": True
-        })
-        salvar_dados()
+        conferir_versao('usuarios', username, self.common_form_version)
+        usuarios[username].update(dados)
+        registrar_alteracao('usuarios', username)
+        self.common_form_version = versao_registro('usuarios', username)
         messagebox.showinfo("Sucesso", "Seus dados foram salvos!")
+        self.check_duplicates(username, avisar=False) # Quem revisa é o administrador
 
 # --- Execução da Aplicação ---
 if __name__ == "__main__":
+    iniciar_armazenamento()
     app = App()
     app.mainloop()
\ No newline at end of file
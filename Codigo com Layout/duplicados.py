@@ -0,0 +1,198 @@
+"""Detecção de cadastros duplicados: a mesma pessoa, ou a mesma família, com mais de um usuário.
+
+Comparar todos os pares seria quadrático. Em vez disso, cada usuário recebe poucas chaves de
+bloco, e só os usuários que dividem um bloco são comparados:
+  - prefixo de cada palavra do nome + número do endereço (a mesma pessoa, com grafias diferentes);
+  - endereço normalizado + pessoas na casa (a mesma família, com nomes diferentes).
+Blocos maiores que MAXIMO_BLOCO (nomes e ruas muito comuns) não distinguem ninguém e são ignorados.
+A semelhança entre nomes e entre endereços é o índice de Jaccard dos trigramas de caracteres.
+
+IndiceDuplicados guarda os blocos, mantidos a cada alteração, para conferir um cadastro em
+milissegundos; verificar_cadastro() percorre o cadastro inteiro uma vez e compara os blocos
+em paralelo num pool de processos.
+"""
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from indices import palavras
+
+MAXIMO_BLOCO = 200 # Blocos maiores são ignorados (não distinguem ninguém)
+LIMIAR_NOME = 0.6 # Mesma pessoa: nomes e endereços parecidos
+LIMIAR_ENDERECO = 0.5
+LIMIAR_FAMILIA = 0.85 # Mesma família: endereço quase igual, mesmas pessoas na casa e renda próxima
+DIFERENCA_RENDA = 0.1 # Diferença relativa máxima de renda para ser a mesma família
+MEMBROS_POR_TAREFA = 20000 # Entradas de blocos enviadas a cada processo de uma vez
+MINIMO_PARALELO = 50000 # Abaixo disso, comparar no próprio processo sai mais barato que iniciar o pool
+
+_IGNORADAS_NOME = frozenset(('da', 'de', 'do', 'das', 'dos', 'e'))
+_IGNORADAS_ENDERECO = frozenset(('rua', 'r', 'avenida', 'av', 'travessa', 'tv', 'alameda', 'al',
+                                 'estrada', 'praca', 'n', 'no', 'numero'))
+
+
+def caracteristicas(registro):
+    """(nome, endereço, pessoas na casa, renda) normalizados, ou None se o cadastro está incompleto."""
+    if registro is None or not registro.get('registrado', True):
+        return None
+    nome = ' '.join(palavra for palavra in palavras(registro.get('nome') or '') if palavra not in _IGNORADAS_NOME)
+    endereco = ' '.join(palavra for palavra in palavras(registro.get('endereco') or '') if palavra not in _IGNORADAS_ENDERECO)
+    if not nome or not endereco:
+        return None
+    return nome, endereco, registro.get('pessoas_casa'), registro.get('renda')
+
+
+def chaves_bloco(carac):
+    nome, endereco, pessoas, _ = carac
+    numero = next((palavra for palavra in endereco.split() if palavra.isdigit()), '')
+    chaves = {('n', sys.intern(palavra[:4]), sys.intern(numero)) for palavra in nome.split() if len(palavra) >= 3}
+    chaves.add(('c', sys.intern(endereco), pessoas))
+    return chaves
+
+
+def trigramas(texto):
+    texto = f'  {texto} '
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _jaccard(a, b):
+    comuns = len(a & b)
+    return comuns / (len(a) + len(b) - comuns) if a and b else 0.0
+
+
+def _renda_proxima(a, b):
+    if not all(isinstance(valor, (int, float)) and not isinstance(valor, bool) for valor in (a, b)):
+        return False
+    return abs(a - b) <= DIFERENCA_RENDA * max(abs(a), abs(b), 1)
+
+
+def comparar(a, b, trigramas=trigramas):
+    """(semelhança, motivo) se as características `a` e `b` parecem do mesmo cadastro; senão None.
+
+    `trigramas` pode ser uma versão com cache, quando o mesmo texto é comparado muitas vezes.
+    """
+    semelhanca_endereco = 1.0 if a[1] == b[1] else _jaccard(trigramas(a[1]), trigramas(b[1]))
+    if semelhanca_endereco < LIMIAR_ENDERECO:
+        return None # Os dois motivos exigem endereços parecidos: o nome nem precisa ser comparado
+    semelhanca_nome = 1.0 if a[0] == b[0] else _jaccard(trigramas(a[0]), trigramas(b[0]))
+    if semelhanca_nome >= LIMIAR_NOME:
+        return round((semelhanca_nome + semelhanca_endereco) / 2, 3), "Mesma pessoa"
+    if semelhanca_endereco >= LIMIAR_FAMILIA and a[2] == b[2] and _renda_proxima(a[3], b[3]):
+        return round(semelhanca_endereco, 3), "Mesma família"
+    return None
+
+
+def _comparar_blocos(blocos):
+    """Compara os pares de cada bloco [(username, características)]; roda nos processos do pool."""
+    cache = {}
+
+    def trigramas_em_cache(texto):
+        conjunto = cache.get(texto)
+        if conjunto is None:
+            conjunto = cache[texto] = trigramas(texto)
+        return conjunto
+
+    encontrados = {}
+    for membros in blocos:
+        for i, (usuario_a, carac_a) in enumerate(membros):
+            for usuario_b, carac_b in membros[i + 1:]:
+                par = (usuario_a, usuario_b) if usuario_a < usuario_b else (usuario_b, usuario_a)
+                if par in encontrados:
+                    continue # Os dois já se encontraram em outro bloco
+                resultado = comparar(carac_a, carac_b, trigramas_em_cache)
+                if resultado is not None:
+                    encontrados[par] = resultado
+    return encontrados
+
+
+class IndiceDuplicados:
+    """Blocos dos usuários, mantidos a cada alteração, para conferir um cadastro sem percorrer os outros."""
+
+    def __init__(self):
+        self.construido = False
+        self.blocos = {} # chave de bloco -> usernames
+        self.chaves = {} # username -> chaves de bloco, para retirar as antigas ao atualizar
+
+    def construir(self, usuarios):
+        self.blocos, self.chaves = {}, {}
+        self.construido = True
+        for username, registro in usuarios.items():
+            self.atualizar(username, registro)
+
+    def descartar(self):
+        self.blocos, self.chaves = {}, {}
+        self.construido = False
+
+    def atualizar(self, username, registro):
+        """Reflete o novo estado de um usuário (None quando ele foi removido)."""
+        if not self.construido:
+            return
+        for chave in self.chaves.pop(username, ()):
+            bloco = self.blocos[chave]
+            bloco.discard(username)
+            if not bloco:
+                del self.blocos[chave]
+        carac = caracteristicas(registro)
+        if carac is not None:
+            chaves = self.chaves[username] = chaves_bloco(carac)
+            for chave in chaves:
+                self.blocos.setdefault(chave, set()).add(username)
+
+    def verificar(self, username, registro, usuarios):
+        """Possíveis duplicados de um cadastro: [(outro username, semelhança, motivo)], do mais parecido."""
+        carac = caracteristicas(registro)
+        if carac is None:
+            return []
+        candidatos = set()
+        for chave in chaves_bloco(carac):
+            bloco = self.blocos.get(chave, ())
+            if len(bloco) <= MAXIMO_BLOCO:
+                candidatos.update(bloco)
+        candidatos.discard(username)
+        encontrados = []
+        for outro in candidatos:
+            carac_outro = caracteristicas(usuarios.get(outro))
+            resultado = carac_outro and comparar(carac, carac_outro)
+            if resultado:
+                encontrados.append((outro, *resultado))
+        return sorted(encontrados, key=lambda item: (-item[1], item[0]))
+
+
+def verificar_cadastro(usuarios, reservados=(), processos=None):
+    """Todos os pares de possíveis duplicados: [(username, outro, semelhança, motivo)], do mais parecido.
+
+    Uma passada monta os blocos; as comparações, limitadas a cada bloco, são divididas entre
+    `processos` processos (padrão: um por núcleo).
+    """
+    itens = usuarios.itens_sem_guardar() if hasattr(usuarios, 'itens_sem_guardar') else usuarios.items()
+    blocos = {}
+    for username, registro in itens:
+        carac = None if username in reservados else caracteristicas(registro)
+        if carac is not None:
+            for chave in chaves_bloco(carac):
+                blocos.setdefault(chave, []).append((username, carac))
+
+    tarefas, tarefa, tamanho = [], [], 0
+    for membros in blocos.values():
+        if 2 <= len(membros) <= MAXIMO_BLOCO:
+            tarefa.append(membros)
+            tamanho += len(membros)
+            if tamanho >= MEMBROS_POR_TAREFA:
+                tarefas.append(tarefa)
+                tarefa, tamanho = [], 0
+    if tarefa:
+        tarefas.append(tarefa)
+    del blocos
+
+    encontrados = {}
+    processos = processos or os.cpu_count() or 1
+    if processos == 1 or len(tarefas) == 1 or sum(map(len, tarefas)) * 10 < MINIMO_PARALELO:
+        for tarefa in tarefas:
+            encontrados.update(_comparar_blocos(tarefa))
+    else:
+        # "spawn" evita duplicar o processo da interface gráfica (Tk) com fork
+        with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context('spawn')) as pool:
+            for parcial in pool.map(_comparar_blocos, tarefas):
+                encontrados.update(parcial)
+    return sorted(((a, b, semelhanca, motivo) for (a, b), (semelhanca, motivo) in encontrados.items()),
+                  key=lambda item: (-item[2], item[0], item[1]))
@@ -0,0 +1,146 @@
+"""Estatísticas do cadastro para o painel do administrador, mantidas a cada alteração.
+
+Cada chave guarda a sua contribuição às contagens, somas e histogramas (uma tupla; a dos
+usuários é compartilhada entre os que contribuem igual); ao alterar um registro, a
+contribuição antiga é retirada e a nova somada, em O(1). A tabela inteira só é percorrida
+uma vez, na construção, que acontece quando o painel é aberto pela primeira vez.
+"""
+import datetime
+from bisect import bisect_right
+
+FAIXAS_RENDA = (0, 500, 1000, 1500, 2000, 3000, 5000) # Limite inferior de cada faixa do histograma de renda
+MAXIMO_PESSOAS = 6 # Última barra do histograma de pessoas na casa: "6 ou mais"
+DIAS_PRAZO = 7 # Prazos "desta semana": de hoje até daqui a 6 dias
+
+
+def _numero(valor):
+    return valor if isinstance(valor, (int, float)) and not isinstance(valor, bool) else None
+
+
+def rotulos_renda():
+    rotulos = [f"{inicio} a {fim}" for inicio, fim in zip(FAIXAS_RENDA, FAIXAS_RENDA[1:])]
+    return rotulos + [f"{FAIXAS_RENDA[-1]} ou mais"]
+
+
+def rotulos_pessoas():
+    return [str(quantidade) for quantidade in range(1, MAXIMO_PESSOAS)] + [f"{MAXIMO_PESSOAS} ou mais"]
+
+
+class EstatisticasCadastro:
+    """Contagens de usuários e locais, capacidade dos locais aptos, histogramas e prazos por data."""
+
+    def __init__(self):
+        self.construido = False
+        self._zerar()
+
+    def _zerar(self):
+        self.usuarios = 0
+        self.registrados = 0 # Cadastro completo (não só o pré-cadastro com a senha)
+        self.aptos = 0
+        self.renda = [0] * len(FAIXAS_RENDA)
+        self.pessoas = [0] * MAXIMO_PESSOAS
+        self.prazos = {} # data ISO -> usuários com esse prazo de comparecimento
+        self.locais = 0
+        self.locais_aptos = 0
+        self.capacidade_apta = 0.0
+        self._contribuicoes = {'usuarios': {}, 'locais': {}}
+        self._unicas = {} # Contribuições de usuários já vistas, para compartilhar entre registros iguais
+
+    # --- Contribuição de cada registro ---
+    def _contribuicao(self, tabela, registro):
+        if tabela == 'usuarios':
+            registrado = registro.get('registrado', True)
+            renda = _numero(registro.get('renda')) if registrado else None
+            pessoas = _numero(registro.get('pessoas_casa')) if registrado else None
+            prazo = registro.get('prazo_comparecimento')
+            contribuicao = (bool(registrado), registro.get('apto') is True,
+                            bisect_right(FAIXAS_RENDA, renda) - 1 if renda is not None and renda >= 0 else None,
+                            min(int(pessoas), MAXIMO_PESSOAS) - 1 if pessoas is not None and pessoas >= 1 else None,
+                            prazo if isinstance(prazo, str) else None)
+            return self._unicas.setdefault(contribuicao, contribuicao)
+        apto = registro.get('apto') in ("Sim", True)
+        return (apto, _numero(registro.get('capacidade_producao')) if apto else None)
+
+    def _somar(self, tabela, contribuicao, sinal):
+        if tabela == 'usuarios':
+            registrado, apto, faixa, pessoas, prazo = contribuicao
+            self.usuarios += sinal
+            self.registrados += sinal * registrado
+            self.aptos += sinal * apto
+            if faixa is not None:
+                self.renda[faixa] += sinal
+            if pessoas is not None:
+                self.pessoas[pessoas] += sinal
+            if prazo is not None:
+                restantes = self.prazos.get(prazo, 0) + sinal
+                if restantes:
+                    self.prazos[prazo] = restantes
+                else:
+                    del self.prazos[prazo]
+        else:
+            apto, capacidade = contribuicao
+            self.locais += sinal
+            self.locais_aptos += sinal * apto
+            if capacidade is not None:
+                self.capacidade_apta += sinal * capacidade
+
+    # --- Manutenção ---
+    def construir(self, usuarios, locais):
+        """Percorre as duas tabelas uma vez; depois disso, só atualizar() é necessário."""
+        self._zerar()
+        self.construido = True
+        for tabela, dados in (('usuarios', usuarios), ('locais', locais)):
+            for chave, registro in dados.items():
+                self.atualizar(tabela, chave, registro)
+
+    def descartar(self):
+        """Outro processo alterou o cadastro sem dizer o quê: a próxima consulta constrói de novo."""
+        self._zerar()
+        self.construido = False
+
+    def atualizar(self, tabela, chave, registro):
+        """Reflete o novo estado de um registro (None quando ele foi removido)."""
+        if not self.construido:
+            return # A construção lerá o estado atual
+        contribuicoes = self._contribuicoes[tabela]
+        antiga = contribuicoes.pop(chave, None)
+        if antiga is not None:
+            self._somar(tabela, antiga, -1)
+        if registro is not None:
+            nova = contribuicoes[chave] = self._contribuicao(tabela, registro)
+            self._somar(tabela, nova, 1)
+
+    # --- Consulta ---
+    def resumo(self, hoje=None):
+        """Valores do painel; custa o mesmo com mil ou com milhões de registros."""
+        hoje = hoje or datetime.date.today()
+        prazos_semana = sum(self.prazos.get((hoje + datetime.timedelta(days=dias)).isoformat(), 0) for dias in range(DIAS_PRAZO))
+        return {
+            'usuarios': self.usuarios,
+            'registrados': self.registrados,
+            'aptos': self.aptos,
+            'locais': self.locais,
+            'locais_aptos': self.locais_aptos,
+            'capacidade_apta': round(self.capacidade_apta, 2),
+            'prazos_semana': prazos_semana,
+            'renda': list(zip(rotulos_renda(), self.renda)),
+            'pessoas': list(zip(rotulos_pessoas(), self.pessoas)),
+        }
+
+
+def formatar_resumo(resumo):
+    """Texto do painel, o mesmo na interface gráfica e no terminal."""
+    linhas = [
+        f"Usuários: {resumo['usuarios']} ({resumo['registrados']} com cadastro completo)",
+        f"Usuários aptos: {resumo['aptos']}",
+        f"Locais: {resumo['locais']} ({resumo['locais_aptos']} aptos)",
+        f"Capacidade de produção dos locais aptos: {resumo['capacidade_apta']:.2f}",
+        f"Prazos de comparecimento nos próximos {DIAS_PRAZO} dias: {resumo['prazos_semana']}",
+    ]
+    maior = max([quantidade for _, quantidade in resumo['renda'] + resumo['pessoas']] + [1])
+    for titulo, histograma in (("Renda familiar", resumo['renda']), ("Pessoas na casa", resumo['pessoas'])):
+        linhas.append("")
+        linhas.append(f"{titulo}:")
+        for rotulo, quantidade in histograma:
+            linhas.append(f"  {rotulo:>14}  {quantidade:>9}  {'█' * round(30 * quantidade / maior)}")
+    return "\n".join(linhas)
@@ -0,0 +1,176 @@
+"""Exportação de usuários e locais em CSV, JSONL ou Parquet, em fluxo.
+
+Os registros são lidos e gravados em lotes de tamanho fixo, então a memória usada pela
+exportação não depende do tamanho do cadastro; nas tabelas que leem do disco (SQLite, snapshot
+binário) ou do serviço, os registros percorridos não ficam guardados. O arquivo é escrito com
+outro nome e só recebe o nome final quando termina. O Parquet (colunar, um grupo de linhas por
+lote) requer o pacote pyarrow, importado só quando usado.
+"""
+import csv
+import json
+import os
+import time
+from motor_regras import Regra
+
+TAMANHO_LOTE = 10000 # Registros gravados de cada vez
+FORMATOS = ('csv', 'jsonl', 'parquet')
+
+# Colunas exportadas por padrão; a primeira é a chave do registro. A senha nunca é exportada.
+COLUNAS = {
+    'usuarios': ('username', 'nome', 'idade', 'endereco', 'pessoas_casa', 'renda', 'profissao',
+                 'apto', 'local_designado', 'prazo_comparecimento', 'registrado', 'latitude', 'longitude'),
+    'locais': ('nome_local', 'endereco', 'responsavel', 'contato', 'andares', 'area',
+               'capacidade_producao', 'apto', 'mensagem', 'latitude', 'longitude'),
+}
+# Tipo de cada coluna no Parquet (as demais são texto); valores que não se convertem viram nulos
+TIPOS = {
+    'usuarios': {'idade': int, 'pessoas_casa': int, 'renda': float, 'apto': bool, 'registrado': bool,
+                 'latitude': float, 'longitude': float},
+    'locais': {'andares': int, 'area': float, 'capacidade_producao': float, 'latitude': float, 'longitude': float},
+}
+# Condição do extrato de aptos enviado aos parceiros
+SOMENTE_APTOS = {'usuarios': {'apto': True}, 'locais': {'apto': "Sim"}}
+
+
+class ResultadoExportacao:
+    """Resumo de uma exportação: quantos registros foram gravados e em quanto tempo."""
+
+    def __init__(self, caminho, formato):
+        self.caminho = caminho
+        self.formato = formato
+        self.exportados = 0
+        self.segundos = 0.0
+
+    @property
+    def registros_por_segundo(self):
+        return self.exportados / self.segundos if self.segundos else 0.0
+
+
+def formato_do_caminho(caminho):
+    """Formato pela extensão do arquivo (.csv, .jsonl ou .parquet)."""
+    formato = os.path.splitext(caminho)[1].lower().lstrip('.')
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportação desconhecido: '{formato}'. Use .csv, .jsonl ou .parquet.")
+    return formato
+
+
+def _atende(condicoes, regra):
+    """Predicado das condições campo=valor ou campo=(mínimo, máximo) e da expressão de filtro."""
+    def atende(registro):
+        for campo, condicao in condicoes.items():
+            valor = registro.get(campo)
+            if isinstance(condicao, tuple):
+                minimo, maximo = condicao
+                if (not isinstance(valor, (int, float)) or isinstance(valor, bool)
+                        or (minimo is not None and valor < minimo) or (maximo is not None and valor > maximo)):
+                    return False
+            elif valor != condicao:
+                return False
+        return regra is None or bool(regra(registro))
+    return atende
+
+
+def ler_lotes(tabela, dados, colunas, atende, reservados=(), tamanho_lote=TAMANHO_LOTE):
+    """Percorre a tabela uma vez, devolvendo listas de até `tamanho_lote` linhas (valores na ordem de `colunas`)."""
+    campo_chave = COLUNAS[tabela][0]
+    posicao_chave = colunas.index(campo_chave) if campo_chave in colunas else None
+    campos = [coluna for coluna in colunas if coluna != campo_chave]
+    # Tabelas lidas do disco ou do serviço percorrem sem guardar o que leram
+    itens = dados.itens_sem_guardar() if hasattr(dados, 'itens_sem_guardar') else dados.items()
+    lote = []
+    for chave, registro in itens:
+        if chave in reservados or not atende(registro):
+            continue
+        obter = registro.get
+        linha = [obter(campo) for campo in campos]
+        if posicao_chave is not None:
+            linha.insert(posicao_chave, chave)
+        lote.append(linha)
+        if len(lote) >= tamanho_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# --- Formatos ---
+def _gravar_csv(caminho, tabela, colunas, lotes):
+    with open(caminho, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(colunas)
+        for lote in lotes:
+            escritor.writerows(lote)
+
+
+def _gravar_jsonl(caminho, tabela, colunas, lotes):
+    codificar = json.JSONEncoder(ensure_ascii=False).encode
+    with open(caminho, 'w', encoding='utf-8') as f:
+        for lote in lotes:
+            f.write(''.join(codificar(dict(zip(colunas, linha))) + '\n' for linha in lote))
+
+
+def _converter(valor, tipo):
+    if valor is None:
+        return None
+    if tipo is bool:
+        return valor if isinstance(valor, bool) else None
+    try:
+        return tipo(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _gravar_parquet(caminho, tabela, colunas, lotes):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Exportar em Parquet requer o pacote pyarrow (pip install pyarrow).")
+    tipos = [TIPOS[tabela].get(coluna, str) for coluna in colunas]
+    tipos_arrow = {str: pa.string(), int: pa.int64(), float: pa.float64(), bool: pa.bool_()}
+    esquema = pa.schema([(coluna, tipos_arrow[tipo]) for coluna, tipo in zip(colunas, tipos)])
+    with pq.ParquetWriter(caminho, esquema) as escritor:
+        for lote in lotes:
+            arrays = [pa.array([_converter(valor, tipo) for valor in valores], type=tipos_arrow[tipo])
+                      for valores, tipo in zip(zip(*lote), tipos)]
+            escritor.write_table(pa.Table.from_arrays(arrays, schema=esquema))
+
+
+GRAVADORES = {'csv': _gravar_csv, 'jsonl': _gravar_jsonl, 'parquet': _gravar_parquet}
+
+
+def exportar(caminho, tabela, dados, colunas=None, condicoes=None, filtro=None, reservados=(),
+             formato=None, tamanho_lote=TAMANHO_LOTE):
+    """Exporta os registros de `dados` que atendem aos filtros, só com as colunas pedidas.
+
+    `condicoes` segue a API de consulta (campo=valor ou campo=(mínimo, máximo)) e `filtro` é uma
+    expressão como as das regras (ex.: "renda / pessoas_casa <= 500"). O formato vem da extensão
+    de `caminho`, se não for informado. Lança ValueError (ErroRegra, no filtro) se algo for inválido
+    e OSError se não for possível gravar; nesse caso nenhum arquivo parcial fica para trás.
+    """
+    formato = formato or formato_do_caminho(caminho)
+    if formato not in GRAVADORES:
+        raise ValueError(f"Formato de exportação desconhecido: '{formato}'.")
+    colunas = tuple(colunas or COLUNAS[tabela])
+    desconhecidas = [coluna for coluna in colunas if coluna not in COLUNAS[tabela]]
+    if desconhecidas:
+        raise ValueError(f"Colunas desconhecidas: {', '.join(desconhecidas)}.")
+    atende = _atende(condicoes or {}, Regra(filtro) if filtro else None)
+
+    resultado = ResultadoExportacao(caminho, formato)
+    inicio = time.perf_counter()
+
+    def contados():
+        for lote in ler_lotes(tabela, dados, colunas, atende, reservados, tamanho_lote):
+            resultado.exportados += len(lote)
+            yield lote
+
+    temporario = f"{caminho}.{os.getpid()}.parcial"
+    try:
+        GRAVADORES[formato](temporario, tabela, colunas, contados())
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
@@ -0,0 +1,227 @@
+"""Coordenadas dos endereços e busca dos locais mais próximos.
+
+Latitude e longitude são campos opcionais de usuários e locais. Elas vêm de um gazetteer local
+em CSV (colunas endereco, latitude, longitude), sem consultar nenhum serviço externo: o endereço
+é procurado normalizado e, se não estiver lá, sem os números (o ponto médio da rua).
+
+GradeEspacial divide o mapa em células quadradas. A busca dos mais próximos percorre anéis de
+células em volta do ponto e para assim que nenhum anel ainda não visto pode ter algo mais perto
+do que o já encontrado. Inserir, mover e remover um local custa O(1), então a grade acompanha as
+alterações do cadastro; só quando as células ficam cheias demais (locais concentrados numa
+cidade) ela é refeita com células de metade do tamanho.
+"""
+import csv
+import math
+
+from indices import palavras
+
+TAMANHO_CELULA = 0.05 # Graus (~5,5 km de latitude), tamanho inicial
+PONTOS_POR_CELULA = 4 # Média acima da qual as células são divididas
+TAMANHO_MINIMO = 0.0005 # Graus (~55 m): locais no mesmo endereço não dividem as células sem fim
+RAIO_TERRA_KM = 6371.0
+KM_POR_GRAU = math.pi * RAIO_TERRA_KM / 180
+
+
+def ler_coordenadas(latitude, longitude):
+    """(latitude, longitude) como floats, None se as duas estão vazias; ValueError se inválidas."""
+    if latitude in (None, '') and longitude in (None, ''):
+        return None
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError("Latitude e longitude devem ser números.")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("Latitude deve estar entre -90 e 90 e longitude entre -180 e 180.")
+    return latitude, longitude
+
+
+def coordenadas(registro):
+    """(latitude, longitude) do registro, ou None se ele não tem coordenadas válidas."""
+    if registro is None:
+        return None
+    latitude, longitude = registro.get('latitude'), registro.get('longitude')
+    if not all(isinstance(valor, (int, float)) and not isinstance(valor, bool) for valor in (latitude, longitude)):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+def distancia_km(latitude_a, longitude_a, latitude_b, longitude_b):
+    """Distância sobre a superfície da Terra (haversine)."""
+    fi_a, fi_b = math.radians(latitude_a), math.radians(latitude_b)
+    seno_lat = math.sin((fi_b - fi_a) / 2)
+    seno_lon = math.sin(math.radians(longitude_b - longitude_a) / 2)
+    return 2 * RAIO_TERRA_KM * math.asin(min(1.0, math.sqrt(seno_lat * seno_lat + math.cos(fi_a) * math.cos(fi_b) * seno_lon * seno_lon)))
+
+
+# --- Gazetteer ---
+def _chave_endereco(endereco):
+    return ' '.join(palavras(endereco or ''))
+
+
+def _chave_rua(chave):
+    return ' '.join(palavra for palavra in chave.split() if not palavra.isdigit())
+
+
+class Gazetteer:
+    """Endereços conhecidos e as suas coordenadas, lidos de um CSV local."""
+
+    def __init__(self):
+        self.enderecos = {} # endereço normalizado -> (latitude, longitude)
+        self.ruas = {} # endereço sem números -> (soma das latitudes, soma das longitudes, quantidade)
+        self.ignoradas = [] # (número da linha, motivo)
+
+    def adicionar(self, endereco, latitude, longitude):
+        chave = _chave_endereco(endereco)
+        if not chave:
+            raise ValueError("Endereço vazio.")
+        self.enderecos[chave] = (latitude, longitude)
+        soma_lat, soma_lon, quantidade = self.ruas.get(_chave_rua(chave), (0.0, 0.0, 0))
+        self.ruas[_chave_rua(chave)] = (soma_lat + latitude, soma_lon + longitude, quantidade + 1)
+
+    def localizar(self, endereco):
+        """Coordenadas do endereço, ou o ponto médio da rua se o número não estiver no gazetteer; None se nenhum."""
+        chave = _chave_endereco(endereco)
+        if chave in self.enderecos:
+            return self.enderecos[chave]
+        rua = self.ruas.get(_chave_rua(chave))
+        if rua is None:
+            return None
+        soma_lat, soma_lon, quantidade = rua
+        return soma_lat / quantidade, soma_lon / quantidade
+
+    def __len__(self):
+        return len(self.enderecos)
+
+
+def carregar_gazetteer(caminho):
+    """Lê o CSV (com cabeçalho endereco,latitude,longitude). Linhas inválidas vão para `ignoradas`."""
+    gazetteer = Gazetteer()
+    with open(caminho, 'r', newline='', encoding='utf-8-sig') as f:
+        leitor = csv.DictReader(f)
+        faltando = {'endereco', 'latitude', 'longitude'} - set(leitor.fieldnames or ())
+        if faltando:
+            raise ValueError(f"O gazetteer precisa das colunas endereco, latitude e longitude (faltando: {', '.join(sorted(faltando))}).")
+        for numero, campos in enumerate(leitor, start=2): # A linha 1 é o cabeçalho
+            try:
+                ponto = ler_coordenadas(campos['latitude'], campos['longitude'])
+                if ponto is None:
+                    raise ValueError("Coordenadas vazias.")
+                gazetteer.adicionar(campos['endereco'], *ponto)
+            except ValueError as erro:
+                gazetteer.ignoradas.append((numero, str(erro)))
+    return gazetteer
+
+
+def aplicar_coordenadas(dados, gazetteer, sobrescrever=False):
+    """Preenche latitude e longitude pelo endereço de cada registro, de uma vez para a tabela inteira.
+
+    Registros que já têm coordenadas só mudam com `sobrescrever`. Devolve (lista de
+    (chave, registro) alterados, para gravar em lote, e quantos endereços não foram encontrados).
+    """
+    alterados = []
+    nao_encontrados = 0
+    for chave, registro in dados.items():
+        atual = coordenadas(registro)
+        if atual is not None and not sobrescrever:
+            continue
+        ponto = gazetteer.localizar(registro.get('endereco'))
+        if ponto is None:
+            nao_encontrados += 1
+        elif ponto != atual:
+            registro['latitude'], registro['longitude'] = ponto
+            alterados.append((chave, registro))
+    return alterados, nao_encontrados
+
+
+# --- Índice espacial ---
+class GradeEspacial:
+    """Pontos (nome -> latitude, longitude) agrupados em células quadradas, para achar os mais próximos."""
+
+    def __init__(self, tamanho_celula=TAMANHO_CELULA):
+        self.tamanho_celula = tamanho_celula
+        self.celulas = {} # (linha, coluna) -> {nome: (latitude, longitude)}
+        self.posicoes = {} # nome -> célula, para retirar o ponto antigo ao mover
+
+    def _celula(self, latitude, longitude):
+        return math.floor(latitude / self.tamanho_celula), math.floor(longitude / self.tamanho_celula)
+
+    def __len__(self):
+        return len(self.posicoes)
+
+    def definir(self, nome, ponto):
+        """Coloca, move ou (ponto None) retira um ponto."""
+        celula = self.posicoes.pop(nome, None)
+        if celula is not None:
+            pontos = self.celulas[celula]
+            del pontos[nome]
+            if not pontos:
+                del self.celulas[celula]
+        if ponto is not None:
+            celula = self._celula(*ponto)
+            self.celulas.setdefault(celula, {})[nome] = ponto
+            self.posicoes[nome] = celula
+            if (len(self.posicoes) > 64 and len(self.posicoes) > PONTOS_POR_CELULA * len(self.celulas)
+                    and self.tamanho_celula / 2 >= TAMANHO_MINIMO):
+                self._dividir()
+
+    def _dividir(self):
+        """Refaz a grade com células de metade do tamanho."""
+        pontos = [ponto for celula in self.celulas.values() for ponto in celula.items()]
+        self.tamanho_celula /= 2
+        self.celulas, self.posicoes = {}, {}
+        for nome, ponto in pontos:
+            celula = self._celula(*ponto)
+            self.celulas.setdefault(celula, {})[nome] = ponto
+            self.posicoes[nome] = celula
+
+    def _anel(self, linha, coluna, raio):
+        if raio == 0:
+            yield linha, coluna
+            return
+        for deslocamento in range(-raio, raio + 1):
+            yield linha - raio, coluna + deslocamento
+            yield linha + raio, coluna + deslocamento
+        for deslocamento in range(-raio + 1, raio):
+            yield linha + deslocamento, coluna - raio
+            yield linha + deslocamento, coluna + raio
+
+    def mais_proximos(self, latitude, longitude, quantidade=1, aceitar=None):
+        """Até `quantidade` pontos [(distância em km, nome)], do mais perto, que passam em aceitar(nome)."""
+        encontrados = [] # (distância, nome), ordenada, com no máximo `quantidade` itens
+
+        def considerar(pontos):
+            for nome, (lat, lon) in pontos.items():
+                if aceitar is not None and not aceitar(nome):
+                    continue
+                distancia = distancia_km(latitude, longitude, lat, lon)
+                if len(encontrados) < quantidade or distancia < encontrados[-1][0]:
+                    encontrados.append((distancia, nome))
+                    encontrados.sort()
+                    del encontrados[quantidade:]
+
+        linha, coluna = self._celula(latitude, longitude)
+        vistas = 0
+        raio = 0
+        while vistas < len(self.celulas):
+            if 8 * raio > len(self.celulas) - vistas:
+                # Anéis grandes e quase vazios: mais barato olhar direto as células que faltam
+                for celula, pontos in self.celulas.items():
+                    if max(abs(celula[0] - linha), abs(celula[1] - coluna)) >= raio:
+                        considerar(pontos)
+                break
+            for celula in self._anel(linha, coluna, raio):
+                pontos = self.celulas.get(celula)
+                if pontos:
+                    vistas += 1
+                    considerar(pontos)
+            # Tudo fora dos anéis vistos está a pelo menos `raio` células de distância. Um grau de
+            # longitude encolhe com a latitude: vale a célula mais estreita que esses pontos podem ter.
+            if len(encontrados) == quantidade:
+                graus = raio * self.tamanho_celula
+                limite = 0.95 * graus * KM_POR_GRAU * math.cos(math.radians(min(89.9, abs(latitude) + graus)))
+                if encontrados[-1][0] <= limite:
+                    break
+            raio += 1
+        return encontrados
@@ -0,0 +1,114 @@
+import threading
+from telemetria import medir
+
+# --- Configurações da Gravação em Segundo Plano ---
+JANELA_GRAVACAO = 0.2 # Segundos que o gravador espera juntando edições antes de gravar
+LIMITE_PENDENTES = 5000 # Registros aguardando gravação antes de quem chama precisar esperar
+ESPERA_APOS_ERRO = 1.0 # Segundos até tentar de novo depois de uma falha de escrita
+
+
+class GravadorSegundoPlano:
+    """Grava as alterações do cadastro numa thread separada.
+
+    marcar() só copia os registros alterados e avisa a thread, por isso volta em microssegundos.
+    A thread espera a janela de gravação, junta tudo o que chegou nesse intervalo (várias
+    edições do mesmo registro viram uma só) e grava com um registrar_lote() por tabela.
+    A compactação, quando o armazenamento pede, também acontece nessa thread.
+    """
+
+    def __init__(self, armazenamento, obter_tabelas, janela=JANELA_GRAVACAO, limite_pendentes=LIMITE_PENDENTES):
+        self.armazenamento = armazenamento
+        self.obter_tabelas = obter_tabelas # Função que devolve {'usuarios': ..., 'locais': ...} atuais
+        self.janela = janela
+        self.limite_pendentes = limite_pendentes
+        self.erro = None # Última falha de escrita; as alterações continuam pendentes
+        self._condicao = threading.Condition()
+        self._pendentes = {} # tabela -> {chave: cópia do registro, ou None para remoção}
+        self._quantidade = 0
+        self._agendadas = 0 # Lotes de marcar() recebidos
+        self._concluidas = 0 # Lotes de marcar() já gravados
+        self._urgente = False # Alguém está esperando: grava sem aguardar a janela
+        self._encerrar = False
+        self._thread = threading.Thread(target=self._executar, name='gravador', daemon=True)
+        self._thread.start()
+
+    def marcar(self, tabela, itens):
+        """Agenda a gravação de (chave, dados). Os registros são copiados agora, na thread de quem chama."""
+        with self._condicao:
+            pendentes = self._pendentes.setdefault(tabela, {})
+            for chave, dados in itens:
+                if chave not in pendentes:
+                    self._quantidade += 1
+                pendentes[chave] = dict(dados) if dados is not None else None
+            self._agendadas += 1
+            self._condicao.notify_all()
+            if self._quantidade > self.limite_pendentes:
+                # Rajada grande demais (importação, recálculo): espera o disco alcançar
+                self._urgente = True
+                self._condicao.wait_for(lambda: self._quantidade <= self.limite_pendentes or self.erro is not None)
+
+    def descarregar(self):
+        """Bloqueia até que tudo o que foi marcado até agora esteja gravado. Relança a falha de escrita, se houver."""
+        with self._condicao:
+            alvo = self._agendadas
+            self._urgente = True
+            self._condicao.notify_all()
+            self._condicao.wait_for(lambda: self._concluidas >= alvo or self.erro is not None)
+            if self.erro is not None and self._concluidas < alvo:
+                raise self.erro
+
+    def encerrar(self):
+        """Grava o que estiver pendente e finaliza a thread."""
+        try:
+            self.descarregar()
+        finally:
+            with self._condicao:
+                self._encerrar = True
+                self._condicao.notify_all()
+            self._thread.join()
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                self._condicao.wait_for(lambda: self._pendentes or self._encerrar)
+                if not self._pendentes:
+                    return
+                # Janela de agrupamento: outras edições que chegarem agora entram no mesmo lote
+                self._condicao.wait_for(lambda: self._urgente or self._encerrar, timeout=self.janela)
+                lote, self._pendentes = self._pendentes, {}
+                self._quantidade = 0
+                alvo = self._agendadas
+                self._urgente = False
+            try:
+                self._gravar(lote)
+            except Exception as erro:
+                with self._condicao:
+                    # Devolve o lote à fila sem sobrescrever edições mais novas do mesmo registro
+                    for tabela, registros in lote.items():
+                        pendentes = self._pendentes.setdefault(tabela, {})
+                        for chave, dados in registros.items():
+                            if chave not in pendentes:
+                                pendentes[chave] = dados
+                                self._quantidade += 1
+                    self.erro = erro
+                    self._condicao.notify_all()
+                    if self._encerrar:
+                        return
+                    self._condicao.wait_for(lambda: self._encerrar, timeout=ESPERA_APOS_ERRO)
+                continue
+            with self._condicao:
+                self.erro = None
+                self._concluidas = alvo
+                self._condicao.notify_all()
+
+    @medir('gravacao_em_segundo_plano', tamanho=lambda self, lote: sum(map(len, lote.values())))
+    def _gravar(self, lote):
+        for tabela, registros in lote.items():
+            self.armazenamento.registrar_lote(tabela, list(registros.items()))
+        if self.armazenamento.precisa_compactar():
+            # Cópia rasa de cada tabela e registro: a interface continua alterando os originais.
+            # Um snapshot mapeado é percorrido sem guardar em memória os registros que ninguém usou.
+            tabelas = {nome: {chave: dict(registro) for chave, registro in
+                              (dados.itens_sem_guardar() if hasattr(dados, 'itens_sem_guardar') else dict(dados).items())}
+                       for nome, dados in self.obter_tabelas().items()}
+            self.armazenamento.compactar(tabelas)
@@ -0,0 +1,118 @@
+import csv
+import json
+import time
+from armazenamento import ConflitoVersao
+from regras import montar_usuario, montar_local
+from geografia import ler_coordenadas
+
+TAMANHO_LOTE = 1000 # Registros validados antes de cada gravação em lote
+
+CAMPOS_USUARIO = ('nome', 'idade', 'endereco', 'pessoas_casa', 'renda', 'profissao')
+CAMPOS_LOCAL = ('nome_local', 'endereco', 'responsavel', 'contato', 'andares', 'area')
+
+
+class ResultadoImportacao:
+    """Resumo de uma importação: quantos registros entraram e quais linhas foram rejeitadas."""
+
+    def __init__(self):
+        self.importados = 0
+        self.rejeitados = [] # (número da linha, motivo)
+        self.segundos = 0.0
+        self.interrompida = None # ConflitoVersao que parou a importação; os lotes anteriores ficaram gravados
+
+    @property
+    def registros_por_segundo(self):
+        total = self.importados + len(self.rejeitados)
+        return total / self.segundos if self.segundos else 0.0
+
+    def salvar_rejeitados(self, caminho):
+        """Grava um CSV com as linhas rejeitadas e o motivo de cada uma."""
+        with open(caminho, 'w', newline='', encoding='utf-8') as f:
+            escritor = csv.writer(f)
+            escritor.writerow(['linha', 'motivo'])
+            escritor.writerows(self.rejeitados)
+
+
+def ler_arquivo(caminho):
+    """Lê um arquivo CSV (com cabeçalho) ou JSONL sob demanda, devolvendo (número da linha, campos)."""
+    if caminho.lower().endswith('.jsonl'):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            for numero, linha in enumerate(f, start=1):
+                if not linha.strip():
+                    continue
+                try:
+                    yield numero, json.loads(linha)
+                except json.JSONDecodeError:
+                    yield numero, None
+    else:
+        with open(caminho, 'r', newline='', encoding='utf-8-sig') as f:
+            for numero, campos in enumerate(csv.DictReader(f), start=2): # A linha 1 é o cabeçalho
+                yield numero, campos
+
+
+def _montar(tabela, campos):
+    if tabela == 'usuarios':
+        registro = montar_usuario(*(campos.get(campo) for campo in CAMPOS_USUARIO), senha=campos.get('senha'))
+    else:
+        registro = montar_local(*(campos.get(campo) for campo in CAMPOS_LOCAL))
+    ponto = ler_coordenadas(campos.get('latitude'), campos.get('longitude')) # Colunas opcionais
+    if ponto is not None:
+        registro['latitude'], registro['longitude'] = ponto
+    return registro
+
+
+def importar(caminho, tabela, dados, gravar_lote, campo_chave=None, reservados=(), tamanho_lote=TAMANHO_LOTE):
+    """Importa usuários ou locais de um CSV/JSONL, validando com as mesmas regras dos formulários.
+
+    O arquivo é lido em fluxo; a cada `tamanho_lote` registros válidos, o lote é inserido em
+    `dados` e persistido com uma única chamada a gravar_lote(tabela, itens). Se outra estação
+    gravar uma das chaves no meio do caminho (ConflitoVersao), a importação para ali: o lote
+    recusado sai de `dados`, os anteriores continuam gravados e o erro fica em `interrompida`.
+    """
+    if campo_chave is None:
+        campo_chave = 'username' if tabela == 'usuarios' else 'nome_local'
+    resultado = ResultadoImportacao()
+    inicio = time.perf_counter()
+    lote = {}
+
+    def descarregar():
+        dados.update(lote)
+        try:
+            gravar_lote(tabela, list(lote.items()))
+        except ConflitoVersao as erro:
+            # Nada do lote foi gravado: tira de `dados` o que ainda é deste arquivo
+            for chave, registro in lote.items():
+                if hasattr(dados, 'descartar'):
+                    dados.descartar(chave) # Tabela remota: a próxima leitura traz o que está no serviço
+                elif dados.get(chave) is registro:
+                    del dados[chave]
+            resultado.interrompida = erro
+            return False
+        resultado.importados += len(lote)
+        lote.clear()
+        return True
+
+    for numero, campos in ler_arquivo(caminho):
+        if not isinstance(campos, dict):
+            resultado.rejeitados.append((numero, "Linha mal formada."))
+            continue
+        chave = campos.get(campo_chave)
+        if not chave or not isinstance(chave, str):
+            resultado.rejeitados.append((numero, f"Campo '{campo_chave}' ausente ou inválido."))
+            continue
+        if chave in reservados or chave in lote or chave in dados:
+            resultado.rejeitados.append((numero, f"'{chave}' já existe ou é reservado."))
+            continue
+        try:
+            lote[chave] = _montar(tabela, campos)
+        except ValueError as erro:
+            resultado.rejeitados.append((numero, str(erro)))
+            continue
+        if len(lote) >= tamanho_lote and not descarregar():
+            break
+    else:
+        if lote:
+            descarregar()
+
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
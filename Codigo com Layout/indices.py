@@ -0,0 +1,333 @@
+import re
+import sys
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+
+# Campos indexados de cada tabela: (índices hash para igualdade, índices ordenados para faixas)
+CAMPOS_INDEXADOS = {
+    'usuarios': (('apto', 'endereco', 'profissao', 'local_designado'), ('idade', 'renda')),
+    'locais': (('apto', 'endereco'), ('capacidade_producao',)),
+}
+
+# Campos pesquisados pela busca textual (além da própria chave do registro)
+CAMPOS_BUSCA = {
+    'usuarios': ('nome', 'endereco', 'profissao'),
+    'locais': ('nome_local', 'endereco', 'responsavel'),
+}
+
+
+class IndiceHash:
+    """Índice de igualdade: valor -> conjunto de chaves."""
+
+    def __init__(self, campo):
+        self.campo = campo
+        self.grupos = {}
+        self.valores = {} # chave -> valor indexado, para retirar a entrada antiga ao atualizar
+
+    def atualizar(self, chave, registro):
+        antigo = self.valores.pop(chave, None)
+        if antigo is not None:
+            grupo = self.grupos[antigo]
+            grupo.discard(chave)
+            if not grupo:
+                del self.grupos[antigo]
+        valor = registro.get(self.campo) if registro is not None else None
+        if valor is not None:
+            self.grupos.setdefault(valor, set()).add(chave)
+            self.valores[chave] = valor
+
+    def buscar(self, valor):
+        return self.grupos.get(valor, set())
+
+
+class IndiceOrdenado:
+    """Índice de faixa: lista ordenada de (valor, chave), consultada por busca binária."""
+
+    def __init__(self, campo):
+        self.campo = campo
+        self.entradas = []
+        self.valores = {}
+
+    def atualizar(self, chave, registro):
+        antigo = self.valores.pop(chave, None)
+        if antigo is not None:
+            del self.entradas[bisect_left(self.entradas, (antigo, chave))]
+        valor = registro.get(self.campo) if registro is not None else None
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            insort(self.entradas, (valor, chave))
+            self.valores[chave] = valor
+
+    def faixa(self, minimo=None, maximo=None):
+        """Chaves com minimo <= valor <= maximo (None deixa o lado em aberto)."""
+        inicio = 0 if minimo is None else bisect_left(self.entradas, (minimo,))
+        # (maximo, chr(0x10FFFF)) fica depois de qualquer (maximo, chave)
+        fim = len(self.entradas) if maximo is None else bisect_right(self.entradas, (maximo, chr(0x10FFFF)))
+        return {chave for _, chave in self.entradas[inicio:fim]}
+
+
+class IndicesTabela:
+    """Conjunto de índices secundários de uma tabela, mantidos a cada alteração de registro.
+
+    Até construir() ser chamado (construido=False), as alterações são ignoradas: a função
+    consultar() constrói os índices na primeira consulta.
+    """
+
+    def __init__(self, tabela):
+        campos_hash, campos_ordenados = CAMPOS_INDEXADOS[tabela]
+        self.indices = {campo: IndiceHash(campo) for campo in campos_hash}
+        self.indices.update({campo: IndiceOrdenado(campo) for campo in campos_ordenados})
+        self.construido = False
+
+    def construir(self, dados):
+        """Reconstrói todos os índices a partir do conteúdo atual da tabela."""
+        self.indices = {campo: type(indice)(campo) for campo, indice in self.indices.items()}
+        self.construido = True
+        for chave, registro in dados.items():
+            self.atualizar(chave, registro)
+
+    def atualizar(self, chave, registro):
+        """Reflete o novo estado de um registro (None quando ele foi removido)."""
+        if not self.construido:
+            return
+        for indice in self.indices.values():
+            indice.atualizar(chave, registro)
+
+    def consultar(self, **condicoes):
+        """Chaves que atendem a todas as condições: campo=valor ou campo=(mínimo, máximo)."""
+        conjuntos = []
+        for campo, condicao in condicoes.items():
+            indice = self.indices.get(campo)
+            if indice is None:
+                raise ValueError(f"O campo '{campo}' não é indexado.")
+            if isinstance(indice, IndiceOrdenado):
+                minimo, maximo = condicao if isinstance(condicao, tuple) else (condicao, condicao)
+                conjuntos.append(indice.faixa(minimo, maximo))
+            else:
+                conjuntos.append(indice.buscar(condicao))
+        if not conjuntos:
+            raise ValueError("Informe ao menos uma condição.")
+        conjuntos.sort(key=len)
+        return set.intersection(*conjuntos) if len(conjuntos) > 1 else set(conjuntos[0])
+
+
+# --- Ordenação das listagens ---
+def chave_ordenacao(valor):
+    """Posição de um valor ao ordenar uma coluna: vazios, números e textos, nessa ordem (como no SQLite)."""
+    if valor is None:
+        return (0, 0)
+    if isinstance(valor, (int, float)):
+        return (1, valor)
+    return (2, str(valor))
+
+
+class IndiceOrdenacao:
+    """Ordem de uma coluna (campo=None: das próprias chaves), mantida a cada alteração de registro.
+
+    É uma lista ordenada de (valor, chave): uma página em qualquer posição, crescente ou
+    decrescente, é só uma fatia dela.
+    """
+
+    def __init__(self, campo):
+        self.campo = campo
+        self.entradas = []
+        self.valores = {} # chave -> valor de ordenação, para retirar a entrada antiga ao atualizar
+
+    def _valor(self, chave, registro):
+        return chave if self.campo is None else chave_ordenacao(registro.get(self.campo))
+
+    def construir(self, dados):
+        self.valores = {chave: self._valor(chave, registro) for chave, registro in dados.items()}
+        self.entradas = sorted((valor, chave) for chave, valor in self.valores.items())
+
+    def atualizar(self, chave, registro):
+        """Reflete o novo estado de um registro (None quando ele foi removido)."""
+        antigo = self.valores.pop(chave, None)
+        if antigo is not None:
+            del self.entradas[bisect_left(self.entradas, (antigo, chave))]
+        if registro is not None:
+            valor = self.valores[chave] = self._valor(chave, registro)
+            insort(self.entradas, (valor, chave))
+
+    def pagina(self, inicio, quantidade, decrescente=False):
+        if decrescente:
+            fim = len(self.entradas) - inicio
+            return [chave for _, chave in reversed(self.entradas[max(0, fim - quantidade):max(0, fim)])]
+        return [chave for _, chave in self.entradas[inicio:inicio + quantidade]]
+
+    def ordenar(self, chaves, decrescente=False):
+        """Põe uma lista de chaves (o resultado de um filtro) na ordem da coluna."""
+        if len(chaves) * 16 < len(self.entradas):
+            valores = self.valores
+            return sorted((chave for chave in chaves if chave in valores), key=lambda chave: (valores[chave], chave),
+                          reverse=decrescente)
+        # Filtro que pega boa parte da tabela: percorrer a ordem pronta sai mais barato que ordenar
+        conjunto = set(chaves)
+        ordenadas = [chave for _, chave in self.entradas if chave in conjunto]
+        return ordenadas[::-1] if decrescente else ordenadas
+
+
+class OrdenacoesTabela:
+    """Ordens das colunas de uma tabela; cada uma é montada quando a coluna é ordenada pela primeira vez."""
+
+    def __init__(self):
+        self.colunas = {}
+
+    def coluna(self, dados, campo):
+        indice = self.colunas.get(campo)
+        if indice is None:
+            indice = IndiceOrdenacao(campo)
+            indice.construir(dados)
+            self.colunas[campo] = indice
+        return indice
+
+    def atualizar(self, chave, registro):
+        for indice in self.colunas.values():
+            indice.atualizar(chave, registro)
+
+
+class OrdemArmazenada:
+    """Mesma interface de IndiceOrdenacao para tabelas que ordenam por conta própria (SQLite, serviço)."""
+
+    def __init__(self, dados, campo):
+        self.dados = dados
+        self.campo = campo
+
+    def pagina(self, inicio, quantidade, decrescente=False):
+        return self.dados.chaves_ordenadas(self.campo, inicio, quantidade, decrescente)
+
+    def ordenar(self, chaves, decrescente=False):
+        if self.campo is None:
+            return sorted(chaves, reverse=decrescente)
+        if hasattr(self.dados, 'buscar_varios'):
+            self.dados.buscar_varios(chaves) # Tabela remota: os registros numa só requisição
+        valores = {chave: chave_ordenacao(registro.get(self.campo))
+                   for chave in chaves for registro in [self.dados.get(chave)] if registro is not None}
+        return sorted(valores, key=lambda chave: (valores[chave], chave), reverse=decrescente)
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos, para que 'joao' encontre 'João'."""
+    texto = str(texto).lower()
+    if texto.isascii():
+        return texto
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+
+
+_PALAVRA = re.compile(r'\w+')
+
+def palavras(texto):
+    return _PALAVRA.findall(normalizar(texto))
+
+
+class IndiceBusca:
+    """Índice de prefixos de palavras para a busca enquanto se digita.
+
+    Cada palavra dos campos de CAMPOS_BUSCA aponta para o conjunto de chaves que a contêm, e
+    a lista ordenada das palavras distintas permite achar, por busca binária, todas as que
+    começam com o que foi digitado. Guarda as palavras de cada registro para poder retirá-las
+    quando ele muda ou é removido. Montar o índice custa segundos em cadastros grandes, então
+    ele só é construído quando a busca é usada pela primeira vez (construido=False até lá).
+    """
+
+    def __init__(self, tabela):
+        self.campos = CAMPOS_BUSCA[tabela]
+        self.construido = False
+        self.chaves = {} # palavra -> conjunto de chaves
+        self.termos = [] # palavras distintas, em ordem
+        self.palavras = {} # chave -> palavras do registro
+
+    def _palavras_do_registro(self, chave, registro):
+        # Um único texto por registro: normaliza e separa as palavras de uma vez
+        texto = ' '.join([str(chave)] + [str(valor) for valor in map(registro.get, self.campos) if valor is not None])
+        return set(map(sys.intern, palavras(texto)))
+
+    def construir(self, dados):
+        """Reconstrói o índice a partir do conteúdo atual da tabela."""
+        self.chaves = {}
+        self.palavras = {}
+        for chave, registro in dados.items():
+            encontradas = self._palavras_do_registro(chave, registro)
+            for palavra in encontradas:
+                self.chaves.setdefault(palavra, set()).add(chave)
+            self.palavras[chave] = tuple(encontradas)
+        self.termos = sorted(self.chaves)
+        self.construido = True
+
+    def atualizar(self, chave, registro):
+        """Reflete o novo estado de um registro (None quando ele foi removido)."""
+        if not self.construido:
+            return # A construção lerá o estado atual
+        antigas = set(self.palavras.pop(chave, ()))
+        novas = self._palavras_do_registro(chave, registro) if registro is not None else set()
+        for palavra in antigas - novas:
+            grupo = self.chaves[palavra]
+            grupo.discard(chave)
+            if not grupo:
+                del self.chaves[palavra]
+                del self.termos[bisect_left(self.termos, palavra)]
+        for palavra in novas - antigas:
+            grupo = self.chaves.get(palavra)
+            if grupo is None:
+                grupo = self.chaves[palavra] = set()
+                insort(self.termos, palavra)
+            grupo.add(chave)
+        if novas:
+            self.palavras[chave] = tuple(novas)
+
+    def _grupos(self, prefixo):
+        """Conjuntos de chaves de todas as palavras que começam com `prefixo`."""
+        inicio = bisect_left(self.termos, prefixo)
+        fim = bisect_left(self.termos, prefixo[:-1] + chr(ord(prefixo[-1]) + 1))
+        return [self.chaves[palavra] for palavra in self.termos[inicio:fim]]
+
+    def buscar(self, consulta):
+        """Chaves cujos registros têm, para cada palavra digitada, alguma palavra que começa com ela."""
+        prefixos = set(palavras(consulta))
+        if not prefixos:
+            return set()
+        # Começa pelo prefixo mais seletivo; os demais só filtram os candidatos que sobraram
+        grupos = sorted(((sum(map(len, g)), p, g) for p in prefixos for g in [self._grupos(p)]), key=lambda item: item[0])
+        _, _, primeiro = grupos[0]
+        encontradas = set().union(*primeiro)
+        for total, prefixo, grupo in grupos[1:]:
+            if not encontradas:
+                break
+            if total < len(encontradas):
+                encontradas &= set().union(*grupo)
+            else:
+                encontradas = {chave for chave in encontradas
+                               if any(palavra.startswith(prefixo) for palavra in self.palavras[chave])}
+        return encontradas
+
+
+def consultar(dados, indices, **condicoes):
+    """API de consulta comum à interface gráfica e ao terminal.
+
+    Usa as consultas do próprio banco quando `dados` é uma tabela SQLite e, caso contrário,
+    os índices em memória. Devolve a lista de chaves encontradas.
+    """
+    if hasattr(dados, 'consultar'):
+        return dados.consultar(**condicoes)
+    if not indices.construido:
+        indices.construir(dados)
+    return sorted(indices.consultar(**condicoes))
+
+
+def chaves_nas_faixas(dados, indices, tabela, faixas):
+    """Chaves com algum campo dentro das faixas [(campo, mínimo, máximo)], pelos índices de faixa.
+
+    Devolve None (percorrer a tabela toda) se `faixas` for None ou algum campo não tiver índice de faixa.
+    """
+    if faixas is None or any(campo not in CAMPOS_INDEXADOS[tabela][1] for campo, _, _ in faixas):
+        return None
+    chaves = set()
+    for campo, minimo, maximo in faixas:
+        chaves.update(consultar(dados, indices, **{campo: (minimo, maximo)}))
+    return chaves
+
+
+def ordenacao(dados, ordenacoes, campo):
+    """Ordem de uma coluna para as listagens: a da própria tabela (SQLite, serviço) ou a mantida em memória."""
+    if hasattr(dados, 'chaves_ordenadas'):
+        return OrdemArmazenada(dados, campo)
+    return ordenacoes.coluna(dados, campo)
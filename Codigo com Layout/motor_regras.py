@@ -0,0 +1,225 @@
+"""Regras de negócio declarativas, compiladas uma vez em funções Python.
+
+Uma regra é uma expressão sobre os campos do registro, na sintaxe de Python, por exemplo:
+    idade >= 18 and renda / pessoas_casa <= 700 and profissao not in ('Político',)
+    capacidade_producao >= (1000 if andares < 5 else 1500)
+Só são aceitos campos, constantes, aritmética (sem potência), comparações, and/or/not, `in` com
+listas de constantes e `x if condição else y`. Multiplicação e resto só entre números: com um
+texto, repetiriam ou formatariam strings de tamanho arbitrário. A expressão é validada e
+compilada duas vezes: uma função que avalia um registro (dicionário) e outra que avalia colunas
+inteiras (arrays do numpy) de uma só vez, usada nos recálculos em lote.
+
+Na avaliação de um registro, campos numéricos vindos como texto são convertidos; um campo
+ausente ou um erro de conta (divisão por zero...) faz a regra valer None (falso).
+"""
+import ast
+
+# Campos convertidos para número antes de avaliar (nas colunas: float, com NaN no lugar do que faltar)
+CAMPOS_NUMERICOS = frozenset({'idade', 'renda', 'pessoas_casa', 'andares', 'area', 'capacidade_producao'})
+
+_NOS_PERMITIDOS = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.IfExp, ast.Name, ast.Load, ast.Constant, ast.Tuple, ast.List, ast.Set,
+)
+
+
+class ErroRegra(ValueError):
+    """Expressão de regra inválida; a mensagem diz o que está errado."""
+
+
+def _numero(valor):
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return valor
+    if isinstance(valor, str):
+        try:
+            return int(valor)
+        except ValueError:
+            try:
+                return float(valor)
+            except ValueError:
+                return None
+    return None
+
+
+def _numerica(no):
+    """A expressão certamente dá um número (ou None) em qualquer registro?"""
+    if isinstance(no, ast.Constant):
+        return isinstance(no.value, (int, float))
+    if isinstance(no, ast.Name):
+        return no.id in CAMPOS_NUMERICOS
+    if isinstance(no, ast.UnaryOp):
+        return not isinstance(no.op, ast.Not) and _numerica(no.operand)
+    if isinstance(no, ast.BinOp):
+        return _numerica(no.left) and _numerica(no.right)
+    if isinstance(no, ast.IfExp):
+        return _numerica(no.body) and _numerica(no.orelse)
+    return False
+
+
+def _validar(arvore, expressao):
+    for no in ast.walk(arvore):
+        if not isinstance(no, _NOS_PERMITIDOS):
+            raise ErroRegra(f"Elemento não permitido em regra: {type(no).__name__} ({expressao!r}).")
+        if isinstance(no, ast.Name) and no.id.startswith('_'):
+            raise ErroRegra(f"Campo inválido em regra: {no.id!r}.")
+        if isinstance(no, (ast.Tuple, ast.List, ast.Set)) and not all(isinstance(item, ast.Constant) for item in no.elts):
+            raise ErroRegra(f"Listas em regras só podem ter constantes ({expressao!r}).")
+        if isinstance(no, ast.BinOp) and isinstance(no.op, (ast.Mult, ast.Mod)) and not (_numerica(no.left) and _numerica(no.right)):
+            raise ErroRegra(f"'*' e '%' só podem ser usados com campos numéricos e números ({expressao!r}).")
+        if isinstance(no, ast.Compare):
+            for operador, direita in zip(no.ops, no.comparators):
+                if isinstance(operador, (ast.In, ast.NotIn)) != isinstance(direita, (ast.Tuple, ast.List, ast.Set)):
+                    raise ErroRegra(f"Use 'in' e 'not in' só com listas de constantes ({expressao!r}).")
+
+
+class _ParaColunas(ast.NodeTransformer):
+    """Reescreve a expressão para operar em arrays: and/or/not viram &, |, ~ e o resto vira função auxiliar."""
+
+    def visit_BoolOp(self, no):
+        self.generic_visit(no)
+        operador = ast.BitAnd() if isinstance(no.op, ast.And) else ast.BitOr()
+        resultado = no.values[0]
+        for valor in no.values[1:]:
+            resultado = ast.BinOp(left=resultado, op=operador, right=valor)
+        return resultado
+
+    def visit_UnaryOp(self, no):
+        self.generic_visit(no)
+        if isinstance(no.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=no.operand)
+        return no
+
+    def visit_Compare(self, no):
+        self.generic_visit(no)
+        partes = []
+        esquerda = no.left
+        for operador, direita in zip(no.ops, no.comparators):
+            if isinstance(operador, (ast.In, ast.NotIn)):
+                valores = ast.Tuple(elts=direita.elts, ctx=ast.Load())
+                parte = ast.Call(func=ast.Name(id='_pertence', ctx=ast.Load()), args=[esquerda, valores], keywords=[])
+                if isinstance(operador, ast.NotIn):
+                    parte = ast.UnaryOp(op=ast.Invert(), operand=parte)
+            else:
+                parte = ast.Compare(left=esquerda, ops=[operador], comparators=[direita])
+            partes.append(parte)
+            esquerda = direita
+        resultado = partes[0]
+        for parte in partes[1:]:
+            resultado = ast.BinOp(left=resultado, op=ast.BitAnd(), right=parte)
+        return resultado
+
+    def visit_IfExp(self, no):
+        self.generic_visit(no)
+        return ast.Call(func=ast.Name(id='_onde', ctx=ast.Load()), args=[no.test, no.body, no.orelse], keywords=[])
+
+
+def _pertence(coluna, valores):
+    import numpy as np
+    if coluna.dtype.kind in 'fiub':
+        return np.isin(coluna, [valor for valor in valores if isinstance(valor, (int, float))])
+    conjunto = set(valores)
+    return np.fromiter((valor in conjunto for valor in coluna), dtype=bool, count=len(coluna))
+
+
+def _onde(condicao, sim, nao):
+    import numpy as np
+    return np.where(condicao, sim, nao)
+
+
+class Regra:
+    """Uma expressão validada e compilada: regra(registro) e regra.colunas(colunas, tamanho)."""
+
+    def __init__(self, expressao):
+        self.expressao = expressao.strip()
+        try:
+            self.arvore = ast.parse(self.expressao, mode='eval')
+        except SyntaxError as erro:
+            raise ErroRegra(f"Regra com erro de sintaxe: {self.expressao!r} ({erro.msg}).")
+        _validar(self.arvore, self.expressao)
+        self.campos = frozenset(no.id for no in ast.walk(self.arvore) if isinstance(no, ast.Name))
+
+        # Cada campo vira uma variável local lida uma única vez do registro (ou da coluna)
+        leituras = ''.join(
+            f"    {campo} = _numero(registro.get({campo!r}))\n" if campo in CAMPOS_NUMERICOS
+            else f"    {campo} = registro.get({campo!r})\n"
+            for campo in sorted(self.campos))
+        fonte = (f"def regra(registro):\n{leituras}"
+                 f"    try:\n        return {ast.unparse(self.arvore)}\n"
+                 f"    except (TypeError, ArithmeticError):\n        return None\n")
+        self._avaliar = self._compilar(fonte, 'regra', {'_numero': _numero, 'TypeError': TypeError, 'ArithmeticError': ArithmeticError})
+
+        colunas = ast.fix_missing_locations(_ParaColunas().visit(ast.parse(self.expressao, mode='eval')))
+        leituras = ''.join(f"    {campo} = colunas[{campo!r}]\n" for campo in sorted(self.campos))
+        fonte = (f"def regra_colunas(colunas, tamanho):\n{leituras}"
+                 f"    with _np.errstate(all='ignore'):\n"
+                 f"        return _np.broadcast_to({ast.unparse(colunas)}, (tamanho,))\n")
+        self._fonte_colunas = fonte # O numpy só é importado quando a versão em colunas é usada
+        self._avaliar_colunas = None
+
+    @staticmethod
+    def _compilar(fonte, nome, ambiente):
+        ambiente = dict(ambiente, __builtins__={})
+        exec(compile(fonte, '<regra>', 'exec'), ambiente)
+        return ambiente[nome]
+
+    def __call__(self, registro):
+        return self._avaliar(registro)
+
+    def colunas(self, colunas, tamanho):
+        """Avalia de uma vez: `colunas` tem um array por campo usado (numéricos como float, com NaN)."""
+        if self._avaliar_colunas is None:
+            import numpy as np
+            self._avaliar_colunas = self._compilar(self._fonte_colunas, 'regra_colunas',
+                                                   {'_np': np, '_pertence': _pertence, '_onde': _onde})
+        return self._avaliar_colunas(colunas, tamanho)
+
+    def faixas_alteradas(self, anterior):
+        """Faixas de valores em que esta regra e a anterior podem discordar, ou None se não dá para saber.
+
+        Quando as duas expressões só diferem nos limites de comparações campo/constante (idade >= 18
+        virou idade >= 21), só os registros com o campo entre o limite antigo e o novo mudam de
+        resultado: devolve [(campo, mínimo, máximo)]. Qualquer outra diferença devolve None.
+        """
+        faixas = []
+
+        def comparar(novo, antigo):
+            if type(novo) is not type(antigo):
+                return False
+            if isinstance(novo, ast.Compare):
+                if [type(op) for op in novo.ops] != [type(op) for op in antigo.ops]:
+                    return False
+                lados_novos, lados_antigos = [novo.left] + novo.comparators, [antigo.left] + antigo.comparators
+                for posicao, (lado_novo, lado_antigo) in enumerate(zip(lados_novos, lados_antigos)):
+                    if (isinstance(lado_novo, ast.Constant) and isinstance(lado_antigo, ast.Constant)
+                            and lado_novo.value != lado_antigo.value):
+                        vizinhos = [lados_novos[i] for i in (posicao - 1, posicao + 1) if 0 <= i < len(lados_novos)]
+                        campos = [vizinho.id for vizinho in vizinhos if isinstance(vizinho, ast.Name)]
+                        limites = (lado_novo.value, lado_antigo.value)
+                        if len(campos) != 1 or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in limites):
+                            return False
+                        faixas.append((campos[0], min(limites), max(limites)))
+                    elif not comparar(lado_novo, lado_antigo):
+                        return False
+                return True
+            if isinstance(novo, ast.AST):
+                for (campo, valor_novo), (_, valor_antigo) in zip(ast.iter_fields(novo), ast.iter_fields(antigo)):
+                    if isinstance(valor_novo, list):
+                        if len(valor_novo) != len(valor_antigo) or not all(map(comparar, valor_novo, valor_antigo)):
+                            return False
+                    elif not comparar(valor_novo, valor_antigo):
+                        return False
+                return True
+            return novo == antigo
+
+        return faixas if comparar(self.arvore, anterior.arvore) else None
+
+    def __eq__(self, outra):
+        return isinstance(outra, Regra) and ast.dump(self.arvore) == ast.dump(outra.arvore)
+
+    def __hash__(self):
+        return hash(ast.dump(self.arvore))
+
+    def __repr__(self):
+        return f"Regra({self.expressao!r})"
@@ -0,0 +1,115 @@
+"""Agenda dos prazos de comparecimento, com varredura dos vencidos.
+
+Os prazos ficam agrupados por dia (data ordinal -> usuários), e os dias com algum prazo numa
+lista ordenada. A varredura retira do início da lista só os dias que já passaram, então custa
+proporcional aos prazos vencidos, não ao tamanho do cadastro; "prazos nos próximos N dias" é
+uma busca binária na lista de dias. Cada data ISO é convertida uma única vez (cache).
+"""
+import datetime
+from bisect import bisect_left, insort
+
+import regras
+
+
+def _dia(hoje):
+    return (hoje or datetime.date.today()).toordinal()
+
+
+class AgendaPrazos:
+    """Usuários com vaga e prazo marcado, por dia do prazo."""
+
+    def __init__(self):
+        self.construido = False
+        self._zerar()
+
+    def _zerar(self):
+        self.por_dia = {} # dia (ordinal) -> usernames com prazo nesse dia
+        self.dias = [] # dias com algum prazo, em ordem
+        self.prazos = {} # username -> dia, para retirar a entrada antiga ao atualizar
+        self._datas = {} # data ISO -> dia, para não converter a mesma data de novo
+
+    def _converter(self, registro):
+        if registro is None or registro.get('local_designado') in (regras.PRAZO_VENCIDO, regras.AGUARDANDO_VAGA, "N/A"):
+            return None
+        prazo = registro.get('prazo_comparecimento')
+        if not isinstance(prazo, str):
+            return None
+        dia = self._datas.get(prazo)
+        if dia is None:
+            try:
+                dia = datetime.date.fromisoformat(prazo).toordinal()
+            except ValueError:
+                return None # "N/A" ou texto que não é data
+            self._datas[prazo] = dia
+        return dia
+
+    # --- Manutenção ---
+    def construir(self, usuarios):
+        """Percorre a tabela uma vez; depois disso, só atualizar() é necessário."""
+        self._zerar()
+        self.construido = True
+        for username, registro in usuarios.items():
+            self.atualizar(username, registro)
+
+    def descartar(self):
+        """Outro processo alterou o cadastro sem dizer o quê: o próximo uso constrói de novo."""
+        self._zerar()
+        self.construido = False
+
+    def atualizar(self, username, registro):
+        """Reflete o novo estado de um usuário (None quando ele foi removido)."""
+        if not self.construido:
+            return
+        antigo = self.prazos.pop(username, None)
+        if antigo is not None:
+            grupo = self.por_dia[antigo]
+            grupo.discard(username)
+            if not grupo:
+                del self.por_dia[antigo]
+                del self.dias[bisect_left(self.dias, antigo)]
+        dia = self._converter(registro)
+        if dia is not None:
+            grupo = self.por_dia.get(dia)
+            if grupo is None:
+                grupo = self.por_dia[dia] = set()
+                insort(self.dias, dia)
+            grupo.add(username)
+            self.prazos[username] = dia
+
+    # --- Consulta ---
+    def vencidos(self, hoje=None):
+        """Usuários cujo prazo já passou (antes de hoje). Não os retira: isso acontece ao gravá-los."""
+        limite = _dia(hoje)
+        vencidos = []
+        for dia in self.dias:
+            if dia >= limite:
+                break
+            vencidos.extend(self.por_dia[dia])
+        return vencidos
+
+    def proximos(self, dias, hoje=None):
+        """Usuários com prazo de hoje até daqui a `dias` - 1 dias."""
+        inicio = _dia(hoje)
+        chaves = set()
+        for dia in self.dias[bisect_left(self.dias, inicio):bisect_left(self.dias, inicio + dias)]:
+            chaves.update(self.por_dia[dia])
+        return chaves
+
+
+def varrer(agenda, usuarios, hoje=None):
+    """Marca como PRAZO_VENCIDO os usuários cujo prazo passou sem comparecimento.
+
+    Devolve a lista (username, registro) a gravar; ao gravar, o alocador libera as vagas
+    deles para a fila de espera e a agenda os retira.
+    """
+    if not agenda.construido:
+        agenda.construir(usuarios)
+    alterados = []
+    for username in agenda.vencidos(hoje):
+        dados = usuarios.get(username)
+        if dados is None or dados.get('local_designado') == regras.PRAZO_VENCIDO:
+            agenda.atualizar(username, dados) # Removido ou já marcado por outra estação: só sai da agenda
+        else:
+            dados['local_designado'] = regras.PRAZO_VENCIDO
+            alterados.append((username, dados))
+    return alterados
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import regras
+from motor_regras import CAMPOS_NUMERICOS
+
+
+def _colunas(df, campos):
+    """Uma coluna por campo usado nas regras: numéricos como float (NaN no que não for número), os demais como objetos."""
+    return {campo: pd.to_numeric(df[campo], errors='coerce').to_numpy(dtype=float) if campo in CAMPOS_NUMERICOS
+            else df[campo].to_numpy(dtype=object)
+            for campo in campos}
+
+
+def _selecionar(dados, chaves):
+    if chaves is None:
+        return dict(dados.items())
+    return {chave: dados[chave] for chave in chaves if chave in dados}
+
+
+def recalcular_usuarios(usuarios, chaves=None):
+    """Reavalia a aptidão dos usuários registrados numa única passada vetorizada da regra em vigor.
+
+    Com `chaves`, só esses usuários são reavaliados (os afetados por uma mudança de regra).
+    Só os registros cujo resultado mudou são alterados. Devolve a lista de (username, registro)
+    alterados, para que o chamador grave apenas esses; local e prazo são refeitos pelo alocador ao gravar.
+    """
+    regra = regras.REGRAS['aptidao_usuario']
+    # Usuários que ainda não preencheram os dados não têm aptidão a calcular
+    registros = {username: dados for username, dados in _selecionar(usuarios, chaves).items() if dados.get('registrado')}
+    if not registros:
+        return []
+    df = pd.DataFrame.from_records(list(registros.values()), index=list(registros.keys()),
+                                   columns=sorted(regra.campos | {'apto'}))
+
+    apto_novo = regra.colunas(_colunas(df, regra.campos), len(df)).astype(bool) # NaN resulta em False
+    apto_atual = df['apto'].fillna(False).astype(bool).to_numpy()
+    mudou = np.flatnonzero(apto_novo != apto_atual)
+
+    alterados = []
+    for posicao in mudou:
+        username = df.index[posicao]
+        dados = registros[username]
+        dados['apto'] = bool(apto_novo[posicao])
+        alterados.append((username, dados))
+    return alterados
+
+
+def recalcular_locais(locais, chaves=None):
+    """Recalcula capacidade de produção e aptidão dos locais (todos, ou só `chaves`) de uma vez."""
+    regra_capacidade = regras.REGRAS['capacidade_local']
+    regra_aptidao = regras.REGRAS['aptidao_local']
+
+    registros = _selecionar(locais, chaves)
+    if not registros:
+        return []
+    campos = (regra_capacidade.campos | regra_aptidao.campos) - {'capacidade_producao'}
+    df = pd.DataFrame.from_records(list(registros.values()), index=list(registros.keys()),
+                                   columns=sorted(campos | {'capacidade_producao', 'apto'}))
+
+    colunas = _colunas(df, campos)
+    capacidade_nova = np.nan_to_num(regra_capacidade.colunas(colunas, len(df)).astype(float), nan=0.0)
+    colunas['capacidade_producao'] = capacidade_nova
+    apto_novo = np.where(regra_aptidao.colunas(colunas, len(df)).astype(bool), "Sim", "Não")
+    capacidade_atual = pd.to_numeric(df['capacidade_producao'], errors='coerce').to_numpy()
+    mudou = np.flatnonzero((capacidade_nova != capacidade_atual) | (apto_novo != df['apto'].to_numpy()))
+
+    alterados = []
+    for posicao in mudou:
+        nome_local = df.index[posicao]
+        dados = registros[nome_local]
+        dados['capacidade_producao'] = float(capacidade_nova[posicao])
+        dados['apto'] = str(apto_novo[posicao])
+        alterados.append((nome_local, dados))
+    return alterados
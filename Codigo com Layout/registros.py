@@ -0,0 +1,171 @@
+import sys
+from collections.abc import MutableMapping
+
+_AUSENTE = object()
+AUSENTE_EM_VALORES = ... # Marca de campo ausente em valores(): o JSON nunca produz Ellipsis
+
+
+class Registro(MutableMapping):
+    """Registro compacto: um slot por campo conhecido, em vez de um dict com as chaves repetidas.
+
+    Continua se comportando como um dicionário (get, [], in, update, dict(registro)...), então
+    o restante do código não muda. Campos que não estão em CAMPOS vão para um dict à parte,
+    criado só quando necessário. Textos com poucos valores distintos (INTERNADOS) são
+    internados, para que todos os registros apontem para a mesma string.
+    """
+
+    __slots__ = ('_extras',)
+    CAMPOS = ()
+    INTERNADOS = frozenset()
+    _conhecidos = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.CAMPOS:
+            # Todos os slots numa única atribuição (registro.senha, registro.nome, ... = valores):
+            # bem mais rápido que um setattr por campo ao montar milhões de registros
+            alvos = ''.join(f'registro.{campo}, ' for campo in cls.CAMPOS)
+            espaco = {}
+            exec(f"def _atribuir(registro, valores):\n    {alvos}= valores\n", espaco)
+            cls._atribuir = staticmethod(espaco['_atribuir'])
+            cls._posicoes_internadas = tuple(i for i, campo in enumerate(cls.CAMPOS) if campo in cls.INTERNADOS)
+
+    def __init__(self, dados=(), **campos):
+        self._extras = None
+        # Laço sem passar por __setitem__: é por aqui que passa cada registro ao carregar a tabela
+        conhecidos, internados = self._conhecidos, self.INTERNADOS
+        itens = dados.items() if hasattr(dados, 'items') else dados
+        for campo, valor in itens:
+            if campo in conhecidos:
+                if campo in internados and type(valor) is str:
+                    valor = sys.intern(valor)
+                setattr(self, campo, valor)
+            else:
+                self[campo] = valor
+        if campos:
+            self.update(campos)
+
+    def __getitem__(self, campo):
+        if campo in self._conhecidos:
+            valor = getattr(self, campo, _AUSENTE)
+            if valor is not _AUSENTE:
+                return valor
+        elif self._extras is not None and campo in self._extras:
+            return self._extras[campo]
+        raise KeyError(campo)
+
+    def get(self, campo, padrao=None):
+        if campo in self._conhecidos:
+            return getattr(self, campo, padrao)
+        return self._extras.get(campo, padrao) if self._extras is not None else padrao
+
+    def __contains__(self, campo):
+        if campo in self._conhecidos:
+            return getattr(self, campo, _AUSENTE) is not _AUSENTE
+        return self._extras is not None and campo in self._extras
+
+    def __setitem__(self, campo, valor):
+        if campo in self._conhecidos:
+            if campo in self.INTERNADOS and type(valor) is str:
+                valor = sys.intern(valor)
+            setattr(self, campo, valor)
+        else:
+            if self._extras is None:
+                self._extras = {}
+            self._extras[campo] = valor
+
+    def __delitem__(self, campo):
+        if campo in self:
+            if campo in self._conhecidos:
+                delattr(self, campo)
+            else:
+                del self._extras[campo]
+                if not self._extras:
+                    self._extras = None
+        else:
+            raise KeyError(campo)
+
+    def __iter__(self):
+        for campo in self.CAMPOS:
+            if getattr(self, campo, _AUSENTE) is not _AUSENTE:
+                yield campo
+        if self._extras is not None:
+            yield from self._extras
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def para_dict(self):
+        """Dicionário comum com os mesmos campos (para JSON, pandas...)."""
+        dados = {}
+        for campo in self.CAMPOS:
+            valor = getattr(self, campo, _AUSENTE)
+            if valor is not _AUSENTE:
+                dados[campo] = valor
+        if self._extras is not None:
+            dados.update(self._extras)
+        return dados
+
+    @classmethod
+    def valores(cls, dados):
+        """(valores na ordem de CAMPOS, com AUSENTE_EM_VALORES nos que faltam, e os campos extras ou None).
+
+        É a forma de enviar registros entre processos: tuplas e strings se serializam bem mais
+        rápido que os registros, que de_valores() monta de volta.
+        """
+        obter = dados.get
+        valores = [obter(campo, AUSENTE_EM_VALORES) for campo in cls.CAMPOS]
+        for posicao in cls._posicoes_internadas:
+            if type(valores[posicao]) is str:
+                valores[posicao] = sys.intern(valores[posicao])
+        conhecidos = cls._conhecidos
+        extras = None if dados.keys() <= conhecidos else {campo: valor for campo, valor in dados.items() if campo not in conhecidos}
+        return tuple(valores), extras
+
+    @classmethod
+    def de_valores(cls, valores, extras=None):
+        """Monta o registro a partir do resultado de valores()."""
+        registro = cls.__new__(cls)
+        registro._extras = extras
+        cls._atribuir(registro, valores)
+        if AUSENTE_EM_VALORES in valores:
+            for campo, valor in zip(cls.CAMPOS, valores):
+                if valor is AUSENTE_EM_VALORES:
+                    delattr(registro, campo)
+        return registro
+
+    def copy(self):
+        return type(self)(self.para_dict())
+
+    def __reduce__(self):
+        return type(self), (self.para_dict(),)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.para_dict()!r})"
+
+
+class Usuario(Registro):
+    __slots__ = CAMPOS = ('senha', 'nome', 'idade', 'endereco', 'pessoas_casa', 'renda', 'profissao',
+                          'apto', 'local_designado', 'prazo_comparecimento', 'registrado', 'latitude', 'longitude')
+    INTERNADOS = frozenset(('endereco', 'profissao', 'local_designado', 'prazo_comparecimento'))
+    _conhecidos = frozenset(CAMPOS)
+
+
+class Local(Registro):
+    __slots__ = CAMPOS = ('nome_local', 'endereco', 'responsavel', 'contato', 'andares', 'area',
+                          'capacidade_producao', 'apto', 'mensagem', 'latitude', 'longitude')
+    INTERNADOS = frozenset(('endereco', 'apto', 'mensagem'))
+    _conhecidos = frozenset(CAMPOS)
+
+
+# Tipo de registro de cada tabela
+TIPOS_REGISTRO = {'usuarios': Usuario, 'locais': Local}
+
+
+def converter_tabela(tabela, dados):
+    """Troca, no próprio dicionário, cada registro dict pelo registro compacto da tabela."""
+    tipo = TIPOS_REGISTRO[tabela]
+    for chave, registro in dados.items():
+        if type(registro) is not tipo:
+            dados[chave] = tipo(registro)
+    return dados
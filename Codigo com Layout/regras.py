@@ -0,0 +1,145 @@
+import json
+import os
+from motor_regras import ErroRegra, Regra
+from registros import Usuario, Local
+
+# --- Parâmetros do Programa ---
+# Limites usados nas regras padrão; as regras em vigor ficam em REGRAS (veja regras.json abaixo).
+IDADE_MINIMA = 18
+RENDA_MAXIMA = 2000
+CAPACIDADE_MINIMA = 1000
+MENSAGEM_LOCAL = "O responsável será contatado para mais informações."
+
+# --- Parâmetros da Alocação (alocacao.py) ---
+CAPACIDADE_POR_VAGA = 100 # Capacidade de produção necessária para atender uma família
+ATENDIMENTOS_POR_DIA = 20 # Famílias recebidas por local a cada dia
+AGUARDANDO_VAGA = "Aguardando vaga"
+PRAZO_VENCIDO = "Prazo vencido" # Não compareceu até o prazo: perde a vaga até ser reagendado (prazos.py)
+
+# --- Regras (motor_regras.py) ---
+# A equipe do programa pode trocar qualquer uma em regras.json, por exemplo:
+#   {"aptidao_usuario": "idade >= 18 and renda / pessoas_casa <= 700 and profissao not in ('Político',)",
+#    "aptidao_local": "capacidade_producao >= (1000 if andares < 5 else 1500)"}
+# Depois de editar o arquivo, "Recalcular Aptidões" relê as regras e reavalia o cadastro.
+ARQUIVO_REGRAS = 'regras.json'
+REGRAS_PADRAO = {
+    'aptidao_usuario': f"idade >= {IDADE_MINIMA} and renda <= {RENDA_MAXIMA}",
+    'capacidade_local': "andares * area * 2",
+    'aptidao_local': f"capacidade_producao >= {CAPACIDADE_MINIMA}",
+}
+REGRAS_DA_TABELA = {'usuarios': ('aptidao_usuario',), 'locais': ('capacidade_local', 'aptidao_local')}
+REGRAS = {nome: Regra(expressao) for nome, expressao in REGRAS_PADRAO.items()}
+
+def definir_regras(definicoes):
+    """Troca as regras pelas expressões dadas (as omitidas voltam ao padrão).
+
+    Todas são validadas antes de qualquer troca; lança ErroRegra se alguma for inválida.
+    Devolve {nome: (regra anterior, regra nova)} das que mudaram.
+    """
+    if not isinstance(definicoes, dict) or not all(isinstance(expressao, str) for expressao in definicoes.values()):
+        raise ErroRegra("As regras devem ser um objeto JSON de nome da regra -> expressão (texto).")
+    desconhecidas = set(definicoes) - set(REGRAS_PADRAO)
+    if desconhecidas:
+        raise ErroRegra(f"Regras desconhecidas: {', '.join(sorted(desconhecidas))}.")
+    novas = {nome: Regra(expressao) for nome, expressao in dict(REGRAS_PADRAO, **definicoes).items()}
+    alteradas = {nome: (REGRAS[nome], nova) for nome, nova in novas.items() if nova != REGRAS[nome]}
+    REGRAS.update(novas)
+    return alteradas
+
+def carregar_regras(caminho=ARQUIVO_REGRAS):
+    """Relê o arquivo de regras (sem ele, valem as padrão). Devolve as regras que mudaram, como definir_regras()."""
+    definicoes = {}
+    if os.path.exists(caminho):
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                definicoes = json.load(f)
+        except json.JSONDecodeError as erro:
+            raise ErroRegra(f"{caminho} não é um JSON válido: {erro}")
+    return definir_regras(definicoes)
+
+def faixas_afetadas(tabela, alteradas):
+    """Faixas (campo, mínimo, máximo) dos registros da tabela cujo resultado as regras alteradas podem mudar.
+
+    [] se nenhuma regra da tabela mudou; None se a mudança pode afetar qualquer registro.
+    """
+    faixas = []
+    for nome in REGRAS_DA_TABELA[tabela]:
+        if nome in alteradas:
+            anterior, nova = alteradas[nome]
+            faixas_regra = nova.faixas_alteradas(anterior)
+            if faixas_regra is None:
+                return None
+            faixas += faixas_regra
+    return faixas
+
+# --- Lógica de Negócios ---
+def verificar_aptidao_usuario(usuario):
+    """Verifica se um usuário é apto pela regra em vigor (campos inválidos resultam em não apto)."""
+    return bool(REGRAS['aptidao_usuario'](usuario))
+
+def calcular_capacidade_producao(local):
+    """Calcula a capacidade de produção de um local."""
+    capacidade = REGRAS['capacidade_local'](local)
+    return 0 if capacidade is None else capacidade # Caso andares ou área não sejam números válidos
+
+def avaliar_local(local):
+    """Indica se um local (com a capacidade já calculada) atende ao programa."""
+    return "Sim" if REGRAS['aptidao_local'](local) else "Não"
+
+# --- Validação e Montagem de Registros ---
+def _preenchidos(*valores):
+    """Nenhum campo vazio. Zero é um valor válido (renda 0 é justamente quem mais precisa)."""
+    return all(valor is not None and valor != '' for valor in valores)
+
+def montar_usuario(nome, idade, endereco, pessoas_casa, renda, profissao, senha=None):
+    """Valida os campos de um usuário e monta o registro completo, já com a aptidão.
+
+    O local designado e o prazo são preenchidos pelo alocador (alocacao.py) quando o registro é gravado.
+    Lança ValueError com a mensagem a ser exibida quando algum campo é inválido.
+    """
+    if not _preenchidos(nome, idade, endereco, pessoas_casa, renda, profissao):
+        raise ValueError("Todos os campos devem ser preenchidos.")
+    try:
+        idade_int = int(idade)
+        pessoas_casa_int = int(pessoas_casa)
+        renda_float = float(renda)
+    except (TypeError, ValueError): # Listas e objetos vindos de JSON levantam TypeError
+        raise ValueError("Idade, Pessoas na Casa e Renda devem ser números.")
+
+    usuario = {} if senha is None else {"senha": senha}
+    usuario.update({
+        "nome": nome,
+        "idade": idade_int,
+        "endereco": endereco,
+        "pessoas_casa": pessoas_casa_int,
+        "renda": renda_float,
+        "profissao": profissao,
+        "local_designado": "N/A",
+        "prazo_comparecimento": "N/A",
+        "registrado": True
+    })
+    usuario["apto"] = verificar_aptidao_usuario(usuario)
+    return Usuario(usuario)
+
+def montar_local(nome_local, endereco, responsavel, contato, andares, area):
+    """Valida os campos de um local e monta o registro com capacidade e aptidão."""
+    if not _preenchidos(nome_local, endereco, responsavel, contato, andares, area):
+        raise ValueError("Todos os campos devem ser preenchidos.")
+    try:
+        andares_int = int(andares)
+        area_float = float(area)
+    except (TypeError, ValueError):
+        raise ValueError("Andares e Área devem ser números.")
+
+    local = {
+        "nome_local": nome_local,
+        "endereco": endereco,
+        "responsavel": responsavel,
+        "contato": contato,
+        "andares": andares_int,
+        "area": area_float,
+    }
+    local["capacidade_producao"] = calcular_capacidade_producao(local)
+    local["apto"] = avaliar_local(local)
+    local["mensagem"] = MENSAGEM_LOCAL
+    return Local(local)
@@ -0,0 +1,529 @@
+"""Serviço HTTP/JSON (asyncio) que guarda o cadastro e aplica as regras de negócio.
+
+Vários operadores, com a interface gráfica ou com o terminal, podem trabalhar ao mesmo tempo
+como clientes dele (CRUD_ARMAZENAMENTO=remoto; veja cliente.py). Cada registro tem uma versão:
+uma gravação informa a versão que o cliente leu e é recusada (409) se outro operador
+alterou o registro nesse meio tempo.
+
+O hash das senhas nunca sai do serviço: as leituras devolvem os usuários sem ele, e o login é
+conferido aqui (POST /login). Com CRUD_TOKEN definido, toda requisição precisa do cabeçalho
+"Authorization: Bearer <token>"; sem ele, o serviço só aceita ouvir em endereços locais.
+
+Uso: python servico.py [--endereco 127.0.0.1] [--porta 8765]
+O armazenamento segue as mesmas variáveis da interface (CRUD_ARMAZENAMENTO=json, binario, particionado ou sqlite).
+"""
+import argparse
+import asyncio
+import hmac
+import ipaddress
+import json
+import os
+import signal
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import regras
+from alocacao import Alocador, aplicar_designacao
+from autenticacao import HASH_FICTICIO, conferir_senha, gerar_hash, senha_em_texto_puro
+from duplicados import IndiceDuplicados
+from armazenamento import ArmazenamentoJSON, ArmazenamentoSQLite
+from estatisticas import EstatisticasCadastro
+from geografia import ler_coordenadas
+from gravacao import GravadorSegundoPlano
+from importacao import CAMPOS_USUARIO, CAMPOS_LOCAL
+from indices import IndicesTabela, IndiceBusca, OrdenacoesTabela, consultar, ordenacao, chaves_nas_faixas
+from motor_regras import ErroRegra
+from prazos import AgendaPrazos, varrer
+from registros import TIPOS_REGISTRO, Registro
+
+# --- Configurações do Serviço ---
+ENDERECO_PADRAO = '127.0.0.1' # Só aceita conexões da própria máquina
+PORTA_PADRAO = 8765
+TAMANHO_MAXIMO_CORPO = 64 * 1024 * 1024
+ARQUIVO_USUARIOS = 'usuarios.json'
+ARQUIVO_LOCAIS = 'locais.json'
+ARQUIVO_DIARIO = 'alteracoes.jsonl'
+ARQUIVO_BANCO = 'cadastro.db'
+TABELAS = ('usuarios', 'locais')
+INTERVALO_VARREDURA = 60 # Segundos entre as varreduras dos prazos vencidos
+TOKEN = os.environ.get('CRUD_TOKEN') or None # Segredo compartilhado com os clientes (cliente.py lê a mesma variável)
+
+
+class ErroServico(Exception):
+    """Erro devolvido ao cliente com o status HTTP e, opcionalmente, dados extras."""
+
+    def __init__(self, status, mensagem, **extras):
+        super().__init__(mensagem)
+        self.status = status
+        self.extras = extras
+
+
+def sem_senha(registro):
+    """O registro como vai para um cliente: sem o hash da senha."""
+    if registro is None or 'senha' not in registro:
+        return registro
+    dados = dict(registro)
+    del dados['senha']
+    return dados
+
+
+def endereco_local(endereco):
+    """O endereço só aceita conexões da própria máquina?"""
+    if endereco == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(endereco).is_loopback
+    except ValueError:
+        return False # Nome de máquina: pode ser alcançado pela rede
+
+
+class Cadastro:
+    """Estado autoritativo do cadastro: tabelas, versões, alocação, índices e gravação.
+
+    Só é alterado pela thread do laço asyncio, então cada requisição é aplicada por inteiro
+    antes da próxima; a gravação em disco fica com o GravadorSegundoPlano. A exceção é o
+    recálculo, que lê as tabelas num executor enquanto as escritas esperam em trava_escrita.
+    """
+
+    def __init__(self, armazenamento):
+        self.armazenamento = armazenamento
+        self.tabelas = {}
+        self.versoes = {tabela: {} for tabela in TABELAS} # chave -> versão; ausente = versão 1 (ainda não alterado)
+        self.alocador = Alocador()
+        self.indices = {tabela: IndicesTabela(tabela) for tabela in TABELAS}
+        self.indices_busca = {tabela: IndiceBusca(tabela) for tabela in TABELAS}
+        self.ordenacoes = {tabela: OrdenacoesTabela() for tabela in TABELAS}
+        self.estatisticas = EstatisticasCadastro()
+        self.agenda = AgendaPrazos()
+        self.duplicados = IndiceDuplicados()
+        self.gravador = GravadorSegundoPlano(armazenamento, lambda: self.tabelas)
+        self.trava_escrita = asyncio.Lock() # Segurada pelas escritas e pelo recálculo que roda fora do laço
+
+    def carregar(self):
+        regras.carregar_regras() # Um regras.json inválido impede a partida (ErroRegra)
+        self.tabelas = {tabela: self.armazenamento.carregar_tabela(tabela) for tabela in TABELAS}
+        self.armazenamento.reproduzir_diario(self.tabelas)
+        for tabela, dados in self.tabelas.items():
+            if not hasattr(dados, 'consultar'):
+                self.indices[tabela].construir(dados)
+        if hasattr(self.armazenamento, 'usuarios_alocados'):
+            # SQLite: as designações gravadas valem; só quem tem vaga ou está na fila é lido, pelo índice
+            self.alocador.carregar(self.tabelas['locais'].items(), self.armazenamento.usuarios_alocados(regras.AGUARDANDO_VAGA))
+        else:
+            self.alocar_todos()
+
+    def alocar_todos(self, redistribuir=False):
+        """Refaz a alocação (com `redistribuir`, todos vão para o local com vaga mais próximo); devolve quantos mudaram."""
+        usuarios = self.tabelas['usuarios']
+        alterados = []
+        for username, designacao in self.alocador.alocar_todos(usuarios, self.tabelas['locais'], redistribuir).items():
+            aplicar_designacao(usuarios[username], designacao)
+            alterados.append((username, usuarios[username]))
+        if alterados:
+            self._persistir('usuarios', alterados)
+        return len(alterados)
+
+    # --- Leitura ---
+    def _tabela(self, tabela):
+        if tabela not in self.tabelas:
+            raise ErroServico(HTTPStatus.NOT_FOUND, f"Tabela desconhecida: '{tabela}'.")
+        return self.tabelas[tabela]
+
+    def versao(self, tabela, chave):
+        if chave not in self.versoes[tabela]:
+            return 1 if chave in self.tabelas[tabela] else 0
+        return self.versoes[tabela][chave]
+
+    def obter(self, tabela, chave):
+        registro = self._tabela(tabela).get(chave)
+        if registro is None:
+            raise ErroServico(HTTPStatus.NOT_FOUND, f"'{chave}' não encontrado.")
+        return {'dados': sem_senha(registro), 'versao': self.versao(tabela, chave)}
+
+    def obter_varios(self, tabela, chaves):
+        dados = self._tabela(tabela)
+        encontrados = {}
+        for chave in chaves:
+            registro = dados.get(chave)
+            if registro is not None:
+                encontrados[chave] = {'dados': sem_senha(registro), 'versao': self.versao(tabela, chave)}
+        return encontrados
+
+    def chaves(self, tabela, inicio, quantidade):
+        dados = self._tabela(tabela)
+        if hasattr(dados, 'chaves_pagina'):
+            pagina = dados.chaves_pagina(inicio, quantidade)
+        else:
+            pagina = []
+            for posicao, chave in enumerate(dados):
+                if posicao >= inicio + quantidade:
+                    break
+                if posicao >= inicio:
+                    pagina.append(chave)
+        return {'chaves': pagina, 'total': len(dados)}
+
+    def ordenadas(self, tabela, campo, inicio, quantidade, decrescente=False):
+        """Chaves de uma página na ordem de uma coluna (campo=None: da própria chave)."""
+        try:
+            ordem = ordenacao(self._tabela(tabela), self.ordenacoes[tabela], campo)
+            return {'chaves': ordem.pagina(inicio, quantidade, decrescente)}
+        except ValueError as erro:
+            raise ErroServico(HTTPStatus.BAD_REQUEST, str(erro))
+
+    def resumo_estatisticas(self):
+        if not self.estatisticas.construido:
+            self.estatisticas.construir(self.tabelas['usuarios'], self.tabelas['locais'])
+        return self.estatisticas.resumo()
+
+    def prazos(self, dias):
+        """Usuários com prazo de comparecimento nos próximos `dias` dias."""
+        if not self.agenda.construido:
+            self.agenda.construir(self.tabelas['usuarios'])
+        return sorted(self.agenda.proximos(dias))
+
+    def possiveis_duplicados(self, username):
+        """Cadastros parecidos com o de `username`: [outro, semelhança, motivo]."""
+        usuarios = self.tabelas['usuarios']
+        if not self.duplicados.construido:
+            self.duplicados.construir(usuarios)
+        return [list(item) for item in self.duplicados.verificar(username, usuarios.get(username), usuarios)]
+
+    def consultar(self, tabela, condicoes):
+        # Faixas chegam como listas [mínimo, máximo]
+        condicoes = {campo: tuple(valor) if isinstance(valor, list) else valor for campo, valor in condicoes.items()}
+        try:
+            return consultar(self._tabela(tabela), self.indices[tabela], **condicoes)
+        except ValueError as erro:
+            raise ErroServico(HTTPStatus.BAD_REQUEST, str(erro))
+
+    def buscar(self, tabela, texto):
+        indice = self.indices_busca[tabela]
+        if not indice.construido:
+            indice.construir(self._tabela(tabela))
+        return sorted(indice.buscar(texto))
+
+    # --- Escrita ---
+    def _aplicar_regras(self, tabela, registro):
+        """Recalcula no servidor os campos derivados, qualquer que seja o cliente."""
+        if tabela == 'usuarios':
+            if registro.get('registrado', True) and registro.get('idade') is not None and registro.get('renda') is not None:
+                registro['apto'] = regras.verificar_aptidao_usuario(registro)
+        elif registro.get('andares') is not None and registro.get('area') is not None:
+            registro['capacidade_producao'] = regras.calcular_capacidade_producao(registro)
+            registro['apto'] = regras.avaliar_local(registro)
+
+    def _validar(self, tabela, chave, dados):
+        """Registro de um cliente, com os campos conferidos como nos formulários (regras.montar_*).
+
+        Idade, renda, andares... são convertidos para número; lança ErroServico (400) se algo é inválido.
+        """
+        if not isinstance(chave, str) or not chave:
+            raise ErroServico(HTTPStatus.BAD_REQUEST, "Chave inválida.")
+        if not isinstance(dados, dict):
+            raise ErroServico(HTTPStatus.BAD_REQUEST, f"'{chave}': o registro deve ser um objeto JSON.")
+        registro = TIPOS_REGISTRO[tabela](dados)
+        try:
+            if tabela == 'locais':
+                montado = regras.montar_local(*(registro.get(campo) for campo in CAMPOS_LOCAL))
+                numericos = ('andares', 'area')
+            elif registro.get('registrado', True):
+                montado = regras.montar_usuario(*(registro.get(campo) for campo in CAMPOS_USUARIO))
+                numericos = ('idade', 'pessoas_casa', 'renda')
+            else:
+                montado, numericos = {}, () # Conta criada, dados ainda não preenchidos
+            for campo in numericos:
+                registro[campo] = montado[campo]
+            ponto = ler_coordenadas(registro.get('latitude'), registro.get('longitude'))
+        except ValueError as erro:
+            raise ErroServico(HTTPStatus.BAD_REQUEST, f"'{chave}': {erro}", tabela=tabela, chave=chave)
+        if ponto is not None:
+            registro['latitude'], registro['longitude'] = ponto
+        return registro
+
+    def gravar_lote(self, tabela, itens, validar=True):
+        """Aplica [chave, dados ou None, versão lida ou None] de uma vez; devolve o estado final de tudo que mudou.
+
+        Versão 0 significa "o registro não deve existir" (criação); None dispensa a verificação.
+        Se alguma versão não confere ou algum registro é inválido, nada é aplicado. `validar`
+        só é desligado para as alterações que o próprio serviço gerou (varredura, recálculo).
+        """
+        dados_tabela = self._tabela(tabela)
+        for chave, _, esperada in itens:
+            if esperada is not None and esperada != self.versao(tabela, chave):
+                raise ErroServico(HTTPStatus.CONFLICT, f"'{chave}' foi alterado por outro operador. Recarregue e tente de novo.",
+                                  tabela=tabela, chave=chave)
+        tipo = TIPOS_REGISTRO[tabela]
+        # Todos os registros são montados e conferidos antes de qualquer um entrar na tabela
+        aplicados = []
+        for chave, dados, _ in itens:
+            if dados is not None:
+                dados = self._validar(tabela, chave, dados) if validar else tipo(dados)
+                self._aplicar_regras(tabela, dados)
+                anterior = dados_tabela.get(chave) if tabela == 'usuarios' and 'senha' not in dados else None
+                if anterior is not None and 'senha' in anterior:
+                    dados['senha'] = anterior['senha'] # Os clientes não recebem a senha: quem não a troca a mantém
+            aplicados.append((chave, dados))
+        anteriores = {chave: self.versao(tabela, chave) for chave, _ in aplicados}
+        for chave, dados in aplicados:
+            if dados is None:
+                if chave in dados_tabela:
+                    del dados_tabela[chave]
+            else:
+                dados_tabela[chave] = dados
+
+        outros = self.alocador.processar(tabela, aplicados, self.tabelas['usuarios'])
+        self._persistir(tabela, aplicados, anteriores)
+        alterados = [[tabela, chave, sem_senha(dados), self.versao(tabela, chave)] for chave, dados in aplicados]
+        if outros:
+            self._persistir('usuarios', outros)
+            alterados += [['usuarios', chave, sem_senha(dados), self.versao('usuarios', chave)] for chave, dados in outros]
+        return {'alterados': alterados}
+
+    def _persistir(self, tabela, itens, anteriores=None):
+        versoes = self.versoes[tabela]
+        for chave, dados in itens:
+            if dados is None:
+                versoes.pop(chave, None)
+            else:
+                versoes[chave] = (anteriores[chave] if anteriores else self.versao(tabela, chave)) + 1
+            if not hasattr(self.tabelas[tabela], 'consultar'):
+                self.indices[tabela].atualizar(chave, dados)
+                self.ordenacoes[tabela].atualizar(chave, dados)
+            self.indices_busca[tabela].atualizar(chave, dados)
+            self.estatisticas.atualizar(tabela, chave, dados)
+            if tabela == 'usuarios':
+                self.agenda.atualizar(chave, dados)
+                self.duplicados.atualizar(chave, dados)
+        self.gravador.marcar(tabela, itens)
+
+    def varrer_prazos(self):
+        """Marca os usuários com prazo vencido; as vagas deles vão para a fila de espera."""
+        alterados = varrer(self.agenda, self.tabelas['usuarios'])
+        if alterados:
+            self.gravar_lote('usuarios', [[chave, dados, None] for chave, dados in alterados], validar=False)
+        return len(alterados)
+
+    def calcular_recalculo(self, alteradas):
+        """Reavalia o cadastro com as regras já carregadas e devolve {tabela: [(chave, registro novo)]}.
+
+        Roda fora do laço: trabalha sobre cópias dos registros e não altera o cadastro, por isso as
+        leituras continuam sendo atendidas. Quem chama segura trava_escrita até aplicar o resultado.
+        """
+        from recalculo_lote import recalcular_usuarios, recalcular_locais # pandas só é necessário aqui
+        selecionadas = {}
+        for tabela in TABELAS:
+            dados = self.tabelas[tabela]
+            if alteradas:
+                chaves = chaves_nas_faixas(dados, self.indices[tabela], tabela, regras.faixas_afetadas(tabela, alteradas))
+                registros = ((chave, dados.get(chave)) for chave in chaves)
+            else:
+                registros = dados.items()
+            selecionadas[tabela] = {chave: dict(registro) for chave, registro in registros if registro is not None}
+        return {'usuarios': recalcular_usuarios(selecionadas['usuarios']),
+                'locais': recalcular_locais(selecionadas['locais'])}
+
+    def aplicar_recalculo(self, alterados):
+        """Grava o resultado de calcular_recalculo() e devolve quantos registros mudaram em cada tabela."""
+        for tabela, itens in alterados.items():
+            if itens:
+                self.gravar_lote(tabela, [[chave, dados, None] for chave, dados in itens], validar=False)
+        return {tabela: len(itens) for tabela, itens in alterados.items()}
+
+    async def recalcular(self):
+        """Relê regras.json e reavalia o cadastro (só as faixas afetadas, quando dá para saber quais).
+
+        O cálculo vetorizado roda num executor para não parar o laço; as escritas esperam em
+        trava_escrita até o resultado ser aplicado, para nenhuma delas ser sobrescrita por ele.
+        """
+        async with self.trava_escrita:
+            try:
+                alteradas = regras.carregar_regras()
+            except ErroRegra as erro:
+                raise ErroServico(HTTPStatus.BAD_REQUEST, str(erro))
+            alterados = await asyncio.get_running_loop().run_in_executor(None, self.calcular_recalculo, alteradas)
+            return self.aplicar_recalculo(alterados)
+
+
+class Servico:
+    """Camada HTTP/1.1 mínima (conexões persistentes, corpo JSON) sobre o Cadastro."""
+
+    def __init__(self, cadastro, token=None):
+        self.cadastro = cadastro
+        self._autorizacao = f'Bearer {token}'.encode('utf-8') if token else None
+
+    def autorizado(self, cabecalhos):
+        if self._autorizacao is None:
+            return True
+        return hmac.compare_digest(cabecalhos.get('authorization', '').encode('utf-8'), self._autorizacao)
+
+    async def atender(self, leitor, escritor):
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                metodo, alvo, _ = linha.decode('latin-1').split(' ', 2)
+                cabecalhos = {}
+                while True:
+                    linha = await leitor.readline()
+                    if linha in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = linha.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                tamanho = int(cabecalhos.get('content-length', 0))
+                if tamanho > TAMANHO_MAXIMO_CORPO:
+                    self._responder(escritor, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'erro': "Requisição grande demais."})
+                    break
+                corpo = await leitor.readexactly(tamanho) if tamanho else b''
+                if self.autorizado(cabecalhos):
+                    status, resposta = await self.despachar(metodo, alvo, corpo)
+                else:
+                    status, resposta = HTTPStatus.UNAUTHORIZED, {'erro': "Token de acesso ausente ou inválido (CRUD_TOKEN)."}
+                self._responder(escritor, status, resposta)
+                await escritor.drain()
+                if cabecalhos.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass # Cliente desconectou ou mandou uma requisição mal formada
+        finally:
+            escritor.close()
+
+    def _responder(self, escritor, status, resposta):
+        corpo = json.dumps(resposta, ensure_ascii=False, default=Registro.para_dict).encode('utf-8')
+        escritor.write(b'HTTP/1.1 %d %s\r\nContent-Type: application/json; charset=utf-8\r\nContent-Length: %d\r\n\r\n'
+                       % (status, HTTPStatus(status).phrase.encode('ascii'), len(corpo)))
+        escritor.write(corpo)
+
+    async def despachar(self, metodo, alvo, corpo):
+        partes_url = urlsplit(alvo)
+        partes = [unquote(parte) for parte in partes_url.path.strip('/').split('/') if parte]
+        parametros = {nome: valores[0] for nome, valores in parse_qs(partes_url.query).items()}
+        try:
+            pedido = json.loads(corpo) if corpo else {}
+            return HTTPStatus.OK, await self.rotear(metodo, partes, parametros, pedido)
+        except ErroServico as erro:
+            return erro.status, {'erro': str(erro), **erro.extras}
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as erro:
+            return HTTPStatus.BAD_REQUEST, {'erro': f"Requisição inválida: {erro}"}
+
+    async def conferir_login(self, username, senha):
+        """Confere a senha no serviço. O PBKDF2 roda fora do laço; usuário inexistente confere HASH_FICTICIO."""
+        if not isinstance(username, str) or not isinstance(senha, str):
+            raise ErroServico(HTTPStatus.BAD_REQUEST, "Usuário e senha devem ser textos.")
+        registro = self.cadastro.tabelas['usuarios'].get(username)
+        armazenada = (registro.get('senha') if registro is not None else None) or HASH_FICTICIO
+        laco = asyncio.get_running_loop()
+        ok = await laco.run_in_executor(None, conferir_senha, senha, armazenada)
+        if ok and senha_em_texto_puro(armazenada):
+            # Cadastro antigo: a senha passa a ser guardada como hash a partir deste login
+            senha_hash = await laco.run_in_executor(None, gerar_hash, senha)
+            async with self.cadastro.trava_escrita:
+                atual = self.cadastro.tabelas['usuarios'].get(username)
+                if atual is not None and atual.get('senha') == armazenada:
+                    self.cadastro.gravar_lote('usuarios', [[username, dict(atual, senha=senha_hash), None]], validar=False)
+        return ok
+
+    async def rotear(self, metodo, partes, parametros, pedido):
+        cadastro = self.cadastro
+        if partes == ['saude']:
+            return {'ok': True}
+        if metodo == 'POST' and partes == ['recalcular']:
+            return await cadastro.recalcular()
+        if metodo == 'POST' and partes == ['redistribuir']:
+            async with cadastro.trava_escrita:
+                return {'alterados': cadastro.alocar_todos(redistribuir=True)}
+        if metodo == 'GET' and partes == ['estatisticas']:
+            return cadastro.resumo_estatisticas()
+        if metodo == 'GET' and partes == ['prazos']:
+            return {'chaves': cadastro.prazos(int(parametros.get('dias', 7)))}
+        if metodo == 'GET' and partes == ['duplicados']:
+            return {'duplicados': cadastro.possiveis_duplicados(parametros.get('usuario', ''))}
+        if metodo == 'POST' and partes == ['login']:
+            return {'ok': await self.conferir_login(pedido['usuario'], pedido['senha'])}
+        if metodo == 'POST' and partes == ['salvar']:
+            await asyncio.get_running_loop().run_in_executor(None, cadastro.gravador.descarregar)
+            return {'ok': True}
+        if not partes:
+            raise ErroServico(HTTPStatus.NOT_FOUND, "Caminho desconhecido.")
+
+        tabela, acao = partes[0], partes[1:]
+        if metodo == 'GET' and not acao:
+            return cadastro.chaves(tabela, int(parametros.get('inicio', 0)), int(parametros.get('quantidade', 1000)))
+        if metodo == 'GET' and len(acao) == 2 and acao[0] == 'registros':
+            return cadastro.obter(tabela, acao[1])
+        if metodo == 'GET' and acao == ['pagina']:
+            resultado = cadastro.chaves(tabela, int(parametros.get('inicio', 0)), int(parametros.get('quantidade', 1000)))
+            return {'registros': cadastro.obter_varios(tabela, resultado['chaves']), 'total': resultado['total']}
+        if metodo == 'GET' and acao == ['ordem']:
+            return cadastro.ordenadas(tabela, parametros.get('campo') or None, int(parametros.get('inicio', 0)),
+                                      int(parametros.get('quantidade', 1000)), parametros.get('decrescente') == '1')
+        if metodo == 'GET' and acao == ['busca']:
+            return {'chaves': cadastro.buscar(tabela, parametros.get('texto', ''))}
+        if metodo == 'POST' and acao == ['varios']:
+            return {'registros': cadastro.obter_varios(tabela, pedido['chaves'])}
+        if metodo == 'POST' and acao == ['consulta']:
+            return {'chaves': cadastro.consultar(tabela, pedido['condicoes'])}
+        if metodo == 'POST' and acao == ['lote']:
+            async with cadastro.trava_escrita:
+                return cadastro.gravar_lote(tabela, pedido['itens'])
+        raise ErroServico(HTTPStatus.NOT_FOUND, "Caminho desconhecido.")
+
+
+def criar_armazenamento():
+    tipo = os.environ.get('CRUD_ARMAZENAMENTO', 'json')
+    if tipo == 'sqlite':
+        return ArmazenamentoSQLite(ARQUIVO_BANCO, importar_de=(ARQUIVO_USUARIOS, ARQUIVO_LOCAIS))
+    formato = tipo if tipo in ('binario', 'particionado') else 'json'
+    return ArmazenamentoJSON(ARQUIVO_USUARIOS, ARQUIVO_LOCAIS, ARQUIVO_DIARIO, formato_snapshot=formato)
+
+
+async def varrer_periodicamente(cadastro):
+    while True:
+        async with cadastro.trava_escrita:
+            cadastro.varrer_prazos()
+        await asyncio.sleep(INTERVALO_VARREDURA)
+
+
+async def executar(endereco=ENDERECO_PADRAO, porta=PORTA_PADRAO, pronto=None, token=TOKEN):
+    """Carrega o cadastro e atende até ser cancelado; grava o que estiver pendente ao sair.
+
+    Lança ValueError se o endereço pode ser alcançado pela rede e não há token.
+    """
+    if not token and not endereco_local(endereco):
+        raise ValueError(f"Para ouvir em {endereco}, defina CRUD_TOKEN (o mesmo valor nos clientes).")
+    armazenamento = criar_armazenamento()
+    cadastro = Cadastro(armazenamento)
+    cadastro.carregar()
+    varredura = asyncio.create_task(varrer_periodicamente(cadastro))
+    servidor = await asyncio.start_server(Servico(cadastro, token).atender, endereco, porta)
+    print(f"Serviço do cadastro em http://{endereco}:{porta}", flush=True)
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass # Windows: só Ctrl+C
+    if pronto is not None:
+        pronto()
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        varredura.cancel()
+        cadastro.gravador.encerrar()
+        armazenamento.fechar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço HTTP/JSON do cadastro de fazendas verticais.")
+    parser.add_argument('--endereco', default=ENDERECO_PADRAO)
+    parser.add_argument('--porta', type=int, default=PORTA_PADRAO)
+    argumentos = parser.parse_args()
+    try:
+        asyncio.run(executar(argumentos.endereco, argumentos.porta))
+    except ValueError as erro:
+        parser.error(str(erro))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+"""Snapshot binário das tabelas, mapeado em memória (mmap) e decodificado sob demanda.
+
+Formato (little-endian, seções alinhadas em 8 bytes):
+    b'CRUDSNP1' | tamanho da descrição (u32) | descrição JSON | seções
+A descrição diz a tabela, a quantidade de registros e onde começa cada seção:
+    - chaves: índice de deslocamentos (u64, n+1) e os bytes UTF-8 das chaves, na ordem original;
+    - ordem: posições dos registros ordenadas pela chave (u32, n), para busca binária;
+    - colunas: um vetor de largura fixa por campo numérico (idade, renda...), com um valor
+      reservado para "ausente";
+    - registros: índice de deslocamentos (u64, n+1) e os demais campos de cada registro em JSON.
+Abrir o arquivo só lê a descrição; cada registro é decodificado no primeiro acesso.
+
+Uso: python snapshot_binario.py origem destino [--tabela usuarios|locais]
+     (de .json para .snap ou de .snap para .json, conforme a extensão do destino)
+"""
+import argparse
+import json
+import math
+import mmap
+import os
+from array import array
+from collections.abc import MutableMapping
+from itertools import islice
+
+from registros import TIPOS_REGISTRO, Registro
+
+MAGIA = b'CRUDSNP1'
+EXTENSAO = '.snap'
+# Campos guardados em colunas de largura fixa: 'q' inteiro de 64 bits, 'd' float, 'b' booleano
+COLUNAS_BINARIAS = {
+    'usuarios': (('idade', 'q'), ('pessoas_casa', 'q'), ('renda', 'd'), ('apto', 'b'), ('registrado', 'b'),
+                 ('latitude', 'd'), ('longitude', 'd')),
+    'locais': (('andares', 'q'), ('area', 'd'), ('capacidade_producao', 'd'), ('latitude', 'd'), ('longitude', 'd')),
+}
+AUSENTE = {'q': -2 ** 63, 'd': math.nan, 'b': -1}
+_ALINHAMENTO = 8
+
+
+def _cabe(tipo, valor):
+    """O valor vai para a coluna? Os demais (textos, tipos inesperados) ficam no JSON do registro."""
+    if tipo == 'q':
+        return type(valor) is int and -2 ** 63 < valor < 2 ** 63
+    if tipo == 'd':
+        return type(valor) is float and valor == valor # NaN de verdade fica no JSON
+    return type(valor) is bool
+
+
+def _preencher(f):
+    resto = f.tell() % _ALINHAMENTO
+    if resto:
+        f.write(b'\0' * (_ALINHAMENTO - resto))
+    return f.tell()
+
+
+def gravar_snapshot(caminho, tabela, dados):
+    """Grava `dados` ({chave: registro}) no formato binário, num temporário renomeado ao final."""
+    colunas = COLUNAS_BINARIAS[tabela]
+    vetores = [array(tipo) for _, tipo in colunas]
+    chaves = []
+    registros = []
+    itens = dados.itens_sem_guardar() if isinstance(dados, TabelaMapeada) else dados.items()
+    for chave, registro in itens:
+        campos = registro.para_dict() if isinstance(registro, Registro) else dict(registro)
+        for (campo, tipo), vetor in zip(colunas, vetores):
+            valor = campos.get(campo)
+            if campo in campos and _cabe(tipo, valor):
+                vetor.append(int(valor) if tipo == 'b' else valor)
+                del campos[campo]
+            else:
+                vetor.append(AUSENTE[tipo])
+        chaves.append(chave.encode('utf-8'))
+        registros.append(json.dumps(campos, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    quantidade = len(chaves)
+    ordem = array('I', sorted(range(quantidade), key=chaves.__getitem__))
+
+    def deslocamentos(partes):
+        indice = array('Q', [0])
+        total = 0
+        for parte in partes:
+            total += len(parte)
+            indice.append(total)
+        return indice
+
+    secoes = [('chaves_indice', deslocamentos(chaves)), ('chaves', b''.join(chaves)), ('ordem', ordem)]
+    secoes += [(f'coluna_{campo}', vetor) for (campo, _), vetor in zip(colunas, vetores)]
+    secoes += [('registros_indice', deslocamentos(registros)), ('registros', b''.join(registros))]
+    del chaves, registros
+
+    # A descrição traz os deslocamentos das seções; ela é gravada com largura fixa para poder ser calculada antes
+    inicio = len(MAGIA) + 4 + 2048
+    posicoes = {}
+    posicao = inicio
+    for nome, conteudo in secoes:
+        posicao += -posicao % _ALINHAMENTO
+        posicoes[nome] = posicao
+        posicao += len(conteudo) * (conteudo.itemsize if isinstance(conteudo, array) else 1)
+    descricao = json.dumps({'tabela': tabela, 'quantidade': quantidade, 'colunas': [list(coluna) for coluna in colunas],
+                            'secoes': posicoes}).encode('utf-8').ljust(2048)
+    if len(descricao) > 2048:
+        raise ValueError("Descrição do snapshot grande demais.")
+
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    with open(temporario, 'wb') as f:
+        f.write(MAGIA)
+        f.write(len(descricao).to_bytes(4, 'little'))
+        f.write(descricao)
+        for nome, conteudo in secoes:
+            _preencher(f)
+            conteudo.tofile(f) if isinstance(conteudo, array) else f.write(conteudo)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+class TabelaMapeada(MutableMapping):
+    """Tabela lida de um snapshot binário: os registros só são decodificados quando usados.
+
+    Cada registro decodificado fica guardado (mapa de identidade), então alterar o registro
+    devolvido altera a tabela, como num dicionário. Registros novos, substituídos e removidos
+    ficam em memória por cima do arquivo, que nunca é alterado.
+    """
+
+    sob_demanda = True # Quem percorre a tabela inteira na abertura deveria deixar para depois
+
+    def __init__(self, caminho, tabela):
+        self._arquivo = open(caminho, 'rb')
+        tamanho = os.fstat(self._arquivo.fileno()).st_size
+        self._mapa = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ) if tamanho else b''
+        if self._mapa[:len(MAGIA)] != MAGIA:
+            raise ValueError(f"{caminho} não é um snapshot binário.")
+        inicio = len(MAGIA) + 4
+        descricao = json.loads(self._mapa[inicio:inicio + int.from_bytes(self._mapa[len(MAGIA):inicio], 'little')])
+        if descricao['tabela'] != tabela:
+            raise ValueError(f"{caminho} é um snapshot da tabela '{descricao['tabela']}'.")
+        self.tabela = tabela
+        self._tipo = TIPOS_REGISTRO[tabela]
+        self._quantidade = n = descricao['quantidade']
+        secoes = descricao['secoes']
+        visao = memoryview(self._mapa)
+
+        def vetor(nome, tipo, tamanho):
+            inicio = secoes[nome]
+            return visao[inicio:inicio + tamanho * array(tipo).itemsize].cast(tipo)
+
+        self._indice_chaves = vetor('chaves_indice', 'Q', n + 1)
+        self._base_chaves = secoes['chaves']
+        self._ordem = vetor('ordem', 'I', n)
+        self._colunas = [(campo, tipo, vetor(f'coluna_{campo}', tipo, n)) for campo, tipo in descricao['colunas']]
+        self._indice_registros = vetor('registros_indice', 'Q', n + 1)
+        self._base_registros = secoes['registros']
+        self._decodificados = [None] * n
+        self._substituidos = {} # chave do arquivo -> registro atribuído depois
+        self._removidos = set() # chaves do arquivo removidas
+        self._novos = {} # chaves que não estão no arquivo
+
+    # --- Leitura do arquivo ---
+    def _chave_bytes(self, posicao):
+        inicio = self._base_chaves + self._indice_chaves[posicao]
+        return self._mapa[inicio:self._base_chaves + self._indice_chaves[posicao + 1]]
+
+    def _posicao(self, chave):
+        """Posição da chave no arquivo (busca binária sobre a ordem), ou None."""
+        alvo = chave.encode('utf-8')
+        baixo, alto = 0, self._quantidade
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            if self._chave_bytes(self._ordem[meio]) < alvo:
+                baixo = meio + 1
+            else:
+                alto = meio
+        if baixo < self._quantidade and self._chave_bytes(self._ordem[baixo]) == alvo:
+            return self._ordem[baixo]
+        return None
+
+    def _registro(self, posicao):
+        registro = self._decodificados[posicao]
+        if registro is None:
+            registro = self._decodificados[posicao] = self._decodificar(posicao)
+        return registro
+
+    def _decodificar(self, posicao):
+        inicio = self._base_registros + self._indice_registros[posicao]
+        campos = json.loads(self._mapa[inicio:self._base_registros + self._indice_registros[posicao + 1]])
+        for campo, tipo, coluna in self._colunas:
+            valor = coluna[posicao]
+            if tipo == 'd':
+                if valor == valor:
+                    campos[campo] = valor
+            elif tipo == 'b':
+                if valor >= 0:
+                    campos[campo] = bool(valor)
+            elif valor != -2 ** 63:
+                campos[campo] = valor
+        return self._tipo(campos)
+
+    # --- Interface de dicionário ---
+    def __getitem__(self, chave):
+        registro = self._novos.get(chave)
+        if registro is not None:
+            return registro
+        registro = self._substituidos.get(chave)
+        if registro is not None:
+            return registro
+        if chave in self._removidos:
+            raise KeyError(chave)
+        posicao = self._posicao(chave)
+        if posicao is None:
+            raise KeyError(chave)
+        return self._registro(posicao)
+
+    def __contains__(self, chave):
+        if chave in self._novos or chave in self._substituidos:
+            return True
+        return chave not in self._removidos and self._posicao(chave) is not None
+
+    def __setitem__(self, chave, registro):
+        if chave in self._novos:
+            self._novos[chave] = registro
+        elif chave not in self._removidos and self._posicao(chave) is not None:
+            self._substituidos[chave] = registro
+        else:
+            self._removidos.discard(chave) # Removido e recriado: vai para o fim, como num dict
+            self._novos[chave] = registro
+
+    def __delitem__(self, chave):
+        if chave in self._novos:
+            del self._novos[chave]
+        elif chave not in self._removidos and self._posicao(chave) is not None:
+            self._removidos.add(chave)
+            self._substituidos.pop(chave, None)
+        else:
+            raise KeyError(chave)
+
+    def _chaves_arquivo(self, inicio=0):
+        base, indice, mapa = self._base_chaves, self._indice_chaves, self._mapa
+        for posicao in range(inicio, self._quantidade):
+            yield posicao, mapa[base + indice[posicao]:base + indice[posicao + 1]].decode('utf-8')
+
+    def __iter__(self):
+        removidos = self._removidos
+        for _, chave in self._chaves_arquivo():
+            if chave not in removidos:
+                yield chave
+        yield from list(self._novos)
+
+    def __len__(self):
+        return self._quantidade - len(self._removidos) + len(self._novos)
+
+    def chaves_pagina(self, inicio, quantidade):
+        """Chaves de uma página sem percorrer as anteriores (enquanto nada do arquivo foi removido)."""
+        if self._removidos:
+            return list(islice(iter(self), inicio, inicio + quantidade))
+        chaves = [chave for _, chave in islice(self._chaves_arquivo(min(inicio, self._quantidade)), quantidade)]
+        if len(chaves) < quantidade:
+            novos = max(0, inicio - self._quantidade)
+            chaves += list(islice(self._novos, novos, novos + quantidade - len(chaves)))
+        return chaves
+
+    def items(self):
+        """Percorre na ordem do arquivo, sem busca por chave."""
+        removidos, substituidos = self._removidos, self._substituidos
+        for posicao, chave in self._chaves_arquivo():
+            if chave in removidos:
+                continue
+            registro = substituidos.get(chave)
+            yield chave, registro if registro is not None else self._registro(posicao)
+        yield from list(self._novos.items())
+
+    def values(self):
+        return (registro for _, registro in self.items())
+
+    def itens_sem_guardar(self):
+        """Como items(), mas os registros ainda não usados são decodificados sem ficar na memória."""
+        removidos, substituidos, decodificados = self._removidos, self._substituidos, self._decodificados
+        for posicao, chave in self._chaves_arquivo():
+            if chave in removidos:
+                continue
+            registro = substituidos.get(chave)
+            if registro is None:
+                registro = decodificados[posicao]
+            yield chave, registro if registro is not None else self._decodificar(posicao)
+        yield from list(self._novos.items())
+
+    def fechar(self):
+        if isinstance(self._mapa, mmap.mmap):
+            # Os registros já decodificados continuam válidos; as visões do mapa precisam ser soltas antes
+            self._indice_chaves = self._ordem = self._indice_registros = self._colunas = None
+            self._mapa.close()
+        self._arquivo.close()
+
+
+def abrir_snapshot(caminho, tabela):
+    return TabelaMapeada(caminho, tabela)
+
+
+def converter(origem, destino, tabela):
+    """Converte entre o snapshot JSON (.json) e o binário (.snap), conforme a extensão do destino."""
+    from armazenamento import escrever_json_atomico
+    if destino.endswith(EXTENSAO):
+        with open(origem, 'r', encoding='utf-8') as f:
+            gravar_snapshot(destino, tabela, json.load(f))
+    else:
+        dados = TabelaMapeada(origem, tabela)
+        escrever_json_atomico(destino, dict(dados.itens_sem_guardar()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte snapshots entre JSON e o formato binário mapeado em memória.")
+    parser.add_argument('origem')
+    parser.add_argument('destino')
+    parser.add_argument('--tabela', choices=sorted(COLUNAS_BINARIAS), help="padrão: o nome do arquivo (usuarios, locais)")
+    argumentos = parser.parse_args()
+    tabela = argumentos.tabela or os.path.splitext(os.path.basename(argumentos.origem))[0]
+    if tabela not in COLUNAS_BINARIAS:
+        parser.error("informe --tabela usuarios ou --tabela locais")
+    converter(argumentos.origem, argumentos.destino, tabela)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Snapshot particionado das tabelas: vários arquivos JSON, lidos e gravados em paralelo.
+
+Formato: uma pasta por tabela (usuarios.partes/, locais.partes/) com
+    - manifesto.json: {"tabela": ..., "particoes": n, "geracao": ...}, gravado por último;
+    - parte-000.json ... parte-(n-1).json: {chave: registro}, como o usuarios.json.
+A partição de um registro é crc32(chave) % n (estável entre execuções, ao contrário de hash()).
+
+Ao carregar, cada processo do pool lê e decodifica algumas partes e devolve os registros em
+tuplas (Registro.valores); o processo principal só monta os registros compactos e junta as
+partes, que é a fração que não se divide entre os núcleos. Ao gravar, só as partes com alguma
+chave alterada são reescritas, também em paralelo; cada uma vai para um temporário e é renomeada.
+
+Uso: python snapshot_particionado.py origem destino [--tabela usuarios|locais] [--particoes n]
+     (de .json para .partes ou de .partes para .json, conforme a extensão do destino)
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import uuid
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from registros import TIPOS_REGISTRO, Registro, converter_tabela
+
+EXTENSAO = '.partes'
+MANIFESTO = 'manifesto.json'
+PARTICOES = 64 # Partições de uma tabela nova; as existentes seguem o manifesto
+MINIMO_PARALELO = 8 * 1024 * 1024 # Bytes a ler ou gravar abaixo dos quais o pool não compensa iniciar
+
+
+def particao(chave, particoes):
+    return zlib.crc32(chave.encode('utf-8')) % particoes
+
+
+def caminho_parte(pasta, indice):
+    return os.path.join(pasta, f'parte-{indice:03d}.json')
+
+
+def ler_manifesto(pasta):
+    """Conteúdo do manifesto, ou None se a pasta ainda não tem um snapshot completo."""
+    try:
+        with open(os.path.join(pasta, MANIFESTO), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _escrever_atomico(caminho, dados):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(dados, ensure_ascii=False, default=Registro.para_dict)) # dumps de uma vez: json.dump escreve aos pedaços
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+def _pool(processos, tarefas, tamanho):
+    """Pool de processos para as tarefas, ou None quando fazer no próprio processo sai mais barato."""
+    processos = min(processos or os.cpu_count() or 1, tarefas)
+    if processos <= 1 or tamanho < MINIMO_PARALELO:
+        return None
+    # "spawn" evita duplicar o processo da interface gráfica (Tk) com fork
+    return ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context('spawn'))
+
+
+# --- Leitura ---
+def _ler_parte(caminho, tabela):
+    """[(chave, valores, extras)] de uma parte; roda nos processos do pool."""
+    valores = TIPOS_REGISTRO[tabela].valores
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return [(chave, *valores(registro)) for chave, registro in json.load(f).items()]
+
+
+def carregar_particoes(pasta, tabela, processos=None):
+    """Lê todas as partes da tabela (em `processos` processos; padrão: um por núcleo) num só dict."""
+    manifesto = ler_manifesto(pasta)
+    if manifesto is None:
+        return {}
+    caminhos = [caminho_parte(pasta, indice) for indice in range(manifesto['particoes'])]
+    caminhos = [caminho for caminho in caminhos if os.path.exists(caminho)]
+    dados = {}
+    pool = _pool(processos, len(caminhos), sum(os.path.getsize(caminho) for caminho in caminhos))
+    if pool is None:
+        # No próprio processo, as tuplas seriam só um passo a mais
+        for caminho in caminhos:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                dados.update(converter_tabela(tabela, json.load(f)))
+        return dados
+    montar = TIPOS_REGISTRO[tabela].de_valores
+    with pool:
+        for parte in pool.map(_ler_parte, caminhos, [tabela] * len(caminhos)):
+            for chave, valores, extras in parte:
+                dados[chave] = montar(valores, extras)
+    return dados
+
+
+# --- Gravação ---
+def _gravar_parte(caminho, registros):
+    _escrever_atomico(caminho, registros)
+    return caminho
+
+
+def gravar_particoes(pasta, tabela, dados, alteradas=None, particoes=None, processos=None):
+    """Grava o snapshot particionado de `dados`; devolve quantas partes foram reescritas.
+
+    `alteradas` são as chaves que mudaram desde a última gravação: só as partes delas são
+    reescritas (None reescreve todas). Sem manifesto, a tabela é gravada inteira com `particoes`
+    partes (padrão PARTICOES).
+    """
+    manifesto = ler_manifesto(pasta)
+    if manifesto is None or manifesto.get('tabela') != tabela:
+        manifesto = {'tabela': tabela, 'particoes': particoes or PARTICOES}
+        alteradas = None
+    quantidade = manifesto['particoes']
+    if alteradas is None:
+        sujas = set(range(quantidade))
+    else:
+        sujas = {particao(chave, quantidade) for chave in alteradas}
+        if not sujas:
+            return 0
+    pool = _pool(processos, len(sujas), len(dados) * 400 * len(sujas) // quantidade) # ~400 bytes por registro
+    # Os registros vão aos processos como dicts comuns, que se serializam mais rápido
+    para_dict = Registro.para_dict if pool is not None else None
+    partes = {indice: {} for indice in sujas}
+    for chave, registro in dados.items():
+        parte = partes.get(particao(chave, quantidade))
+        if parte is not None:
+            parte[chave] = para_dict(registro) if para_dict and isinstance(registro, Registro) else registro
+
+    os.makedirs(pasta, exist_ok=True)
+    caminhos = [caminho_parte(pasta, indice) for indice in partes]
+    if pool is None:
+        for caminho, registros in zip(caminhos, partes.values()):
+            _gravar_parte(caminho, registros)
+    else:
+        with pool:
+            list(pool.map(_gravar_parte, caminhos, partes.values()))
+    manifesto['geracao'] = uuid.uuid4().hex # Muda a assinatura da pasta para os outros processos
+    _escrever_atomico(os.path.join(pasta, MANIFESTO), manifesto)
+    return len(partes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte um snapshot entre JSON e o formato particionado.")
+    parser.add_argument('origem')
+    parser.add_argument('destino')
+    parser.add_argument('--tabela', choices=sorted(TIPOS_REGISTRO), help="Padrão: pelo nome do arquivo")
+    parser.add_argument('--particoes', type=int, default=PARTICOES)
+    argumentos = parser.parse_args()
+    tabela = argumentos.tabela or ('locais' if 'locais' in os.path.basename(argumentos.origem) else 'usuarios')
+    if argumentos.destino.rstrip(os.sep).endswith(EXTENSAO):
+        with open(argumentos.origem, 'r', encoding='utf-8') as f:
+            gravar_particoes(argumentos.destino, tabela, json.load(f), particoes=argumentos.particoes)
+    else:
+        dados = carregar_particoes(argumentos.origem, tabela)
+        with open(argumentos.destino, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, indent=4, ensure_ascii=False, default=Registro.para_dict)
+    print(f"{tabela}: {argumentos.origem} -> {argumentos.destino}")
+
+
+if __name__ == '__main__':
+    main()
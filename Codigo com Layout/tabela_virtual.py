@@ -0,0 +1,132 @@
+from itertools import islice
+
+TAMANHO_PAGINA = 200 # Linhas materializadas na Treeview de cada vez
+
+
+class TabelaPaginada:
+    """Mostra numa ttk.Treeview apenas a página visível de um dicionário de registros.
+
+    A troca de página compara as linhas atuais com as novas e só insere, altera ou
+    remove os iids que mudaram; atualizar_registro() mexe em uma única linha.
+    Ordenada por uma coluna (ordenar_por), cada página é uma fatia de uma ordem já mantida
+    (indices.IndiceOrdenacao): nada é reordenado além das linhas visíveis.
+    """
+
+    def __init__(self, tree, obter_dados, formatar_linha, tamanho_pagina=TAMANHO_PAGINA, ao_mudar_pagina=None):
+        self.tree = tree
+        self.obter_dados = obter_dados # Função que devolve o dicionário atual (ele pode ser trocado ao recarregar)
+        self.formatar_linha = formatar_linha # (chave, registro) -> tupla de valores, ou None para ocultar
+        self.tamanho_pagina = tamanho_pagina
+        self.ao_mudar_pagina = ao_mudar_pagina # Chamada com (pagina, total_paginas)
+        self.pagina = 0
+        self.visiveis = {} # iid -> valores exibidos
+        self.filtro = None # Função que devolve a lista de chaves a exibir (None = todas, na ordem de cadastro)
+        self.chaves_filtradas = None
+        self.obter_ordem = None # Função que devolve a ordem da coluna escolhida (None = ordem de cadastro)
+        self.decrescente = False
+
+    def _filtrar(self):
+        chaves = self.filtro()
+        if self.obter_ordem is not None:
+            chaves = self.obter_ordem().ordenar(chaves, self.decrescente)
+        return chaves
+
+    def definir_filtro(self, filtro):
+        """Passa a exibir só as chaves devolvidas por filtro() (ou todas, se filtro for None)."""
+        self.filtro = filtro
+        self.chaves_filtradas = self._filtrar() if filtro else None
+        self.mostrar_pagina(0)
+
+    def ordenar_por(self, obter_ordem, decrescente=False):
+        """Passa a exibir as linhas na ordem devolvida por obter_ordem() (pagina() e ordenar())."""
+        self.obter_ordem = obter_ordem
+        self.decrescente = decrescente
+        if self.filtro:
+            self.chaves_filtradas = self._filtrar()
+        self.mostrar_pagina(0)
+
+    def recarregar(self):
+        """Refaz o filtro e redesenha a página atual (depois de alterações feitas por outro processo)."""
+        if self.filtro:
+            self.chaves_filtradas = self._filtrar()
+        self.mostrar_pagina()
+
+    def total_paginas(self):
+        total = len(self.chaves_filtradas) if self.chaves_filtradas is not None else len(self.obter_dados())
+        return max(1, -(-total // self.tamanho_pagina))
+
+    def chaves_da_pagina(self):
+        dados = self.obter_dados()
+        inicio = self.pagina * self.tamanho_pagina
+        if self.chaves_filtradas is not None:
+            return self.chaves_filtradas[inicio:inicio + self.tamanho_pagina]
+        if self.obter_ordem is not None:
+            return self.obter_ordem().pagina(inicio, self.tamanho_pagina, self.decrescente)
+        if hasattr(dados, 'chaves_pagina'):
+            return dados.chaves_pagina(inicio, self.tamanho_pagina)
+        return list(islice(iter(dados), inicio, inicio + self.tamanho_pagina))
+
+    def mostrar_pagina(self, pagina=None):
+        """Materializa a página pedida (ou a atual), alterando só as linhas diferentes."""
+        if pagina is not None:
+            self.pagina = pagina
+        total = self.total_paginas()
+        self.pagina = min(max(self.pagina, 0), total - 1)
+
+        dados = self.obter_dados()
+        chaves = self.chaves_da_pagina()
+        if hasattr(dados, 'buscar_varios'):
+            dados.buscar_varios(chaves) # Tabela remota: a página inteira numa só requisição
+        novas = {}
+        for chave in chaves:
+            registro = dados.get(chave)
+            valores = self.formatar_linha(chave, registro) if registro is not None else None
+            if valores is not None:
+                novas[chave] = valores
+
+        for iid in [iid for iid in self.visiveis if iid not in novas]:
+            self.tree.delete(iid)
+        for posicao, (chave, valores) in enumerate(novas.items()):
+            if chave not in self.visiveis:
+                self.tree.insert("", posicao, iid=chave, values=valores)
+            else:
+                if self.visiveis[chave] != valores:
+                    self.tree.item(chave, values=valores)
+                if self.tree.index(chave) != posicao:
+                    self.tree.move(chave, "", posicao)
+        self.visiveis = novas
+
+        if self.ao_mudar_pagina:
+            self.ao_mudar_pagina(self.pagina, total)
+
+    def atualizar_registro(self, chave):
+        """Reflete a alteração de um único registro sem redesenhar a página."""
+        if self.filtro:
+            # O registro pode ter entrado ou saído do filtro; a consulta é indexada e a página é comparada
+            self.chaves_filtradas = self._filtrar()
+            self.mostrar_pagina()
+            return
+        if self.obter_ordem is not None:
+            # A alteração pode ter mudado a posição da linha; a ordem já está em dia e a página é comparada
+            self.mostrar_pagina()
+            return
+        registro = self.obter_dados().get(chave)
+        if chave in self.visiveis:
+            valores = self.formatar_linha(chave, registro) if registro is not None else None
+            if valores is None:
+                # Removido: a página precisa puxar a próxima linha para o lugar dele
+                self.mostrar_pagina()
+            elif valores != self.visiveis[chave]:
+                self.tree.item(chave, values=valores)
+                self.visiveis[chave] = valores
+        elif registro is not None and len(self.visiveis) < self.tamanho_pagina:
+            # Registro novo entra no fim: só aparece se a página atual tiver espaço
+            self.mostrar_pagina()
+        elif self.ao_mudar_pagina:
+            self.ao_mudar_pagina(self.pagina, self.total_paginas())
+
+    def proxima_pagina(self):
+        self.mostrar_pagina(self.pagina + 1)
+
+    def pagina_anterior(self):
+        self.mostrar_pagina(self.pagina - 1)
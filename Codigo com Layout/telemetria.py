@@ -0,0 +1,205 @@
+import datetime
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+# --- Configurações da Telemetria ---
+ATIVA = os.environ.get('CRUD_TELEMETRIA') == '1' # Desativada, medir() devolve a própria função: custo zero
+ARQUIVO_TELEMETRIA = 'telemetria.log'
+TAMANHO_MAXIMO_ARQUIVO = 1024 * 1024 # Bytes antes de girar o arquivo
+ARQUIVOS_ANTIGOS = 3 # telemetria.log.1 ... .3
+INTERVALO_RESUMO = 60 # Segundos entre os resumos gravados no arquivo
+LIMITE_LENTO_MS = 200 # Chamadas mais lentas que isto são gravadas uma a uma
+LIMITES_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000) # Faixas do histograma
+
+
+class Metrica:
+    """Contagem, histograma de latência e registros gravados de uma operação."""
+
+    __slots__ = ('chamadas', 'erros', 'total_ms', 'maximo_ms', 'registros', 'baldes')
+
+    def __init__(self):
+        self.chamadas = 0
+        self.erros = 0
+        self.total_ms = 0.0
+        self.maximo_ms = 0.0
+        self.registros = 0
+        self.baldes = [0] * (len(LIMITES_MS) + 1) # O último balde recebe o que passar de LIMITES_MS[-1]
+
+    def registrar(self, ms, registros=0, erro=False):
+        self.chamadas += 1
+        self.erros += erro
+        self.total_ms += ms
+        self.maximo_ms = max(self.maximo_ms, ms)
+        self.registros += registros
+        for posicao, limite in enumerate(LIMITES_MS):
+            if ms <= limite:
+                self.baldes[posicao] += 1
+                break
+        else:
+            self.baldes[-1] += 1
+
+    def percentil(self, fracao):
+        """Limite superior da faixa do histograma em que cai o percentil pedido."""
+        alvo = fracao * self.chamadas
+        acumulado = 0
+        for posicao, quantidade in enumerate(self.baldes):
+            acumulado += quantidade
+            if quantidade and acumulado >= alvo:
+                return LIMITES_MS[posicao] if posicao < len(LIMITES_MS) else self.maximo_ms
+        return 0.0
+
+    def resumo(self):
+        return {
+            'chamadas': self.chamadas,
+            'erros': self.erros,
+            'media_ms': self.total_ms / self.chamadas if self.chamadas else 0.0,
+            'p50_ms': self.percentil(0.50),
+            'p95_ms': self.percentil(0.95),
+            'p99_ms': self.percentil(0.99),
+            'maximo_ms': self.maximo_ms,
+            'registros': self.registros,
+            'histograma': dict(zip([f'<={limite}' for limite in LIMITES_MS] + [f'>{LIMITES_MS[-1]}'], self.baldes)),
+        }
+
+
+metricas = {} # nome da operação -> Metrica
+_local = threading.local() # Medições em andamento na thread: [início, tempo pausado, registros]
+_registro = None
+_ouvinte = None
+
+
+def _em_andamento():
+    pilha = getattr(_local, 'pilha', None)
+    if pilha is None:
+        pilha = _local.pilha = []
+    return pilha
+
+
+def medir(nome=None, tamanho=None):
+    """Decorador que mede a latência de cada chamada da função.
+
+    `tamanho`, se informado, recebe os mesmos argumentos da função e devolve o tamanho do
+    resultado (linhas exibidas...); senão, conta os registros gravados durante a chamada.
+    """
+    def decorar(funcao):
+        if not ATIVA:
+            return funcao
+        chave = nome or funcao.__name__
+        metrica = metricas.setdefault(chave, Metrica())
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            quadro = [time.perf_counter(), 0.0, 0]
+            pilha = _em_andamento()
+            pilha.append(quadro)
+            erro = True
+            try:
+                resultado = funcao(*args, **kwargs)
+                erro = False
+                return resultado
+            finally:
+                pilha.pop()
+                ms = (time.perf_counter() - quadro[0] - quadro[1]) * 1000
+                registros = tamanho(*args, **kwargs) if tamanho is not None and not erro else quadro[2]
+                metrica.registrar(ms, registros, erro)
+                if ms >= LIMITE_LENTO_MS:
+                    _gravar({'evento': 'lento', 'operacao': chave, 'ms': round(ms, 3), 'registros': registros, 'erro': erro})
+        return medida
+    return decorar
+
+
+def registrar(nome, ms, registros=0):
+    """Registra uma duração medida por fora (tarefas que terminam em outra thread)."""
+    if ATIVA:
+        metricas.setdefault(nome, Metrica()).registrar(ms, registros)
+
+
+def contar_registros(quantidade):
+    """Soma registros gravados às medições em andamento (o "tamanho" de cada operação)."""
+    if ATIVA:
+        for quadro in _em_andamento():
+            quadro[2] += quantidade
+
+
+def sem_cronometro(funcao):
+    """Envolve uma função cujo tempo não deve contar na latência de quem a chama (diálogos modais)."""
+    if not ATIVA:
+        return funcao
+
+    @functools.wraps(funcao)
+    def pausada(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            pausa = time.perf_counter() - inicio
+            for quadro in _em_andamento():
+                quadro[1] += pausa
+    return pausada
+
+
+class _SemCronometro:
+    def __init__(self, modulo):
+        self._modulo = modulo
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._modulo, nome)
+        return sem_cronometro(atributo) if callable(atributo) else atributo
+
+
+def dialogos_sem_cronometro(modulo):
+    """Versão de um módulo de diálogos (messagebox, filedialog) que não conta o tempo que o usuário leva para responder."""
+    return _SemCronometro(modulo) if ATIVA else modulo
+
+
+def resumo():
+    return {nome: metrica.resumo() for nome, metrica in sorted(metricas.items())}
+
+
+# --- Arquivo de telemetria ---
+def _gravar(evento):
+    if _registro is not None:
+        evento['hora'] = datetime.datetime.now().isoformat(timespec='seconds')
+        _registro.info(json.dumps(evento, ensure_ascii=False))
+
+
+def iniciar(arquivo=ARQUIVO_TELEMETRIA, intervalo=INTERVALO_RESUMO):
+    """Passa a gravar os eventos e um resumo periódico num arquivo que gira por tamanho.
+
+    A escrita em disco acontece numa thread própria (QueueListener), fora da interface.
+    """
+    global _registro, _ouvinte
+    if not ATIVA or _registro is not None:
+        return
+    fila = queue.SimpleQueue()
+    arquivo_girando = logging.handlers.RotatingFileHandler(arquivo, maxBytes=TAMANHO_MAXIMO_ARQUIVO, backupCount=ARQUIVOS_ANTIGOS, encoding='utf-8')
+    _ouvinte = logging.handlers.QueueListener(fila, arquivo_girando)
+    _ouvinte.start()
+    _registro = logging.getLogger('crud.telemetria')
+    _registro.propagate = False
+    _registro.setLevel(logging.INFO)
+    _registro.addHandler(logging.handlers.QueueHandler(fila))
+
+    def resumir_periodicamente():
+        while _registro is not None:
+            time.sleep(intervalo)
+            _gravar({'evento': 'resumo', 'metricas': resumo()})
+    threading.Thread(target=resumir_periodicamente, name='telemetria', daemon=True).start()
+
+
+def encerrar():
+    """Grava um último resumo e fecha o arquivo."""
+    global _registro, _ouvinte
+    if _registro is None:
+        return
+    _gravar({'evento': 'resumo', 'metricas': resumo()})
+    _ouvinte.stop()
+    for manipulador in list(_registro.handlers):
+        _registro.removeHandler(manipulador)
+    _registro = _ouvinte = None
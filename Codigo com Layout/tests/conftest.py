@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do programa ficam na pasta de cima e se importam pelo nome, como nos benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    """Pasta temporária como diretório atual (regras.json, snapshots e diário são relativos a ele)."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def usuario(nome='Ana', idade=30, renda=1000.0, endereco='Rua A', **extras):
+    """Registro de usuário completo, como o formulário monta."""
+    return dict({'nome': nome, 'idade': idade, 'endereco': endereco, 'pessoas_casa': 3, 'renda': renda,
+                 'profissao': 'Agricultora', 'apto': True, 'local_designado': 'N/A',
+                 'prazo_comparecimento': 'N/A', 'registrado': True}, **extras)
+
+
+def local(endereco='Rua A', capacidade=1000, **extras):
+    """Registro de local apto com `capacidade` (capacidade // CAPACIDADE_POR_VAGA vagas)."""
+    return dict({'endereco': endereco, 'responsavel': 'Bia', 'contato': '9999', 'andares': 1, 'area': capacidade / 2,
+                 'capacidade_producao': capacidade, 'apto': "Sim"}, **extras)
@@ -0,0 +1,100 @@
+import datetime
+
+import regras
+from alocacao import Alocador, aplicar_designacao, prazo_vencido
+from conftest import local, usuario
+
+
+def montar(vagas_por_local, usuarios=()):
+    """Alocador com os locais {nome: vagas} (na "Rua <nome>") e os usuários, moradores da Rua Centro, já alocados."""
+    alocador = Alocador()
+    locais = {nome: local(f'Rua {nome}', vagas * regras.CAPACIDADE_POR_VAGA) for nome, vagas in vagas_por_local.items()}
+    cadastro = {nome: usuario(nome, endereco='Rua Centro') for nome in usuarios}
+    for nome, designacao in alocador.alocar_todos(cadastro, locais).items():
+        aplicar_designacao(cadastro[nome], designacao)
+    return alocador, cadastro, locais
+
+
+def test_vagas_respeitadas_e_excedentes_na_fila():
+    alocador, cadastro, _ = montar({'Centro': 2}, ['ana', 'bia', 'caio'])
+    designados = [nome for nome, dados in cadastro.items() if dados['local_designado'] == 'Centro']
+    assert designados == ['ana', 'bia']
+    assert cadastro['caio']['local_designado'] == regras.AGUARDANDO_VAGA
+    assert list(alocador.espera) == ['caio']
+
+
+def test_vaga_liberada_vai_para_o_primeiro_da_fila():
+    alocador, cadastro, _ = montar({'Centro': 1}, ['ana', 'bia'])
+    cadastro['ana']['apto'] = False
+    outros = alocador.processar('usuarios', [('ana', cadastro['ana'])], cadastro)
+    assert cadastro['ana']['local_designado'] == "N/A"
+    assert [nome for nome, _ in outros] == ['bia']
+    assert cadastro['bia']['local_designado'] == 'Centro'
+
+
+def test_regravar_o_usuario_mantem_o_prazo():
+    alocador, cadastro, _ = montar({'Centro': 5}, ['ana'])
+    prazo = cadastro['ana']['prazo_comparecimento']
+    alocador._inicio -= datetime.timedelta(days=2) # Dois dias depois, o slot 0 cairia em outra data
+    alocador.processar('usuarios', [('ana', cadastro['ana'])], cadastro)
+    assert cadastro['ana']['prazo_comparecimento'] == prazo
+
+
+def test_reiniciar_nao_muda_nenhuma_designacao():
+    _, cadastro, locais = montar({'Centro': 3, 'Norte': 2}, ['ana', 'bia', 'caio', 'davi', 'eva', 'fabio'])
+    assert Alocador().alocar_todos(cadastro, locais) == {}
+
+
+def test_carregar_as_designacoes_gravadas_equivale_a_alocar_todos():
+    alocador, cadastro, locais = montar({'Centro': 2, 'Norte': 1}, ['ana', 'bia', 'caio', 'davi', 'eva'])
+    designados = sorted((nome for nome, dados in cadastro.items() if dados['local_designado'] in locais),
+                        key=lambda nome: cadastro[nome]['prazo_comparecimento'])
+    na_fila = [nome for nome, dados in cadastro.items() if dados['local_designado'] == regras.AGUARDANDO_VAGA]
+    carregado = Alocador()
+    carregado.carregar(locais.items(), [(nome, cadastro[nome]) for nome in designados + na_fila])
+    assert carregado.designacoes == alocador.designacoes and carregado.prazos_designados == alocador.prazos_designados
+    assert list(carregado.espera) == list(alocador.espera) == ['davi', 'eva']
+    cadastro['ana']['apto'] = False
+    outros = carregado.processar('usuarios', [('ana', cadastro['ana'])], cadastro)
+    assert [nome for nome, _ in outros] == ['davi'] and cadastro['davi']['local_designado'] == 'Centro'
+
+
+def test_local_com_menos_vagas_realoca_os_ultimos():
+    alocador, cadastro, locais = montar({'Centro': 2, 'Norte': 2}, ['ana', 'bia'])
+    assert {dados['local_designado'] for dados in cadastro.values()} == {'Centro'}
+    locais['Centro'] = local('Rua Centro', regras.CAPACIDADE_POR_VAGA)
+    outros = dict(alocador.processar('locais', [('Centro', locais['Centro'])], cadastro))
+    assert list(outros) == ['bia']
+    assert cadastro['bia']['local_designado'] == 'Norte'
+    assert alocador.origens['bia'] == ('Rua Centro', None)
+
+
+def test_remover_local_manda_os_ocupantes_para_a_fila():
+    alocador, cadastro, _ = montar({'Centro': 2}, ['ana'])
+    alocador.processar('locais', [('Centro', None)], cadastro)
+    assert cadastro['ana']['local_designado'] == regras.AGUARDANDO_VAGA
+
+
+def test_adotar_antes_de_qualquer_alocacao(monkeypatch):
+    # Snapshot binário: a alocação inteira fica para depois, mas alterações de outro processo chegam antes
+    alocador = Alocador()
+    alocador.adotar('locais', [('Centro', local('Rua Centro', 2 * regras.CAPACIDADE_POR_VAGA))])
+    alocador.adotar('usuarios', [('ana', usuario('Ana', local_designado='Centro'))]) # Sem prazo válido
+    amanha = (datetime.date.today() + datetime.timedelta(days=1)).isoformat()
+    assert alocador.prazos_designados['ana'] == amanha
+
+    # Na virada do dia, as datas guardadas não valem mais
+    depois = datetime.date.today() + datetime.timedelta(days=3)
+    monkeypatch.setattr(datetime, 'date', type('Data', (datetime.date,), {'today': classmethod(lambda cls: depois)}))
+    alocador.adotar('usuarios', [('bia', usuario('Bia', local_designado='Centro'))])
+    assert alocador.prazos_designados['bia'] == (depois + datetime.timedelta(days=1)).isoformat()
+
+
+def test_prazo_vencido_antes_da_varredura_nao_ganha_prazo_novo():
+    alocador, cadastro, _ = montar({'Centro': 2}, ['ana'])
+    ontem = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+    cadastro['ana']['prazo_comparecimento'] = ontem
+    assert prazo_vencido(cadastro['ana'])
+    alocador.processar('usuarios', [('ana', cadastro['ana'])], cadastro)
+    assert cadastro['ana']['local_designado'] == regras.PRAZO_VENCIDO
+    assert 'ana' not in alocador.designacoes
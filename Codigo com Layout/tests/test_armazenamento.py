@@ -0,0 +1,177 @@
+import os
+
+import pytest
+
+import regras
+from armazenamento import ArmazenamentoJSON, ArmazenamentoSQLite
+from conftest import local, usuario
+
+
+def abrir(pasta, **opcoes):
+    return ArmazenamentoJSON(str(pasta / 'usuarios.json'), str(pasta / 'locais.json'), str(pasta / 'alteracoes.jsonl'), **opcoes)
+
+
+def carregar(armazenamento):
+    tabelas = {nome: armazenamento.carregar_tabela(nome) for nome in ('usuarios', 'locais')}
+    armazenamento.reproduzir_diario(tabelas)
+    return tabelas
+
+
+# --- Diário ---
+def test_diario_reproduzido_depois_de_reiniciar(pasta):
+    armazenamento = abrir(pasta)
+    armazenamento.registrar_lote('usuarios', [('ana', usuario()), ('bia', usuario('Bia'))])
+    armazenamento.registrar('usuarios', 'ana', usuario(idade=31))
+    armazenamento.registrar('usuarios', 'bia', None)
+    armazenamento.fechar()
+
+    tabelas = carregar(abrir(pasta))
+    assert list(tabelas['usuarios']) == ['ana']
+    assert tabelas['usuarios']['ana']['idade'] == 31
+
+
+def test_linha_incompleta_no_fim_do_diario_e_ignorada(pasta):
+    armazenamento = abrir(pasta)
+    armazenamento.registrar('usuarios', 'ana', usuario())
+    with open(pasta / 'alteracoes.jsonl', 'ab') as diario:
+        diario.write(b'{"t": "usuarios", "k": "bia", "d": {"no') # Queda no meio da escrita
+    tabelas = carregar(abrir(pasta))
+    assert list(tabelas['usuarios']) == ['ana']
+
+
+def test_compactacao_grava_snapshot_e_esvazia_diario(pasta):
+    armazenamento = abrir(pasta, limite_compactacao=2)
+    tabelas = carregar(armazenamento)
+    for nome in ('ana', 'bia'):
+        tabelas['usuarios'][nome] = usuario(nome.title())
+        armazenamento.registrar('usuarios', nome, tabelas['usuarios'][nome])
+    assert armazenamento.precisa_compactar()
+    armazenamento.compactar(tabelas)
+
+    assert armazenamento.entradas_diario == 0
+    assert os.path.exists(pasta / 'usuarios.json')
+    with open(pasta / 'alteracoes.jsonl', 'rb') as diario:
+        assert len(diario.readlines()) == 1 # Só o cabeçalho da nova geração
+    assert sorted(carregar(abrir(pasta))['usuarios']) == ['ana', 'bia']
+
+
+# --- Vários processos ---
+def test_outro_processo_ve_as_alteracoes_depois_da_compactacao(pasta):
+    primeiro, segundo = abrir(pasta, limite_compactacao=1), abrir(pasta)
+    tabelas_primeiro, tabelas_segundo = carregar(primeiro), carregar(segundo)
+    tabelas_primeiro['usuarios']['ana'] = usuario()
+    primeiro.registrar('usuarios', 'ana', tabelas_primeiro['usuarios']['ana'])
+    primeiro.compactar(tabelas_primeiro)
+    primeiro.registrar('usuarios', 'bia', usuario('Bia'))
+
+    mudancas = segundo.sincronizar(tabelas_segundo)
+    assert sorted(chave for _, chave, _ in mudancas) == ['ana', 'bia']
+    assert sorted(tabelas_segundo['usuarios']) == ['ana', 'bia']
+
+
+def test_alteracao_sobre_registro_gravado_por_outro_processo_vira_conflito(pasta):
+    primeiro, segundo = abrir(pasta), abrir(pasta)
+    tabelas_primeiro, tabelas_segundo = carregar(primeiro), carregar(segundo)
+    primeiro.registrar('usuarios', 'ana', usuario(idade=30))
+    segundo.sincronizar(tabelas_segundo, alteradas=[('usuarios', 'ana')])
+
+    # O primeiro grava de novo depois da leitura do segundo: a alteração do segundo é recusada
+    primeiro.registrar('usuarios', 'ana', usuario(idade=40))
+    segundo.registrar('usuarios', 'ana', usuario(idade=50))
+    assert list(segundo.conflitos) == [('usuarios', 'ana')]
+
+    primeiro.sincronizar(tabelas_primeiro)
+    assert carregar(abrir(pasta))['usuarios']['ana']['idade'] == 40
+
+
+def test_sem_alteracao_alheia_nao_ha_conflito(pasta):
+    primeiro, segundo = abrir(pasta), abrir(pasta)
+    carregar(primeiro)
+    tabelas_segundo = carregar(segundo)
+    primeiro.registrar('usuarios', 'ana', usuario(idade=30))
+    segundo.sincronizar(tabelas_segundo, alteradas=[('usuarios', 'ana')])
+    segundo.registrar('usuarios', 'ana', usuario(idade=50))
+    assert not segundo.conflitos
+    assert carregar(abrir(pasta))['usuarios']['ana']['idade'] == 50
+
+
+# --- SQLite ---
+@pytest.fixture
+def banco(pasta):
+    armazenamento = ArmazenamentoSQLite(str(pasta / 'cadastro.db'))
+    yield armazenamento
+    armazenamento.fechar()
+
+
+def test_sqlite_remocao_so_sai_do_banco_quando_gravada(banco):
+    tabela = banco.carregar_tabela('usuarios')
+    banco.registrar_lote('usuarios', [('ana', usuario()), ('bia', usuario('Bia'))])
+    del tabela['ana']
+    assert 'ana' not in tabela and tabela.get('ana') is None
+    assert list(tabela) == ['bia'] and len(tabela) == 1
+    assert banco.conexao.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] == 2
+
+    banco.registrar_lote('usuarios', [('ana', tabela.get('ana'))])
+    assert banco.conexao.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] == 1
+    with pytest.raises(KeyError):
+        del tabela['ana']
+
+
+def test_sqlite_consulta_e_ordenacao(banco):
+    tabela = banco.carregar_tabela('usuarios')
+    banco.registrar_lote('usuarios', [('ana', usuario(idade=30)), ('bia', usuario('Bia', idade=20)), ('caio', usuario('Caio', idade=60))])
+    assert tabela.consultar(idade=(25, 65)) == ['ana', 'caio']
+    assert tabela.chaves_ordenadas('idade', 0, 10) == ['bia', 'ana', 'caio']
+    assert tabela['bia']['apto'] is True
+
+
+def test_sqlite_importa_os_json_na_primeira_execucao(pasta):
+    escrever = ArmazenamentoJSON(str(pasta / 'usuarios.json'), str(pasta / 'locais.json'), str(pasta / 'alteracoes.jsonl'))
+    tabelas = carregar(escrever)
+    tabelas['usuarios']['ana'] = usuario()
+    escrever.compactar(tabelas, forcar=True)
+    banco = ArmazenamentoSQLite(str(pasta / 'cadastro.db'), importar_de=(str(pasta / 'usuarios.json'), str(pasta / 'locais.json')))
+    assert banco.carregar_tabela('usuarios')['ana']['nome'] == 'Ana'
+    banco.fechar()
+
+
+def test_sqlite_sincronizar_traz_so_as_linhas_alteradas_por_outro_processo(pasta):
+    outro, banco = (ArmazenamentoSQLite(str(pasta / 'cadastro.db')) for _ in range(2))
+    tabelas = {nome: banco.carregar_tabela(nome) for nome in ('usuarios', 'locais')}
+    assert banco.sincronizar(tabelas) == []
+    outro.registrar_lote('usuarios', [('ana', usuario()), ('bia', usuario('Bia'))])
+    outro.registrar('usuarios', 'ana', None)
+    assert [(tabela, chave, dados and dados['nome']) for tabela, chave, dados in banco.sincronizar(tabelas)] == \
+        [('usuarios', 'ana', None), ('usuarios', 'bia', 'Bia')]
+    banco.registrar('locais', 'Centro', local())
+    assert banco.sincronizar(tabelas) == [] # As próprias gravações não voltam
+    assert [chave for _, chave, _ in outro.sincronizar(tabelas)] == ['Centro']
+    outro.fechar()
+    banco.fechar()
+
+
+def test_sqlite_registro_de_alteracoes_descartado_obriga_a_recarregar(pasta, monkeypatch):
+    monkeypatch.setattr('armazenamento.LIMITE_ALTERACOES_SQLITE', 2)
+    outro, banco = (ArmazenamentoSQLite(str(pasta / 'cadastro.db')) for _ in range(2))
+    tabelas = {nome: banco.carregar_tabela(nome) for nome in ('usuarios', 'locais')}
+    for nome in ('ana', 'bia', 'caio', 'davi'):
+        outro.registrar('usuarios', nome, usuario(nome))
+    assert banco.conexao.execute("SELECT COUNT(*) FROM alteracoes").fetchone()[0] == 2
+    assert banco.sincronizar(tabelas) is None
+    outro.registrar('usuarios', 'eva', usuario('Eva'))
+    assert [chave for _, chave, _ in banco.sincronizar(tabelas)] == ['eva']
+    outro.fechar()
+    banco.fechar()
+
+
+def test_sqlite_usuarios_alocados_pelo_indice(banco):
+    banco.registrar('locais', 'Centro', local())
+    banco.registrar_lote('usuarios', [
+        ('ana', usuario(local_designado='Centro', prazo_comparecimento='2026-10-21')),
+        ('bia', usuario('Bia', local_designado='Centro', prazo_comparecimento='2026-10-20')),
+        ('caio', usuario('Caio', local_designado=regras.AGUARDANDO_VAGA)),
+        ('davi', usuario('Davi', local_designado='N/A')),
+        ('eva', usuario('Eva', local_designado='Removido', prazo_comparecimento='2026-10-19'))])
+    assert [chave for chave, _ in banco.usuarios_alocados(regras.AGUARDANDO_VAGA)] == ['bia', 'ana', 'caio']
+    plano = banco.conexao.execute("EXPLAIN QUERY PLAN SELECT * FROM usuarios WHERE local_designado = ?", ('x',)).fetchall()
+    assert 'idx_usuarios_local_designado' in str([tuple(linha) for linha in plano])
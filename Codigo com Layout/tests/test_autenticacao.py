@@ -0,0 +1,17 @@
+from autenticacao import HASH_FICTICIO, conferir_senha, gerar_hash, senha_em_texto_puro
+
+
+def test_hash_confere_so_a_senha_certa():
+    armazenada = gerar_hash('segredo', iteracoes=1000)
+    assert not senha_em_texto_puro(armazenada)
+    assert conferir_senha('segredo', armazenada)
+    assert not conferir_senha('Segredo', armazenada)
+    assert gerar_hash('segredo', iteracoes=1000) != armazenada # Sal diferente a cada hash
+
+
+def test_senhas_antigas_e_valores_invalidos():
+    assert senha_em_texto_puro('1234') and conferir_senha('1234', '1234')
+    assert not conferir_senha('123', '1234')
+    assert not conferir_senha('', '') and not conferir_senha('x', None)
+    assert not conferir_senha('x', 'pbkdf2_sha256$mil$zz$00')
+    assert not conferir_senha('', HASH_FICTICIO) and not conferir_senha('0', HASH_FICTICIO)
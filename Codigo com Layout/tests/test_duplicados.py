@@ -0,0 +1,54 @@
+from unittest import mock
+
+import duplicados
+from conftest import usuario
+from duplicados import IndiceDuplicados, chaves_bloco, caracteristicas, verificar_cadastro
+
+
+def cadastro():
+    return {'ana': usuario('Ana Maria Souza', endereco='Rua das Flores, 120', renda=300.0),
+            'ana2': usuario('Anna Maria de Souza', endereco='R. das Flores 120', renda=300.0),
+            'pai': usuario('Jorge Lima', endereco='Rua das Flores, 120', pessoas_casa=3, renda=1000.0),
+            'mae': usuario('Helena Lima', endereco='Rua das Flores 120', pessoas_casa=3, renda=1050.0),
+            'bia': usuario('Bia Costa', endereco='Avenida Brasil, 9'),
+            'pre': {'senha': 'x', 'registrado': False}}
+
+
+def test_mesma_pessoa_e_mesma_familia():
+    pares = {(a, b): motivo for a, b, _, motivo in verificar_cadastro(cadastro(), processos=1)}
+    assert pares[('ana', 'ana2')] == "Mesma pessoa"
+    assert pares[('mae', 'pai')] == "Mesma família"
+    assert not any('bia' in par or 'pre' in par for par in pares)
+
+
+def test_so_compara_quem_divide_um_bloco():
+    usuarios = cadastro()
+    comparados = []
+    original = duplicados.comparar
+
+    def contar(a, b, *argumentos):
+        comparados.append((a[0], b[0]))
+        return original(a, b, *argumentos)
+    with mock.patch.object(duplicados, 'comparar', contar):
+        verificar_cadastro(usuarios, processos=1)
+    nomes = {caracteristicas(usuarios['bia'])[0]}
+    assert comparados and not any(nomes & set(par) for par in comparados) # Bia não divide bloco com ninguém
+
+
+def test_indice_confere_um_cadastro_e_acompanha_alteracoes():
+    usuarios = cadastro()
+    indice = IndiceDuplicados()
+    indice.construir(usuarios)
+    assert [outro for outro, _, _ in indice.verificar('ana', usuarios['ana'], usuarios)][0] == 'ana2'
+
+    usuarios['ana2'] = usuario('Carlos Pereira', endereco='Rua Nova, 5')
+    indice.atualizar('ana2', usuarios['ana2'])
+    assert 'ana2' not in [outro for outro, _, _ in indice.verificar('ana', usuarios['ana'], usuarios)]
+    indice.atualizar('mae', None)
+    assert all('mae' not in bloco for bloco in indice.blocos.values())
+
+
+def test_blocos_grandes_demais_sao_ignorados(monkeypatch):
+    monkeypatch.setattr(duplicados, 'MAXIMO_BLOCO', 1)
+    assert verificar_cadastro(cadastro(), processos=1) == []
+    assert chaves_bloco(caracteristicas(usuario('Ana', endereco='Rua A 10')))
@@ -0,0 +1,49 @@
+import datetime
+
+from conftest import local, usuario
+from estatisticas import EstatisticasCadastro, formatar_resumo
+
+HOJE = datetime.date(2026, 3, 10)
+
+
+def cadastro():
+    usuarios = {'ana': usuario('Ana', renda=300.0, prazo_comparecimento='2026-03-12'),
+                'bia': usuario('Bia', renda=1200.0, apto=False),
+                'caio': {'senha': 'x', 'registrado': False}} # Só o pré-cadastro
+    locais = {'Centro': local(capacidade=1000), 'Norte': local(capacidade=400, apto="Não")}
+    return usuarios, locais
+
+
+def test_incremental_igual_a_construir_de_novo():
+    usuarios, locais = cadastro()
+    estatisticas = EstatisticasCadastro()
+    estatisticas.construir(usuarios, locais)
+    usuarios['bia'] = usuario('Bia', renda=5200.0, pessoas_casa=9, prazo_comparecimento='2026-03-15')
+    estatisticas.atualizar('usuarios', 'bia', usuarios['bia'])
+    del usuarios['ana']
+    estatisticas.atualizar('usuarios', 'ana', None)
+    locais['Norte'] = local(capacidade=1500)
+    estatisticas.atualizar('locais', 'Norte', locais['Norte'])
+
+    do_zero = EstatisticasCadastro()
+    do_zero.construir(usuarios, locais)
+    assert estatisticas.resumo(HOJE) == do_zero.resumo(HOJE)
+
+
+def test_resumo():
+    usuarios, locais = cadastro()
+    estatisticas = EstatisticasCadastro()
+    estatisticas.construir(usuarios, locais)
+    resumo = estatisticas.resumo(HOJE)
+    assert (resumo['usuarios'], resumo['registrados'], resumo['aptos']) == (3, 2, 1)
+    assert (resumo['locais'], resumo['locais_aptos'], resumo['capacidade_apta']) == (2, 1, 1000)
+    assert resumo['prazos_semana'] == 1
+    assert dict(resumo['renda'])['0 a 500'] == 1 and dict(resumo['renda'])['1000 a 1500'] == 1
+    assert dict(resumo['pessoas'])['3'] == 2
+    assert "Usuários aptos: 1" in formatar_resumo(resumo)
+
+
+def test_antes_de_construir_as_alteracoes_sao_ignoradas():
+    estatisticas = EstatisticasCadastro()
+    estatisticas.atualizar('usuarios', 'ana', usuario())
+    assert estatisticas.resumo(HOJE)['usuarios'] == 0
@@ -0,0 +1,49 @@
+import csv
+import json
+
+import pytest
+
+from conftest import usuario
+from exportacao import exportar
+from motor_regras import ErroRegra
+
+
+@pytest.fixture
+def cadastro():
+    return {'ana': usuario('Ana', renda=300.0, senha='segredo'),
+            'bia': usuario('Bia', renda=1500.0, apto=False, senha='segredo'),
+            'admin': usuario('Admin')}
+
+
+def test_csv_com_todas_as_colunas_menos_a_senha(pasta, cadastro):
+    resultado = exportar(str(pasta / 'u.csv'), 'usuarios', cadastro, reservados={'admin'}, tamanho_lote=1)
+    with open(pasta / 'u.csv', newline='', encoding='utf-8') as f:
+        linhas = list(csv.DictReader(f))
+    assert resultado.exportados == 2
+    assert [linha['username'] for linha in linhas] == ['ana', 'bia']
+    assert 'senha' not in linhas[0]
+
+
+def test_jsonl_com_condicoes_filtro_e_colunas(pasta, cadastro):
+    exportar(str(pasta / 'u.jsonl'), 'usuarios', cadastro, colunas=['nome', 'renda'],
+             condicoes={'apto': True}, filtro="renda / pessoas_casa <= 200")
+    with open(pasta / 'u.jsonl', encoding='utf-8') as f:
+        assert [json.loads(linha) for linha in f] == [{'nome': 'Ana', 'renda': 300.0}] # Admin: 1000 / 3 > 200
+
+
+@pytest.mark.parametrize('opcoes, erro', [
+    ({'colunas': ['senha']}, ValueError),
+    ({'filtro': 'renda ** 2 > 1'}, ErroRegra),
+    ({'formato': 'xml'}, ValueError),
+])
+def test_pedido_invalido_nao_deixa_arquivo(pasta, cadastro, opcoes, erro):
+    with pytest.raises(erro):
+        exportar(str(pasta / 'u.csv'), 'usuarios', cadastro, **opcoes)
+    assert list(pasta.iterdir()) == []
+
+
+def test_falha_no_meio_nao_deixa_arquivo_parcial(pasta, cadastro):
+    cadastro['bia'] = None # Registro que quebra a leitura depois do primeiro lote
+    with pytest.raises(AttributeError):
+        exportar(str(pasta / 'u.csv'), 'usuarios', cadastro, tamanho_lote=1)
+    assert list(pasta.iterdir()) == []
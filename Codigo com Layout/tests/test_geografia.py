@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from geografia import GradeEspacial, aplicar_coordenadas, carregar_gazetteer, distancia_km, ler_coordenadas
+
+
+def mais_proximos_na_forca(pontos, latitude, longitude, quantidade):
+    return sorted((distancia_km(latitude, longitude, *ponto), nome) for nome, ponto in pontos.items())[:quantidade]
+
+
+def test_mais_proximos_igual_a_comparar_todos():
+    aleatorio = random.Random(7)
+    pontos = {f'L{i}': (aleatorio.uniform(-24, -22), aleatorio.uniform(-47, -45)) for i in range(300)}
+    grade = GradeEspacial()
+    for nome, ponto in pontos.items():
+        grade.definir(nome, ponto)
+    for _ in range(50):
+        latitude, longitude = aleatorio.uniform(-25, -21), aleatorio.uniform(-48, -44)
+        assert grade.mais_proximos(latitude, longitude, 3) == mais_proximos_na_forca(pontos, latitude, longitude, 3)
+
+
+def test_pontos_retirados_e_filtro():
+    grade = GradeEspacial()
+    grade.definir('perto', (-23.55, -46.63))
+    grade.definir('longe', (-22.90, -43.17))
+    assert grade.mais_proximos(-23.5, -46.6)[0][1] == 'perto'
+    assert grade.mais_proximos(-23.5, -46.6, aceitar=lambda nome: nome != 'perto')[0][1] == 'longe'
+    grade.definir('perto', None)
+    assert [nome for _, nome in grade.mais_proximos(-23.5, -46.6, 5)] == ['longe']
+    grade.definir('longe', None)
+    assert grade.mais_proximos(-23.5, -46.6) == []
+
+
+def test_distancia_conhecida():
+    # São Paulo -> Rio de Janeiro: cerca de 360 km em linha reta
+    assert distancia_km(-23.55, -46.63, -22.91, -43.17) == pytest.approx(360, abs=10)
+
+
+def test_coordenadas_invalidas():
+    assert ler_coordenadas('', None) is None
+    assert ler_coordenadas('-23.5', '-46.6') == (-23.5, -46.6)
+    for latitude, longitude in (('abc', '1'), ('91', '0'), ('0', None)):
+        with pytest.raises(ValueError):
+            ler_coordenadas(latitude, longitude)
+
+
+def test_gazetteer_com_ponto_medio_da_rua(pasta):
+    (pasta / 'gazetteer.csv').write_text('endereco,latitude,longitude\n'
+                                         'Rua A 10,-23.0,-46.0\nRua A 20,-23.2,-46.2\nRua B 1,abc,0\n', encoding='utf-8')
+    gazetteer = carregar_gazetteer(str(pasta / 'gazetteer.csv'))
+    assert len(gazetteer) == 2 and [numero for numero, _ in gazetteer.ignoradas] == [4]
+    assert gazetteer.localizar('rua a 10') == (-23.0, -46.0)
+    assert gazetteer.localizar('Rua A 15') == pytest.approx((-23.1, -46.1))
+    assert gazetteer.localizar('Rua C 1') is None
+
+
+def test_aplicar_coordenadas_respeita_as_existentes(pasta):
+    (pasta / 'gazetteer.csv').write_text('endereco,latitude,longitude\nRua A,-23.0,-46.0\n', encoding='utf-8')
+    gazetteer = carregar_gazetteer(str(pasta / 'gazetteer.csv'))
+    dados = {'sem': {'endereco': 'Rua A'}, 'com': {'endereco': 'Rua A', 'latitude': -1.0, 'longitude': -1.0},
+             'fora': {'endereco': 'Rua Z'}}
+    alterados, nao_encontrados = aplicar_coordenadas(dados, gazetteer)
+    assert [chave for chave, _ in alterados] == ['sem'] and nao_encontrados == 1
+    assert dados['com']['latitude'] == -1.0
+    alterados, _ = aplicar_coordenadas(dados, gazetteer, sobrescrever=True)
+    assert [chave for chave, _ in alterados] == ['com']
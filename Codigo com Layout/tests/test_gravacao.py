@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+from gravacao import GravadorSegundoPlano
+
+
+class ArmazenamentoFalso:
+    def __init__(self, falhas=0):
+        self.lotes = []
+        self.falhas = falhas
+
+    def registrar_lote(self, tabela, itens):
+        if self.falhas:
+            self.falhas -= 1
+            raise OSError('disco cheio')
+        self.lotes.append((tabela, itens))
+
+    def precisa_compactar(self):
+        return False
+
+
+def test_edicoes_do_mesmo_registro_viram_uma_gravacao():
+    armazenamento = ArmazenamentoFalso()
+    gravador = GravadorSegundoPlano(armazenamento, dict, janela=60)
+    registro = {'nome': 'Ana', 'idade': 30}
+    for idade in (31, 32, 33):
+        registro['idade'] = idade
+        gravador.marcar('usuarios', [('ana', registro)])
+    gravador.marcar('usuarios', [('bia', None)])
+    registro['idade'] = 99 # Alteração depois de marcar() não entra no lote já copiado
+    gravador.encerrar()
+    assert armazenamento.lotes == [('usuarios', [('ana', {'nome': 'Ana', 'idade': 33}), ('bia', None)])]
+
+
+def test_falha_de_escrita_chega_a_quem_descarrega_e_o_lote_e_mantido(monkeypatch):
+    monkeypatch.setattr('gravacao.ESPERA_APOS_ERRO', 0.01)
+    armazenamento = ArmazenamentoFalso(falhas=1)
+    gravador = GravadorSegundoPlano(armazenamento, dict, janela=0.01)
+    gravador.marcar('locais', [('Centro', {'capacidade': 10})])
+    with pytest.raises(OSError):
+        gravador.descarregar()
+    while gravador.erro is not None: # A thread tenta de novo sozinha
+        time.sleep(0.01)
+    gravador.encerrar()
+    assert armazenamento.lotes == [('locais', [('Centro', {'capacidade': 10})])]
+    assert gravador.erro is None
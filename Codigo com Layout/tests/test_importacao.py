@@ -0,0 +1,53 @@
+import json
+
+from armazenamento import ConflitoVersao
+from importacao import importar
+
+CABECALHO = 'username,nome,idade,endereco,pessoas_casa,renda,profissao\n'
+
+
+def test_csv_importa_validas_e_rejeita_as_demais(pasta):
+    (pasta / 'usuarios.csv').write_text(CABECALHO +
+        'ana,Ana,30,Rua A,3,0,Agricultora\n'     # Renda zero é válida
+        'bia,Bia,dez,Rua B,2,100,Pedreira\n'     # Idade não numérica
+        ',Sem Nome,40,Rua C,1,100,Cozinheira\n'  # Sem chave
+        'ana,Ana,31,Rua A,3,0,Agricultora\n'     # Repetida no arquivo
+        'admin,Admin,40,Rua D,1,100,Gerente\n',  # Reservada
+        encoding='utf-8')
+    dados, lotes = {}, []
+    resultado = importar(str(pasta / 'usuarios.csv'), 'usuarios', dados, lambda tabela, itens: lotes.append(itens),
+                         reservados={'admin'})
+    assert resultado.importados == 1
+    assert [numero for numero, _ in resultado.rejeitados] == [3, 4, 5, 6]
+    assert dados['ana']['renda'] == 0.0 and dados['ana']['apto'] is True
+    assert [chave for chave, _ in lotes[0]] == ['ana']
+
+
+def test_jsonl_grava_em_lotes_e_recusa_valores_compostos(pasta):
+    linhas = [{'username': f'u{i}', 'nome': f'U{i}', 'idade': 30, 'endereco': 'Rua A', 'pessoas_casa': 1,
+               'renda': 100, 'profissao': 'X'} for i in range(5)]
+    linhas.append(dict(linhas[0], username='lista', idade=[30]))
+    (pasta / 'usuarios.jsonl').write_text('\n'.join(map(json.dumps, linhas)) + '\n{quebrada\n', encoding='utf-8')
+    lotes = []
+    resultado = importar(str(pasta / 'usuarios.jsonl'), 'usuarios', {}, lambda tabela, itens: lotes.append(len(itens)),
+                         tamanho_lote=2)
+    assert resultado.importados == 5
+    assert lotes == [2, 2, 1]
+    assert [numero for numero, _ in resultado.rejeitados] == [6, 7]
+
+
+def test_conflito_no_meio_para_e_mantem_os_lotes_anteriores(pasta):
+    (pasta / 'usuarios.csv').write_text(CABECALHO + ''.join(f'u{i},U{i},30,Rua A,1,100,X\n' for i in range(5)) +
+                                        'ruim,Ruim,dez,Rua A,1,100,X\n', encoding='utf-8')
+    dados, lotes = {}, []
+
+    def gravar_lote(tabela, itens):
+        if len(lotes) == 1:
+            dados['u2'] = {'nome': 'De outra estação'} # O que a sincronização traria
+            raise ConflitoVersao("'u2' foi alterado em outra estação.", tabela, 'u2')
+        lotes.append([chave for chave, _ in itens])
+    resultado = importar(str(pasta / 'usuarios.csv'), 'usuarios', dados, gravar_lote, tamanho_lote=2)
+    assert resultado.importados == 2 and lotes == [['u0', 'u1']]
+    assert isinstance(resultado.interrompida, ConflitoVersao)
+    assert sorted(dados) == ['u0', 'u1', 'u2'] and dados['u2'] == {'nome': 'De outra estação'}
+    assert resultado.rejeitados == [] # A importação parou antes da linha inválida
@@ -0,0 +1,49 @@
+import pytest
+
+from conftest import usuario
+from indices import IndiceBusca, IndicesTabela, consultar
+
+
+@pytest.fixture
+def cadastro():
+    return {'ana': usuario('Ana Souza', idade=30, renda=500.0),
+            'bia': usuario('Bia Lima', idade=17, renda=800.0, endereco='Rua B'),
+            'caio': usuario('Caio Souza', idade=45, renda=2500.0, apto=False)}
+
+
+def test_consulta_por_valor_e_por_faixa(cadastro):
+    indices = IndicesTabela('usuarios')
+    assert consultar(cadastro, indices, idade=(18, None)) == ['ana', 'caio'] # Constrói na primeira consulta
+    assert consultar(cadastro, indices, apto=True, renda=(None, 600)) == ['ana']
+    assert consultar(cadastro, indices, endereco='Rua B') == ['bia']
+
+
+def test_indices_acompanham_alteracoes_e_remocoes(cadastro):
+    indices = IndicesTabela('usuarios')
+    indices.construir(cadastro)
+    cadastro['bia']['idade'] = 18
+    indices.atualizar('bia', cadastro['bia'])
+    indices.atualizar('caio', None)
+    assert indices.consultar(idade=(18, 100)) == {'ana', 'bia'}
+    assert indices.consultar(apto=False) == set()
+
+
+def test_campo_sem_indice_e_recusado(cadastro):
+    with pytest.raises(ValueError):
+        consultar(cadastro, IndicesTabela('usuarios'), nome='Ana')
+
+
+def test_busca_por_prefixo_de_palavras(cadastro):
+    busca = IndiceBusca('usuarios')
+    busca.construir(cadastro)
+    assert busca.buscar('sou') == {'ana', 'caio'}
+    assert busca.buscar('souza ca') == {'caio'}
+    busca.atualizar('ana', None)
+    assert busca.buscar('sou') == {'caio'}
+
+
+def test_busca_ignora_acentos_e_maiusculas(cadastro):
+    cadastro['davi'] = dict(cadastro['ana'], nome='Davi Conceição')
+    busca = IndiceBusca('usuarios')
+    busca.construir(cadastro)
+    assert busca.buscar('CONCEI') == {'davi'}
@@ -0,0 +1,44 @@
+import pytest
+
+from motor_regras import ErroRegra, Regra
+
+
+def test_avalia_registro_convertendo_campos_numericos():
+    regra = Regra("idade >= 18 and renda / pessoas_casa <= 700 and profissao not in ('Político',)")
+    assert regra({'idade': '30', 'renda': '1400', 'pessoas_casa': 2, 'profissao': 'Agricultora'}) is True
+    assert regra({'idade': 30, 'renda': 1400, 'pessoas_casa': 2, 'profissao': 'Político'}) is False
+
+
+def test_campo_ausente_ou_erro_de_conta_vale_none():
+    regra = Regra("renda / pessoas_casa <= 700")
+    assert regra({'renda': 100}) is None
+    assert regra({'renda': 100, 'pessoas_casa': 0}) is None
+
+
+def test_condicional_e_campos_usados():
+    regra = Regra("capacidade_producao >= (1000 if andares < 5 else 1500)")
+    assert regra.campos == {'capacidade_producao', 'andares'}
+    assert regra({'capacidade_producao': 1200, 'andares': 2}) is True
+    assert regra({'capacidade_producao': 1200, 'andares': 6}) is False
+
+
+@pytest.mark.parametrize('expressao', [
+    "__import__('os')",
+    "nome.upper() == 'A'",
+    "renda ** 10 ** 9",
+    "profissao * 999999999",
+    "'%0999999999d' % idade",
+    "(1, 2) * 1000",
+    "_registro",
+    "idade in idade",
+    "idade >=",
+])
+def test_expressoes_perigosas_ou_invalidas_sao_recusadas(expressao):
+    with pytest.raises(ErroRegra):
+        Regra(expressao)
+
+
+def test_faixas_alteradas_quando_so_o_limite_muda():
+    nova, anterior = Regra("idade >= 21 and renda <= 2000"), Regra("idade >= 18 and renda <= 2000")
+    assert nova.faixas_alteradas(anterior) == [('idade', 18, 21)]
+    assert Regra("idade > 21").faixas_alteradas(anterior) is None
@@ -0,0 +1,48 @@
+import datetime
+
+import regras
+from conftest import usuario
+from prazos import AgendaPrazos, varrer
+
+HOJE = datetime.date(2026, 3, 10)
+
+
+def com_prazo(nome, dias):
+    return usuario(nome, local_designado='Centro', prazo_comparecimento=(HOJE + datetime.timedelta(days=dias)).isoformat())
+
+
+def test_varredura_marca_so_os_vencidos():
+    usuarios = {'ana': com_prazo('Ana', -2), 'bia': com_prazo('Bia', 0), 'caio': com_prazo('Caio', 3),
+                'davi': usuario('Davi', local_designado=regras.AGUARDANDO_VAGA)}
+    agenda = AgendaPrazos()
+    alterados = varrer(agenda, usuarios, HOJE)
+    assert [username for username, _ in alterados] == ['ana']
+    assert usuarios['ana']['local_designado'] == regras.PRAZO_VENCIDO
+    assert usuarios['bia']['local_designado'] == 'Centro' # O prazo de hoje ainda vale
+
+    # Gravados, saem da agenda: a próxima varredura não os encontra de novo
+    for username, dados in alterados:
+        agenda.atualizar(username, dados)
+    assert varrer(agenda, usuarios, HOJE) == []
+
+
+def test_agenda_acompanha_prazos_alterados_e_removidos():
+    usuarios = {'ana': com_prazo('Ana', 1), 'bia': com_prazo('Bia', 5)}
+    agenda = AgendaPrazos()
+    agenda.construir(usuarios)
+    assert agenda.proximos(2, HOJE) == {'ana'}
+    agenda.atualizar('ana', com_prazo('Ana', 6))
+    agenda.atualizar('bia', None)
+    assert agenda.proximos(7, HOJE) == {'ana'}
+    assert agenda.dias == [(HOJE + datetime.timedelta(days=6)).toordinal()]
+    assert agenda.vencidos(HOJE + datetime.timedelta(days=7)) == ['ana']
+
+
+def test_removido_ou_ja_marcado_so_sai_da_agenda():
+    usuarios = {'ana': com_prazo('Ana', -1), 'bia': com_prazo('Bia', -1)}
+    agenda = AgendaPrazos()
+    agenda.construir(usuarios)
+    del usuarios['ana']
+    usuarios['bia']['local_designado'] = regras.PRAZO_VENCIDO # Outra estação marcou antes
+    assert varrer(agenda, usuarios, HOJE) == []
+    assert agenda.vencidos(HOJE) == []
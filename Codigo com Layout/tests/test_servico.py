@@ -0,0 +1,138 @@
+import asyncio
+import json
+import threading
+from http import HTTPStatus
+
+import pytest
+
+from armazenamento import ArmazenamentoJSON
+from autenticacao import gerar_hash
+from conftest import local, usuario
+from servico import Cadastro, ErroServico, Servico, endereco_local, executar
+
+
+@pytest.fixture
+def cadastro(pasta):
+    armazenamento = ArmazenamentoJSON('usuarios.json', 'locais.json', 'alteracoes.jsonl')
+    cadastro = Cadastro(armazenamento)
+    cadastro.carregar()
+    cadastro.gravar_lote('locais', [['Centro', local(nome_local='Centro'), 0]])
+    yield cadastro
+    cadastro.gravador.encerrar()
+    armazenamento.fechar()
+
+
+def gravar(cadastro, chave, dados, versao=None):
+    return cadastro.gravar_lote('usuarios', [[chave, dados, versao]])['alterados']
+
+
+# --- Cadastro ---
+def test_gravacao_aplica_regras_alocacao_e_versao(cadastro):
+    (tabela, chave, dados, versao), = gravar(cadastro, 'ana', usuario(idade='30'), 0)
+    assert (tabela, chave, versao) == ('usuarios', 'ana', 1)
+    assert dados['idade'] == 30 and dados['apto'] is True
+    assert dados['local_designado'] == 'Centro'
+    assert gravar(cadastro, 'ana', usuario(), 1)[0][3] == 2
+
+
+def test_versao_desatualizada_e_recusada(cadastro):
+    gravar(cadastro, 'ana', usuario(), 0)
+    with pytest.raises(ErroServico) as erro:
+        gravar(cadastro, 'ana', usuario(idade=40), 0)
+    assert erro.value.status == HTTPStatus.CONFLICT
+    assert cadastro.tabelas['usuarios']['ana']['idade'] == 30
+
+
+def test_lote_com_um_registro_invalido_nao_aplica_nenhum(cadastro):
+    with pytest.raises(ErroServico) as erro:
+        cadastro.gravar_lote('usuarios', [['ana', usuario(), 0], ['bia', usuario('Bia', idade='abc'), 0]])
+    assert erro.value.status == HTTPStatus.BAD_REQUEST
+    assert 'ana' not in cadastro.tabelas['usuarios']
+    assert cadastro.versao('usuarios', 'ana') == 0
+
+
+def test_senha_nao_sai_do_servico_e_e_mantida(cadastro):
+    assert 'senha' not in gravar(cadastro, 'ana', usuario(senha='hash-antigo'), 0)[0][2]
+    lido = cadastro.obter('usuarios', 'ana')
+    assert 'senha' not in lido['dados']
+    assert 'senha' not in cadastro.obter_varios('usuarios', ['ana'])['ana']['dados']
+    # O cliente devolve o registro sem a senha: a armazenada continua valendo
+    gravar(cadastro, 'ana', dict(lido['dados'], idade=31), lido['versao'])
+    assert cadastro.tabelas['usuarios']['ana']['senha'] == 'hash-antigo'
+
+
+def test_login_conferido_no_servico(cadastro):
+    gravar(cadastro, 'ana', usuario(senha=gerar_hash('abc', iteracoes=1000)), 0)
+    gravar(cadastro, 'bia', usuario('Bia', senha='texto-puro'), 0)
+    servico = Servico(cadastro)
+
+    async def login(username, senha):
+        return await servico.conferir_login(username, senha)
+    assert asyncio.run(login('ana', 'abc')) is True
+    assert asyncio.run(login('ana', 'errada')) is False
+    assert asyncio.run(login('ninguem', 'abc')) is False
+    assert asyncio.run(login('bia', 'texto-puro')) is True
+    assert cadastro.tabelas['usuarios']['bia']['senha'].startswith('pbkdf2') # Convertida no login
+
+
+# --- HTTP ---
+async def requisitar(porta, caminho, cabecalhos=''):
+    leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+    escritor.write(f"GET {caminho} HTTP/1.1\r\nHost: teste\r\n{cabecalhos}Connection: close\r\n\r\n".encode())
+    await escritor.drain()
+    resposta = await leitor.read()
+    escritor.close()
+    status = int(resposta.split(b' ', 2)[1])
+    return status, json.loads(resposta.split(b'\r\n\r\n', 1)[1])
+
+
+def test_token_exigido_em_todas_as_requisicoes(cadastro):
+    gravar(cadastro, 'ana', usuario(senha='hash'), 0)
+
+    async def cenario():
+        servidor = await asyncio.start_server(Servico(cadastro, 'segredo').atender, '127.0.0.1', 0)
+        porta = servidor.sockets[0].getsockname()[1]
+        async with servidor:
+            sem_token = await requisitar(porta, '/usuarios/registros/ana')
+            token_errado = await requisitar(porta, '/saude', 'Authorization: Bearer outro\r\n')
+            com_token = await requisitar(porta, '/usuarios/registros/ana', 'Authorization: Bearer segredo\r\n')
+        return sem_token, token_errado, com_token
+    sem_token, token_errado, (status, corpo) = asyncio.run(cenario())
+    assert sem_token[0] == token_errado[0] == HTTPStatus.UNAUTHORIZED
+    assert status == HTTPStatus.OK and corpo['dados']['nome'] == 'Ana' and 'senha' not in corpo['dados']
+
+
+def test_sem_token_so_escuta_localmente(pasta):
+    assert endereco_local('127.0.0.1') and endereco_local('::1') and endereco_local('localhost')
+    assert not endereco_local('0.0.0.0') and not endereco_local('servidor.exemplo')
+    with pytest.raises(ValueError):
+        asyncio.run(executar('0.0.0.0', 0, token=None))
+    assert list(pasta.iterdir()) == [] # Recusado antes de abrir o armazenamento
+
+
+def test_recalculo_fora_do_laco_segura_as_escritas(cadastro, monkeypatch):
+    calculando, liberar = threading.Event(), threading.Event()
+
+    def calcular_devagar(alteradas):
+        calculando.set()
+        liberar.wait(5)
+        return {'usuarios': [('ana', usuario(apto=True))], 'locais': []}
+    monkeypatch.setattr(cadastro, 'calcular_recalculo', calcular_devagar)
+    monkeypatch.setattr('servico.regras.carregar_regras', lambda: None)
+    servico = Servico(cadastro)
+
+    async def cenario():
+        laco = asyncio.get_running_loop()
+        recalculo = asyncio.create_task(servico.despachar('POST', '/recalcular', b''))
+        await laco.run_in_executor(None, calculando.wait)
+        lote = asyncio.create_task(servico.despachar('POST', '/usuarios/lote', json.dumps(
+            {'itens': [['ana', usuario(nome='Ana Maria'), None]]}).encode()))
+        leitura = await servico.despachar('GET', '/saude', b'') # O laço continua atendendo
+        await asyncio.sleep(0.05)
+        lote_esperou = not lote.done()
+        liberar.set()
+        return leitura, lote_esperou, await recalculo, await lote
+    leitura, lote_esperou, recalculo, lote = asyncio.run(cenario())
+    assert leitura == (HTTPStatus.OK, {'ok': True}) and lote_esperou
+    assert recalculo == (HTTPStatus.OK, {'usuarios': 1, 'locais': 0})
+    assert lote[0] == HTTPStatus.OK and cadastro.tabelas['usuarios']['ana']['nome'] == 'Ana Maria' # Aplicado depois
@@ -0,0 +1,41 @@
+from armazenamento import ArmazenamentoJSON, escrever_json_atomico
+from conftest import usuario
+from snapshot_binario import TabelaMapeada, gravar_snapshot
+
+
+def test_snap_gravado_e_lido_de_volta(pasta):
+    dados = {'caio': usuario('Caio', idade=45, renda=2500.5, apto=False),
+             'ana': usuario('Ana', latitude=-23.5, apelido='Aninha'), # Campo fora de CAMPOS vai junto
+             'bia': usuario('Bia', idade=None)}
+    gravar_snapshot(str(pasta / 'usuarios.snap'), 'usuarios', dados)
+    tabela = TabelaMapeada(str(pasta / 'usuarios.snap'), 'usuarios')
+    try:
+        assert list(tabela) == ['caio', 'ana', 'bia'] # Ordem original das chaves
+        assert len(tabela) == 3 and 'ana' in tabela and 'davi' not in tabela
+        assert {chave: dict(registro) for chave, registro in tabela.items()} == dados
+        assert tabela.chaves_pagina(1, 5) == ['ana', 'bia']
+    finally:
+        tabela.fechar()
+
+
+def test_alteracoes_ficam_por_cima_do_arquivo(pasta):
+    gravar_snapshot(str(pasta / 'usuarios.snap'), 'usuarios', {'ana': usuario(), 'bia': usuario('Bia')})
+    tabela = TabelaMapeada(str(pasta / 'usuarios.snap'), 'usuarios')
+    try:
+        tabela['caio'] = usuario('Caio')
+        tabela['ana']['idade'] = 31
+        del tabela['bia']
+        assert list(tabela) == ['ana', 'caio']
+        assert tabela['ana']['idade'] == 31 and 'bia' not in tabela
+    finally:
+        tabela.fechar()
+
+
+def test_formato_binario_criado_a_partir_do_json(pasta):
+    escrever_json_atomico(str(pasta / 'usuarios.json'), {'ana': usuario()})
+    armazenamento = ArmazenamentoJSON(str(pasta / 'usuarios.json'), str(pasta / 'locais.json'),
+                                      str(pasta / 'alteracoes.jsonl'), formato_snapshot='binario')
+    tabela = armazenamento.carregar_tabela('usuarios')
+    assert (pasta / 'usuarios.snap').exists()
+    assert dict(tabela['ana']) == usuario()
+    tabela.fechar()
@@ -0,0 +1,52 @@
+import os
+
+from armazenamento import ArmazenamentoJSON, escrever_json_atomico
+from conftest import usuario
+from snapshot_particionado import caminho_parte, carregar_particoes, gravar_particoes, ler_manifesto, particao
+
+
+def abrir(pasta, **opcoes):
+    return ArmazenamentoJSON(str(pasta / 'usuarios.json'), str(pasta / 'locais.json'), str(pasta / 'alteracoes.jsonl'),
+                             formato_snapshot='particionado', **opcoes)
+
+
+def carregar(armazenamento):
+    tabelas = {nome: armazenamento.carregar_tabela(nome) for nome in ('usuarios', 'locais')}
+    armazenamento.reproduzir_diario(tabelas)
+    return tabelas
+
+
+def test_particao_estavel_e_dentro_do_limite():
+    assert particao('ana', 64) == particao('ana', 64)
+    assert all(0 <= particao(f'u{i}', 8) < 8 for i in range(100))
+
+
+def test_gravar_particoes_sem_alteracoes_nao_reescreve_nada(pasta):
+    dados = {f'u{i}': usuario() for i in range(50)}
+    assert gravar_particoes(str(pasta / 'p.partes'), 'usuarios', dados, particoes=8) == 8
+    assert gravar_particoes(str(pasta / 'p.partes'), 'usuarios', dados, alteradas=[]) == 0
+    assert os.path.exists(caminho_parte(str(pasta / 'p.partes'), 7))
+    assert carregar_particoes(str(pasta / 'p.partes'), 'usuarios', processos=1) == dados
+
+
+def test_sem_manifesto_a_pasta_esta_vazia(pasta):
+    os.makedirs(pasta / 'p.partes')
+    assert ler_manifesto(str(pasta / 'p.partes')) is None
+    assert carregar_particoes(str(pasta / 'p.partes'), 'usuarios') == {}
+
+
+def test_converte_o_json_e_compacta_so_as_partes_alteradas(pasta):
+    escrever_json_atomico(str(pasta / 'usuarios.json'), {f'u{i}': usuario(f'U{i}') for i in range(200)})
+    armazenamento = abrir(pasta, limite_compactacao=1)
+    tabelas = carregar(armazenamento)
+    assert len(tabelas['usuarios']) == 200
+    partes = pasta / 'usuarios.partes'
+    assert ler_manifesto(str(partes)) is not None
+    modificacoes = {nome: os.stat(partes / nome).st_mtime_ns for nome in os.listdir(partes) if nome.startswith('parte-')}
+
+    tabelas['usuarios']['u7']['idade'] = 77
+    armazenamento.registrar('usuarios', 'u7', tabelas['usuarios']['u7'])
+    armazenamento.compactar(tabelas)
+    reescritas = [nome for nome, antes in modificacoes.items() if os.stat(partes / nome).st_mtime_ns != antes]
+    assert len(reescritas) == 1
+    assert carregar(abrir(pasta))['usuarios']['u7']['idade'] == 77
@@ -0,0 +1,66 @@
+from tabela_virtual import TabelaPaginada
+
+
+class ArvoreFalsa:
+    """O pedaço da ttk.Treeview usado pela tabela, guardando as linhas numa lista."""
+
+    def __init__(self):
+        self.linhas = [] # [iid, valores]
+        self.operacoes = []
+
+    def _posicao(self, iid):
+        return next(i for i, (atual, _) in enumerate(self.linhas) if atual == iid)
+
+    def insert(self, pai, posicao, iid, values):
+        self.linhas.insert(posicao, [iid, values])
+        self.operacoes.append(('insert', iid))
+
+    def delete(self, iid):
+        del self.linhas[self._posicao(iid)]
+        self.operacoes.append(('delete', iid))
+
+    def item(self, iid, values):
+        self.linhas[self._posicao(iid)][1] = values
+        self.operacoes.append(('item', iid))
+
+    def index(self, iid):
+        return self._posicao(iid)
+
+    def move(self, iid, pai, posicao):
+        self.linhas.insert(posicao, self.linhas.pop(self._posicao(iid)))
+        self.operacoes.append(('move', iid))
+
+
+def criar(quantidade=5, tamanho_pagina=2):
+    dados = {f'u{i}': {'idade': i} for i in range(quantidade)}
+    arvore = ArvoreFalsa()
+    tabela = TabelaPaginada(arvore, lambda: dados, lambda chave, registro: (chave, registro['idade']), tamanho_pagina)
+    tabela.mostrar_pagina(0)
+    return dados, arvore, tabela
+
+
+def test_paginas_e_limites():
+    dados, arvore, tabela = criar()
+    assert [iid for iid, _ in arvore.linhas] == ['u0', 'u1'] and tabela.total_paginas() == 3
+    tabela.proxima_pagina()
+    tabela.proxima_pagina()
+    tabela.proxima_pagina() # Não passa da última
+    assert tabela.pagina == 2 and [iid for iid, _ in arvore.linhas] == ['u4']
+
+
+def test_alteracao_mexe_em_uma_linha():
+    dados, arvore, tabela = criar()
+    arvore.operacoes.clear()
+    dados['u1']['idade'] = 40
+    tabela.atualizar_registro('u1')
+    tabela.atualizar_registro('u3') # Fora da página: nada a redesenhar
+    assert arvore.operacoes == [('item', 'u1')] and arvore.linhas[1] == ['u1', ('u1', 40)]
+
+
+def test_remocao_puxa_a_proxima_linha_e_filtro():
+    dados, arvore, tabela = criar()
+    del dados['u0']
+    tabela.atualizar_registro('u0')
+    assert [iid for iid, _ in arvore.linhas] == ['u1', 'u2']
+    tabela.definir_filtro(lambda: [chave for chave, registro in dados.items() if registro['idade'] % 2 == 0])
+    assert [iid for iid, _ in arvore.linhas] == ['u2', 'u4'] and tabela.total_paginas() == 1